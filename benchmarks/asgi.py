@@ -0,0 +1,95 @@
+"""
+Concurrent requests through ASGI handler to protected resources, authenticated by sync DRF view compared to
+async view using `OAuth2Authentication.aauthenticate`, and to sync and async token views
+"""
+import base64
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from django.urls import path
+from django.utils import timezone
+
+from oauthlib.common import generate_token
+
+from benchmarks.utils import measure_concurrent
+from oauth_api.authentication import OAuth2Authentication
+from oauth_api.models import get_application_model, AccessToken
+from oauth_api.tests.views import RESPONSE_DATA, ResourceView
+from oauth_api.views import AsyncTokenView, TokenView
+
+
+Application = get_application_model()
+User = get_user_model()
+
+
+async def async_resource_view(request):
+    if await OAuth2Authentication().aauthenticate(request) is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    return JsonResponse(RESPONSE_DATA)
+
+
+urlpatterns = [
+    path('resource-sync/', ResourceView.as_view()),
+    path('resource-async/', async_resource_view),
+    path('token-sync/', TokenView.as_view()),
+    path('token-async/', AsyncTokenView.as_view()),
+]
+
+
+def create_application(user, grant_type):
+    return Application.objects.create(
+        name='ASGI',
+        redirect_uris='http://localhost',
+        user=user,
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=grant_type,
+    )
+
+
+def basic_auth(application):
+    payload = '{0}:{1}'.format(application.client_id, application.client_secret)
+    return 'Basic {0}'.format(base64.b64encode(payload.encode('utf-8')).decode('utf-8'))
+
+
+def run(iterations, concurrency=20):
+    user = User.objects.create_user('asgi_user', 'asgi@example.com', '1234')
+    access_token = AccessToken.objects.create(user=user, token=generate_token(),
+                                              application=create_application(user, Application.GRANT_PASSWORD),
+                                              expires=timezone.now() + timezone.timedelta(days=1), scope='read write')
+    client_credentials_app = create_application(user, Application.GRANT_CLIENT_CREDENTIALS)
+    client = AsyncClient()
+
+    def get(url):
+        authorization = 'Bearer {0}'.format(access_token.token)
+
+        async def request():
+            # Extra arguments are passed as ASGI headers
+            response = await client.get(url, authorization=authorization)
+            assert response.status_code == 200, response.content
+        return request
+
+    def post_token(url):
+        authorization = basic_auth(client_credentials_app)
+
+        async def request():
+            response = await client.post(url, 'grant_type=client_credentials', authorization=authorization,
+                                         content_type='application/x-www-form-urlencoded')
+            assert response.status_code == 200, response.content
+        return request
+
+    results = []
+    for cache_size in (0, 1000):
+        settings = {'TOKEN_LOCAL_CACHE_SIZE': cache_size}
+        suffix = ', token cache' if cache_size else ''
+        with override_settings(ROOT_URLCONF=__name__, OAUTH_API=settings):
+            for name, url in (('sync view', '/resource-sync/'), ('async view', '/resource-async/')):
+                results.append(measure_concurrent(
+                    'asgi: {0}{1}'.format(name, suffix), get(url), iterations, concurrency))
+
+    # In-memory SQLite test database allows only a single writer, run OAuthLib in a single thread
+    with override_settings(ROOT_URLCONF=__name__, OAUTH_API={'EXECUTOR_MAX_WORKERS': 1}):
+        for name, url in (('sync token view', '/token-sync/'), ('async token view', '/token-async/')):
+            results.append(measure_concurrent('asgi: {0}'.format(name), post_token(url), iterations, concurrency))
+    return results
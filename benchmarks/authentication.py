@@ -0,0 +1,58 @@
+"""
+Cost of OAuth2Authentication using full OAuthLib request verification compared to bearer token fast path,
+and of scope checks made by OAuth2ScopePermission
+"""
+from django.contrib.auth import get_user_model
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from oauthlib.common import generate_token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.utils import measure
+from oauth_api.authentication import OAuth2Authentication
+from oauth_api.handlers import get_request_handler
+from oauth_api.models import get_application_model, AccessToken
+
+
+Application = get_application_model()
+User = get_user_model()
+
+
+def create_access_token():
+    user = User.objects.create_user('authentication_user', 'authentication@example.com', '1234')
+    application = Application.objects.create(
+        name='Authentication',
+        redirect_uris='http://localhost',
+        user=user,
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=Application.GRANT_PASSWORD,
+    )
+    return AccessToken.objects.create(user=user, token=generate_token(), application=application,
+                                      expires=timezone.now() + timezone.timedelta(days=1), scope='read write')
+
+
+def run(iterations):
+    access_token = create_access_token()
+    request = Request(APIRequestFactory().get(
+        '/resource?page=1', HTTP_AUTHORIZATION='Bearer {0}'.format(access_token.token)))
+    authentication = OAuth2Authentication()
+
+    def full():
+        valid, r = get_request_handler().verify_request(request, scopes=[])
+        assert valid
+
+    def fast():
+        assert authentication.authenticate(request) is not None
+
+    with override_settings(OAUTH_API={'TOKEN_LOCAL_CACHE_SIZE': 1000}):
+        results = [
+            measure('authentication: full oauthlib request', full, iterations),
+            measure('authentication: bearer fast path', fast, iterations),
+            measure('authentication: allow_scopes', lambda: access_token.allow_scopes(['read', 'write']),
+                    iterations),
+        ]
+    with override_settings(OAUTH_API={'TOKEN_LOCAL_CACHE_SIZE': 1000, 'TRACK_USAGE': True}):
+        results.append(measure('authentication: bearer fast path, usage tracked', fast, iterations))
+    return results
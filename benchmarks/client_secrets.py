@@ -0,0 +1,58 @@
+"""
+Cost of client credentials grant for high rate machine clients with plaintext and hashed client secrets,
+with and without cache of successful client secret checks
+"""
+from django.contrib.auth import get_user_model
+from django.test.utils import override_settings
+
+from rest_framework.test import APIClient
+
+from benchmarks.endpoints import post_token
+from benchmarks.utils import measure
+from oauth_api.models import get_application_model
+
+
+Application = get_application_model()
+User = get_user_model()
+
+# Password hashers of benchmark settings are replaced with a fast one, use Django's default for secrets
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+]
+
+# Every uncached call hashes the secret, keep the run short
+UNCACHED_ITERATIONS = 20
+
+
+class MachineClient(object):
+    def __init__(self, name, user):
+        self.client_secret = 'secret-{0}'.format(name)
+        self.application = Application.objects.create(
+            name=name,
+            user=user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+            client_secret=self.client_secret,
+        )
+        # basic_auth() reads client id and secret from the application
+        self.credentials = Application(client_id=self.application.client_id, client_secret=self.client_secret)
+        self.client = APIClient()
+
+    def __call__(self):
+        post_token(self.client, self.credentials, {'grant_type': 'client_credentials'})
+
+
+def run(iterations):
+    user = User.objects.create_user('client_secrets_user', 'client_secrets@example.com', '1234')
+    plaintext = MachineClient('Plaintext secret', user)
+
+    with override_settings(PASSWORD_HASHERS=PASSWORD_HASHERS, OAUTH_API={'HASH_CLIENT_SECRETS': True}):
+        hashed = MachineClient('Hashed secret', user)
+        results = [
+            measure('client secret: plaintext', plaintext, iterations),
+            measure('client secret: hashed, cached', hashed, iterations),
+        ]
+        with override_settings(OAUTH_API={'HASH_CLIENT_SECRETS': True, 'CLIENT_SECRET_CACHE_SIZE': 0}):
+            results.append(measure('client secret: hashed, not cached', hashed,
+                                   min(iterations, UNCACHED_ITERATIONS), warmup=1))
+    return results
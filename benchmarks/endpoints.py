@@ -0,0 +1,160 @@
+"""
+Throughput of OAuth endpoints and protected resources, driven in-process with the Django test client
+"""
+import base64
+from itertools import count
+
+from django.contrib.auth import get_user_model
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from oauthlib.common import generate_token
+from rest_framework.test import APIClient
+
+from benchmarks.utils import measure
+from oauth_api.models import get_application_model, AccessToken, AuthorizationCode, RefreshToken
+
+
+Application = get_application_model()
+User = get_user_model()
+
+REDIRECT_URI = 'http://localhost'
+# Tokens per batch introspection request
+INTROSPECTION_BATCH = 50
+
+
+def basic_auth(application):
+    payload = '{0}:{1}'.format(application.client_id, application.client_secret)
+    return 'Basic {0}'.format(base64.b64encode(payload.encode('utf-8')).decode('utf-8'))
+
+
+def create_application(name, grant_type, user):
+    return Application.objects.create(
+        name=name,
+        redirect_uris=REDIRECT_URI,
+        user=user,
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=grant_type,
+    )
+
+
+class Fixtures(object):
+    def __init__(self):
+        self.counter = count()
+        self.user = User.objects.create_user('benchmark_user', 'benchmark@example.com', '1234')
+        self.authorization_code_app = create_application(
+            'Authorization code', Application.GRANT_AUTHORIZATION_CODE, self.user)
+        self.password_app = create_application('Password', Application.GRANT_PASSWORD, self.user)
+        self.client_credentials_app = create_application(
+            'Client credentials', Application.GRANT_CLIENT_CREDENTIALS, self.user)
+        self.access_token = self.create_access_token(expires_in=timezone.timedelta(days=1))
+
+    def expires(self, expires_in=None):
+        return timezone.now() + (expires_in or timezone.timedelta(hours=1))
+
+    def create_access_token(self, expires_in=None):
+        return AccessToken.objects.create(user=self.user, token=generate_token(), application=self.password_app,
+                                          expires=self.expires(expires_in), scope='read write')
+
+    def create_refresh_token(self):
+        return RefreshToken.objects.create(user=self.user, token=generate_token(), application=self.password_app,
+                                           access_token=self.create_access_token())
+
+    def create_authorization_code(self):
+        return AuthorizationCode.objects.create(user=self.user, code=generate_token(),
+                                                application=self.authorization_code_app,
+                                                expires=self.expires(), redirect_uri=REDIRECT_URI,
+                                                scope='read write')
+
+
+def post_token(client, application, data):
+    client.credentials(HTTP_AUTHORIZATION=basic_auth(application))
+    response = client.post(reverse('oauth_api:token'), data)
+    assert response.status_code == 200, response.content
+    return response
+
+
+def get_benchmarks(fixtures):
+    client = APIClient()
+    authorize_client = APIClient()
+    authorize_client.force_login(fixtures.user)
+    authorize_data = {
+        'client_id': fixtures.authorization_code_app.client_id,
+        'redirect_uri': REDIRECT_URI,
+        'response_type': 'code',
+        'state': 'state',
+        'scopes': 'read write',
+    }
+
+    def authorization_code(code):
+        post_token(client, fixtures.authorization_code_app, {
+            'grant_type': 'authorization_code', 'code': code.code, 'redirect_uri': REDIRECT_URI})
+
+    def password():
+        post_token(client, fixtures.password_app, {
+            'grant_type': 'password', 'username': 'benchmark_user', 'password': '1234'})
+
+    def client_credentials():
+        post_token(client, fixtures.client_credentials_app, {'grant_type': 'client_credentials'})
+
+    def refresh_token(token):
+        post_token(client, fixtures.password_app, {'grant_type': 'refresh_token', 'refresh_token': token.token})
+
+    def revoke(token):
+        client.credentials(HTTP_AUTHORIZATION=basic_auth(fixtures.password_app))
+        response = client.post(reverse('oauth_api:revoke-token'), {'token': token.token})
+        assert response.status_code == 200, response.content
+
+    def authorize_get():
+        response = authorize_client.get(reverse('oauth_api:authorize'), authorize_data)
+        assert response.status_code == 200, response.content
+
+    def authorize_post():
+        response = authorize_client.post(reverse('oauth_api:authorize'), dict(authorize_data, allow=True))
+        assert response.status_code == 302, response.content
+
+    def introspect():
+        client.credentials(HTTP_AUTHORIZATION=basic_auth(fixtures.client_credentials_app))
+        response = client.post(reverse('oauth_api:introspect-token'), {'token': fixtures.access_token.token})
+        assert response.status_code == 200 and response.data['active'], response.content
+
+    def resource():
+        client.credentials(HTTP_AUTHORIZATION='Bearer {0}'.format(fixtures.access_token.token))
+        response = client.get(reverse('resource-view'))
+        assert response.status_code == 200, response.content
+
+    return (
+        ('token: authorization_code', authorization_code, fixtures.create_authorization_code),
+        ('token: password', password, None),
+        ('token: client_credentials', client_credentials, None),
+        ('token: refresh_token', refresh_token, fixtures.create_refresh_token),
+        ('revoke: access_token', revoke, fixtures.create_access_token),
+        ('authorize: consent page', authorize_get, None),
+        ('authorize: allow', authorize_post, None),
+        ('introspect: access_token', introspect, None),
+        ('resource: bearer token', resource, None),
+    )
+
+
+def run(iterations):
+    fixtures = Fixtures()
+    benchmarks = get_benchmarks(fixtures)
+    results = [measure(name, func, iterations, setup=setup) for name, func, setup in benchmarks]
+
+    introspect = {name: func for name, func, setup in benchmarks}['introspect: access_token']
+    with override_settings(OAUTH_API={'INTROSPECTION_CACHE': 'default', 'APPLICATION_CACHE': 'default'}):
+        results.append(measure('introspect: access_token, cached', introspect, iterations))
+
+    client = APIClient()
+    tokens = [fixtures.create_access_token(expires_in=timezone.timedelta(days=1)).token
+              for i in range(INTROSPECTION_BATCH)]
+
+    def introspect_batch():
+        client.credentials(HTTP_AUTHORIZATION=basic_auth(fixtures.client_credentials_app))
+        response = client.post(reverse('oauth_api:introspect-tokens'), {'token': tokens})
+        assert response.status_code == 200 and len(response.data['results']) == len(tokens), response.content
+
+    name = 'introspect: batch of {0} access tokens'.format(INTROSPECTION_BATCH)
+    results.append(measure(name, introspect_batch, iterations))
+    return results
@@ -0,0 +1,45 @@
+"""
+Latency of bearer token verification by a resource server using introspection endpoint of a local stand-in
+authorization server, with and without cached results and kept-alive connections
+"""
+import time
+
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from benchmarks.utils import measure
+from oauth_api.tests.utils import IntrospectionServer
+
+
+def run(iterations):
+    server = IntrospectionServer({
+        'active': True,
+        'scope': 'read write',
+        'client_id': 'benchmark_client',
+        'token_type': 'Bearer',
+        'exp': int(time.time()) + 3600,
+    }).start()
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer remote1234567890')
+
+    def resource():
+        response = client.get(reverse('resource-remote-view'))
+        assert response.status_code == 200, response.content
+
+    settings = {
+        'REMOTE_INTROSPECTION_URL': server.url,
+        'REMOTE_CLIENT_ID': 'benchmark_client',
+        'REMOTE_CLIENT_SECRET': 'benchmark_secret',
+    }
+    try:
+        with override_settings(OAUTH_API=settings):
+            results = [measure('remote: cached', resource, iterations)]
+        with override_settings(OAUTH_API=dict(settings, REMOTE_CACHE_SIZE=0)):
+            results.append(measure('remote: not cached, kept-alive connection', resource, iterations))
+            server.keep_alive = False
+            results.append(measure('remote: not cached, new connection', resource, iterations))
+    finally:
+        server.stop()
+    return results
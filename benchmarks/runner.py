@@ -0,0 +1,95 @@
+import argparse
+import importlib
+import json
+import platform
+import sys
+
+import django
+from django.db import connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+BENCHMARKS = (
+    'asgi',
+    'authentication',
+    'client_secrets',
+    'endpoints',
+    'handlers',
+    'remote',
+)
+
+
+def print_results(results, baseline=None):
+    baseline = {result['name']: result for result in (baseline or [])}
+
+    header = '{0:<50} {1:>12} {2:>12} {3:>12} {4:>10} {5:>10}'.format(
+        'benchmark', 'ops/sec', 'p50 (us)', 'p99 (us)', 'queries', 'bytes')
+    if baseline:
+        header += ' {0:>10}'.format('change')
+    print(header)
+
+    for result in results:
+        line = '{name:<50} {ops_per_sec:>12.1f} {p50_us:>12.1f} {p99_us:>12.1f}'.format(**result)
+        queries = result['queries_per_op']
+        line += ' {0:>10}'.format('-' if queries is None else '{0:.2f}'.format(queries))
+        line += ' {0:>10}'.format('{0:.0f}'.format(result['bytes_per_op']) if 'bytes_per_op' in result else '-')
+        previous = baseline.get(result['name'])
+        if previous and previous['ops_per_sec']:
+            change = (result['ops_per_sec'] - previous['ops_per_sec']) / previous['ops_per_sec'] * 100
+            line += ' {0:>+9.1f}%'.format(change)
+        print(line)
+
+
+def setup_databases():
+    setup_test_environment(debug=False)
+    old_names = []
+    for connection in connections.all():
+        old_names.append((connection, connection.settings_dict['NAME']))
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    return old_names
+
+
+def teardown_databases(old_names):
+    for connection, old_name in old_names:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    teardown_test_environment()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Run django-oauth-api benchmarks')
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help='Benchmarks to run, one of: {0}. Defaults to all'.format(', '.join(BENCHMARKS)))
+    parser.add_argument('-n', '--iterations', type=int, default=1000,
+                        help='Number of iterations per benchmark')
+    parser.add_argument('-o', '--output', help='Save results as JSON to given file')
+    parser.add_argument('-c', '--compare', help='Compare results to earlier results saved with --output')
+    args = parser.parse_args(argv)
+
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark: {0}'.format(name))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    old_names = setup_databases()
+    try:
+        results = []
+        for name in args.benchmarks or BENCHMARKS:
+            module = importlib.import_module('benchmarks.{0}'.format(name))
+            results.extend(module.run(args.iterations))
+    finally:
+        teardown_databases(old_names)
+
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'argv': sys.argv[1:],
+                'results': results,
+            }, f, indent=2)
+    return 0
@@ -0,0 +1,6 @@
+from oauth_api.tests.settings import *  # noqa: F401,F403
+
+# Password hashing would dominate results of password grant, measure the overhead of this package instead
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
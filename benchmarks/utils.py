@@ -0,0 +1,143 @@
+import asyncio
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+def percentile(values, percent):
+    """
+    Return percentile of already sorted values using nearest-rank method
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(percent / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+class QueryCounter(object):
+    """
+    Database execute wrapper counting executed queries
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    with _execute_wrappers(counter):
+        yield counter
+
+
+@contextmanager
+def _execute_wrappers(counter):
+    wrapped = []
+    try:
+        for connection in connections.all():
+            connection.execute_wrappers.append(counter)
+            wrapped.append(connection)
+        yield
+    finally:
+        for connection in wrapped:
+            connection.execute_wrappers.remove(counter)
+
+
+def measure(name, func, iterations=1000, warmup=10, setup=None, allocations=False):
+    """
+    Call `func` repeatedly and return timing statistics and number of queries for a single call.
+
+    If `setup` is given, it is called before each call without being measured and its return value
+    is passed to `func`. If `allocations` is True, memory allocated by a single call is measured
+    separately after timing, see `measure_allocations`.
+    """
+    def call():
+        if setup is None:
+            func()
+        else:
+            func(setup())
+
+    for _ in range(warmup):
+        call()
+
+    timings = []
+    queries = 0
+    for _ in range(iterations):
+        args = () if setup is None else (setup(),)
+        with count_queries() as counter:
+            call_started = time.perf_counter()
+            func(*args)
+            timings.append(time.perf_counter() - call_started)
+        queries += counter.count
+
+    elapsed = sum(timings)
+    timings.sort()
+    result = {
+        'name': name,
+        'iterations': iterations,
+        'ops_per_sec': iterations / elapsed if elapsed else 0.0,
+        'p50_us': percentile(timings, 50) * 1e6,
+        'p99_us': percentile(timings, 99) * 1e6,
+        'queries_per_op': queries / float(iterations),
+    }
+    if allocations:
+        result['bytes_per_op'] = measure_allocations(func, min(iterations, 100), setup=setup)
+    return result
+
+
+def measure_allocations(func, iterations=100, setup=None):
+    """
+    Return average number of bytes allocated by a single call of `func`, including memory freed before it returns
+    """
+    total = 0
+    for _ in range(iterations):
+        args = () if setup is None else (setup(),)
+        # Restarting resets the peak, tracemalloc.reset_peak() requires Python 3.9
+        tracemalloc.start()
+        try:
+            func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        total += peak
+    return total / float(iterations)
+
+
+def measure_concurrent(name, func, iterations=1000, concurrency=10, warmup=10):
+    """
+    Await coroutine function `func` `iterations` times, keeping `concurrency` calls in progress, and return
+    throughput and latency statistics.
+
+    Queries are not counted, as they may be executed in other threads.
+    """
+    async def worker(count, timings):
+        for _ in range(count):
+            call_started = time.perf_counter()
+            await func()
+            timings.append(time.perf_counter() - call_started)
+
+    async def run():
+        await worker(warmup, [])
+        timings = []
+        per_worker, remainder = divmod(iterations, concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(per_worker + (1 if i < remainder else 0), timings)
+                               for i in range(concurrency)))
+        return time.perf_counter() - started, timings
+
+    elapsed, timings = asyncio.run(run())
+    timings.sort()
+    return {
+        'name': name,
+        'iterations': iterations,
+        'concurrency': concurrency,
+        'ops_per_sec': iterations / elapsed if elapsed else 0.0,
+        'p50_us': percentile(timings, 50) * 1e6,
+        'p99_us': percentile(timings, 99) * 1e6,
+        'queries_per_op': None,
+    }
@@ -1,17 +1,65 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
 from oauth_api.models import AccessToken, AuthorizationCode, RefreshToken, get_application_model
+from oauth_api.revocation import revoke_tokens
+from oauth_api.settings import oauth_api_settings
 
 
 Application = get_application_model()
 
 
+def report_revoked(modeladmin, request, results):
+    modeladmin.message_user(request, 'Revoked {0}.'.format(
+        ', '.join('{0} {1}'.format(count, name) for name, count in results)), messages.SUCCESS)
+
+
+@admin.action(description='Revoke all tokens of selected applications')
+def revoke_application_tokens(modeladmin, request, queryset):
+    results = revoke_tokens(application=list(queryset.values_list('pk', flat=True)), using=queryset.db)
+    report_revoked(modeladmin, request, results)
+
+
+@admin.action(description='Revoke all tokens of users of selected tokens')
+def revoke_user_tokens(modeladmin, request, queryset):
+    # Selected tokens are deleted along the way, so users must be resolved first
+    user_ids = list(set(queryset.exclude(user=None).values_list('user', flat=True)))
+    results = revoke_tokens(user=user_ids, using=queryset.db)
+    report_revoked(modeladmin, request, results)
+
+
+class ScopeListFilter(admin.SimpleListFilter):
+    """
+    Filter access tokens allowing selected scope, using scope mask column.
+    """
+    title = 'scope'
+    parameter_name = 'scope'
+
+    def lookups(self, request, model_admin):
+        return list(oauth_api_settings.SCOPES.items())
+
+    def queryset(self, request, queryset):
+        if self.value() not in oauth_api_settings.SCOPES:
+            return queryset
+        return queryset.with_scopes([self.value()])
+
+
 class ApplicationAdmin(admin.ModelAdmin):
-    list_display = ('name', 'client_id', 'created', 'updated')
+    list_display = ('name', 'client_id', 'last_used', 'request_count', 'created', 'updated')
+    actions = [revoke_application_tokens]
+
+    def save_model(self, request, obj, form, change):
+        super(ApplicationAdmin, self).save_model(request, obj, form, change)
+        if obj.raw_client_secret:
+            # Hashed secret can not be shown again
+            self.message_user(request, 'Client secret of {0} is {1}. Store it now, it will not be shown again.'.format(
+                obj, obj.raw_client_secret), messages.WARNING)
+            obj.raw_client_secret = None
 
 
 class AccessTokenAdmin(admin.ModelAdmin):
-    list_display = ('token', 'expires', 'application', 'user', 'created', 'updated')
+    list_display = ('token', 'expires', 'application', 'user', 'last_used', 'created', 'updated')
+    list_filter = (ScopeListFilter,)
+    actions = [revoke_user_tokens]
 
 
 class AuthorizationCodeAdmin(admin.ModelAdmin):
@@ -21,6 +69,7 @@ class AuthorizationCodeAdmin(admin.ModelAdmin):
 class RefreshTokenAdmin(admin.ModelAdmin):
     list_display = ('token', 'application', 'expires', 'user', 'created', 'updated')
     list_filter = ('expires',)
+    actions = [revoke_user_tokens]
 
 
 admin.site.register(Application, ApplicationAdmin)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class OAuthAPIConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'oauth_api'
+
+    def ready(self):
+        from oauth_api import signals  # noqa
@@ -1,9 +1,8 @@
-from rest_framework.authentication import BaseAuthentication
+from asgiref.sync import sync_to_async
 
-from oauthlib.oauth2 import Server
+from rest_framework.authentication import BaseAuthentication
 
-from oauth_api.handlers import OAuthHandler
-from oauth_api.validators import OAuthValidator
+from oauth_api.handlers import get_request_handler
 
 
 class OAuth2Authentication(BaseAuthentication):
@@ -16,15 +15,59 @@ class OAuth2Authentication(BaseAuthentication):
         """
         Authenticate the request
         """
-        server = Server(OAuthValidator())
-        handler = OAuthHandler(server)
-        valid, r = handler.verify_request(request, scopes=[])
+        handler = get_request_handler()
+        token = self.get_bearer_token(request)
+        if token is not None:
+            valid, r = handler.verify_bearer_token(request, token, scopes=[])
+        elif self.may_have_token_parameter(request):
+            valid, r = handler.verify_request(request, scopes=[])
+        else:
+            return None
 
         if valid:
             return r.user, r.access_token
         else:
             return None
 
+    async def aauthenticate(self, request):
+        """
+        Authenticate the request from async code
+
+        Bearer tokens from Authorization header are verified using async ORM. Tokens sent as query or
+        form-encoded body parameter are verified by `authenticate` in a thread.
+        """
+        token = self.get_bearer_token(request)
+        if token is not None:
+            valid, r = await get_request_handler().averify_bearer_token(request, token, scopes=[])
+        elif self.may_have_token_parameter(request):
+            return await sync_to_async(self.authenticate)(request)
+        else:
+            return None
+
+        if valid:
+            return r.user, r.access_token
+        else:
+            return None
+
+    def get_bearer_token(self, request):
+        """
+        Return token from Bearer Authorization header, or None if not available
+        """
+        auth = request.META.get('HTTP_AUTHORIZATION', '').split(' ')
+        if len(auth) == 2 and auth[0].lower() == 'bearer':
+            return auth[1]
+        return None
+
+    def may_have_token_parameter(self, request):
+        """
+        Check if token may have been sent as query or form-encoded body parameter instead of header
+        """
+        if 'HTTP_AUTHORIZATION' in request.META:
+            return False
+        if 'access_token' in getattr(request, 'query_params', request.GET):
+            return True
+        return request.content_type.startswith(('application/x-www-form-urlencoded', 'multipart/form-data'))
+
     def authenticate_header(self, request):
         """
         Return WWW-Authenticate header data
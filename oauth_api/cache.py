@@ -0,0 +1,668 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import router
+from django.utils.functional import SimpleLazyObject
+
+from oauth_api.models import AccessToken, get_application_model
+from oauth_api.routers import read_replica_or_primary
+from oauth_api.settings import APP_NAME, oauth_api_settings
+from oauth_api.utils import is_hashed_client_secret, token_digest
+
+
+class LocalCache(object):
+    """
+    Bounded in-process LRU cache with per-entry expiration.
+
+    Keeps hit, miss and eviction counters for the current process.
+    """
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, timeout=None):
+        """
+        Store value, never keeping it longer than `timeout` seconds of the cache.
+        """
+        if timeout is None or timeout > self.timeout:
+            timeout = self.timeout
+        if timeout <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        Return counters and current size of the cache.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+        }
+
+
+class _Call(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Coalesce concurrent calls using the same key into a single call.
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """
+        Call `func` unless a call with the same key is already in progress, in which case wait for its result.
+
+        Returns tuple of result and boolean telling whether result was shared with another caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+
+class TokenCache(object):
+    """
+    Two-tier cache of verified access tokens.
+
+    Optional in-process tier (`TOKEN_LOCAL_CACHE_SIZE`) is consulted before shared tier backed by
+    Django cache framework (`TOKEN_CACHE`). Entries are keyed by token digest and hold only token
+    expiry, scope, application id and user id. Related application and user are loaded lazily
+    when accessed.
+
+    Invalidation reaches the local tier of the current process only, other processes may keep
+    using an entry for at most `TOKEN_LOCAL_CACHE_TIMEOUT` seconds.
+
+    Digests of unknown and expired tokens can be remembered for `TOKEN_NEGATIVE_CACHE_TIMEOUT`
+    seconds, so that repeated attempts with the same token are rejected without a database query.
+    """
+    def __init__(self):
+        self._local = None
+        self._rejected = None
+        self._lock = threading.Lock()
+        self._calls = SingleFlight()
+
+    @property
+    def local(self):
+        """
+        Return in-process tier, or None if disabled.
+        """
+        if self._local is None and oauth_api_settings.TOKEN_LOCAL_CACHE_SIZE:
+            with self._lock:
+                if self._local is None:
+                    self._local = LocalCache(oauth_api_settings.TOKEN_LOCAL_CACHE_SIZE,
+                                             oauth_api_settings.TOKEN_LOCAL_CACHE_TIMEOUT)
+        return self._local
+
+    @property
+    def rejected(self):
+        """
+        Return in-process cache of rejected token digests, or None if disabled.
+        """
+        if self._rejected is None and oauth_api_settings.TOKEN_NEGATIVE_CACHE_SIZE:
+            with self._lock:
+                if self._rejected is None:
+                    self._rejected = LocalCache(oauth_api_settings.TOKEN_NEGATIVE_CACHE_SIZE,
+                                                oauth_api_settings.TOKEN_NEGATIVE_CACHE_TIMEOUT)
+        return self._rejected
+
+    def reset(self):
+        """
+        Drop in-process tiers. They will be rebuilt from current settings on next use.
+        """
+        with self._lock:
+            self._local = None
+            self._rejected = None
+
+    def get_cache(self):
+        """
+        Return cache configured with `TOKEN_CACHE` setting, or None if shared tier is disabled.
+        """
+        alias = oauth_api_settings.TOKEN_CACHE
+        if alias is None:
+            return None
+        return caches[alias]
+
+    def make_key(self, digest):
+        return '{0}{1}'.format(oauth_api_settings.TOKEN_CACHE_KEY_PREFIX, digest)
+
+    def get_timeout(self, expires, timeout=None):
+        """
+        Return number of seconds entry may stay in cache, never exceeding remaining lifetime of the token.
+        """
+        if timeout is None:
+            timeout = oauth_api_settings.TOKEN_CACHE_TIMEOUT
+        if isinstance(expires, datetime):
+            expires = expires.timestamp()
+        return min(timeout, int(expires - time.time()))
+
+    def get(self, digest, token):
+        """
+        Return cached access token for given digest, or None if not cached.
+        """
+        data = self.get_data(digest)
+        if not data:
+            return None
+        return self.build_access_token(token, data)
+
+    def get_data(self, digest):
+        """
+        Return cached data for given digest, False if token has been rejected recently or None if not cached.
+        """
+        data = self._get_local_data(digest)
+        if data is not None:
+            return data
+
+        cache = self.get_cache()
+        if cache is None:
+            return None
+        return self._shared_data_loaded(digest, cache.get(self.make_key(digest)))
+
+    async def aget_data(self, digest):
+        """
+        Async version of `get_data`.
+        """
+        data = self._get_local_data(digest)
+        if data is not None:
+            return data
+
+        cache = self.get_cache()
+        if cache is None:
+            return None
+        return self._shared_data_loaded(digest, await cache.aget(self.make_key(digest)))
+
+    def _get_local_data(self, digest):
+        rejected = self.rejected
+        if rejected is not None and rejected.get(digest):
+            return False
+
+        local = self.local
+        if local is not None:
+            return local.get(digest)
+        return None
+
+    def _shared_data_loaded(self, digest, data):
+        """
+        Copy data found from shared tier to in-process tiers
+        """
+        if data is False:
+            rejected = self.rejected
+            if rejected is not None:
+                rejected.set(digest, True)
+        elif data is not None:
+            local = self.local
+            if local is not None:
+                local.set(digest, data, self.get_timeout(data[1], local.timeout))
+        return data
+
+    def set(self, digest, access_token):
+        """
+        Store verified access token in cache.
+        """
+        data = self._set_local(digest, access_token)
+        cache = self.get_cache()
+        if cache is not None:
+            timeout = self.get_timeout(data[1])
+            if timeout > 0:
+                cache.set(self.make_key(digest), data, timeout)
+
+    async def aset(self, digest, access_token):
+        """
+        Async version of `set`.
+        """
+        data = self._set_local(digest, access_token)
+        cache = self.get_cache()
+        if cache is not None:
+            timeout = self.get_timeout(data[1])
+            if timeout > 0:
+                await cache.aset(self.make_key(digest), data, timeout)
+
+    def _set_local(self, digest, access_token):
+        data = (access_token.pk, access_token.expires.timestamp(), access_token.scope,
+                access_token.application_id, access_token.user_id)
+
+        local = self.local
+        if local is not None:
+            local.set(digest, data, self.get_timeout(data[1], local.timeout))
+        return data
+
+    def delete_many(self, digests):
+        """
+        Remove access tokens from cache.
+        """
+        if not digests:
+            return
+
+        for local in (self.local, self.rejected):
+            if local is not None:
+                for digest in digests:
+                    local.delete(digest)
+
+        cache = self.get_cache()
+        if cache is not None:
+            cache.delete_many([self.make_key(digest) for digest in digests])
+
+    def reject(self, digest):
+        """
+        Remember digest of unknown or expired token.
+        """
+        rejected = self.rejected
+        if rejected is None:
+            return
+        rejected.set(digest, True)
+
+        cache = self.get_cache()
+        if cache is not None:
+            cache.set(self.make_key(digest), False, rejected.timeout)
+
+    async def areject(self, digest):
+        """
+        Async version of `reject`.
+        """
+        rejected = self.rejected
+        if rejected is None:
+            return
+        rejected.set(digest, True)
+
+        cache = self.get_cache()
+        if cache is not None:
+            await cache.aset(self.make_key(digest), False, rejected.timeout)
+
+    def load(self, token, loader):
+        """
+        Return access token for given token from cache, calling `loader` on cache miss.
+
+        With in-process tier enabled, concurrent misses for the same token are coalesced into a single
+        `loader` call.
+        """
+        digest = token_digest(token)
+        data = self.get_data(digest)
+        if data is False:
+            return None
+        elif data is not None:
+            return self.build_access_token(token, data)
+
+        if self.local is None:
+            return self._load(digest, loader)
+
+        access_token, shared = self._calls.do(digest, lambda: self._load(digest, loader))
+        if shared and access_token is not None:
+            # Do not share model instances between requests
+            return self.get(digest, token) or access_token
+        return access_token
+
+    async def aload(self, token, loader):
+        """
+        Async version of `load`, `loader` is a coroutine function.
+
+        Concurrent misses are not coalesced. User of access token built from cached data is loaded
+        immediately, application is still loaded lazily and must not be accessed from async code.
+        """
+        digest = token_digest(token)
+        data = await self.aget_data(digest)
+        if data is False:
+            return None
+        elif data is not None:
+            access_token = self.build_access_token(token, data)
+            user_id = access_token.user_id
+            if user_id is not None:
+                user = await get_user_model()._default_manager.using(access_token._state.db).aget(pk=user_id)
+                AccessToken.user.field.set_cached_value(access_token, user)
+            return access_token
+
+        access_token = await loader()
+        if access_token is None or access_token.is_expired:
+            await self.areject(digest)
+        else:
+            await self.aset(digest, access_token)
+        return access_token
+
+    def _load(self, digest, loader):
+        access_token = loader()
+        if access_token is None or access_token.is_expired:
+            self.reject(digest)
+        else:
+            self.set(digest, access_token)
+        return access_token
+
+    def build_access_token(self, token, data):
+        """
+        Build access token instance from cached data without querying the database.
+        """
+        pk, expires, scope, application_id, user_id = data
+        db = router.db_for_read(AccessToken)
+        values = {
+            'id': pk,
+            'token': token,
+            'expires': datetime.fromtimestamp(expires, tz=dt_timezone.utc),
+            'scope': scope,
+            'application_id': application_id,
+            'user_id': user_id,
+        }
+        # Fields not cached are deferred and loaded from database on access
+        field_names = [field.attname for field in AccessToken._meta.concrete_fields if field.attname in values]
+        access_token = AccessToken.from_db(db, field_names, [values[name] for name in field_names])
+
+        application = SimpleLazyObject(lambda: application_cache.get_by_pk(application_id, replica=True))
+        AccessToken.application.field.set_cached_value(access_token, application)
+
+        if user_id is None:
+            user = None
+        else:
+            User = get_user_model()
+            user = SimpleLazyObject(lambda: User._default_manager.using(db).get(pk=user_id))
+        AccessToken.user.field.set_cached_value(access_token, user)
+        return access_token
+
+
+class ApplicationCache(object):
+    """
+    Cache of applications, backed by Django cache framework.
+
+    Applications are stored by primary key, client ids are mapped to primary keys so that changing
+    client id of an application invalidates the old client id as well.
+    """
+    def get_cache(self):
+        """
+        Return cache configured with `APPLICATION_CACHE` setting, or None if application caching is disabled.
+        """
+        alias = oauth_api_settings.APPLICATION_CACHE
+        if alias is None:
+            return None
+        return caches[alias]
+
+    def make_key(self, field, value):
+        value = hashlib.sha256(str(value).encode('utf-8')).hexdigest()
+        return '{0}{1}:{2}'.format(oauth_api_settings.APPLICATION_CACHE_KEY_PREFIX, field, value)
+
+    def get_by_pk(self, pk, replica=False):
+        """
+        Return application with given primary key. Raises `DoesNotExist` if application does not exist.
+
+        With `replica` enabled, application is read from a read replica if not cached.
+        """
+        cache = self.get_cache()
+        if cache is None:
+            return self.load(replica, pk=pk)
+
+        key = self.make_key('pk', pk)
+        application = cache.get(key)
+        if application is None:
+            application = self.load(replica, pk=pk)
+            cache.set(key, self.make_value(application), oauth_api_settings.APPLICATION_CACHE_TIMEOUT)
+        return application
+
+    def get_by_client_id(self, client_id, replica=False):
+        """
+        Return application with given client id. Raises `DoesNotExist` if application does not exist.
+
+        With `replica` enabled, application is read from a read replica if not cached.
+        """
+        Application = get_application_model()
+        cache = self.get_cache()
+        if cache is None:
+            return self.load(replica, client_id=client_id)
+
+        key = self.make_key('client_id', client_id)
+        pk = cache.get(key)
+        if pk is not None:
+            try:
+                application = self.get_by_pk(pk, replica=replica)
+            except Application.DoesNotExist:
+                application = None
+            if application is not None and application.client_id == client_id:
+                return application
+
+        application = self.load(replica, client_id=client_id)
+        cache.set_many({
+            key: application.pk,
+            self.make_key('pk', application.pk): self.make_value(application),
+        }, oauth_api_settings.APPLICATION_CACHE_TIMEOUT)
+        return application
+
+    def make_value(self, application):
+        """
+        Return application to store in cache. Applications read from a read replica are stored bound to the
+        database they are written to, so that cached applications can be related to new tokens.
+        """
+        using = router.db_for_write(type(application))
+        if application._state.db != using:
+            application = copy.copy(application)
+            application._state.db = using
+        return application
+
+    def load(self, replica, **lookup):
+        """
+        Load application from database, from a read replica if `replica` is enabled and the replica
+        has it.
+        """
+        manager = get_application_model()._default_manager
+        if replica:
+            return read_replica_or_primary(lambda: manager.get(**lookup))
+        return manager.get(**lookup)
+
+    def delete(self, application):
+        """
+        Remove application from cache.
+        """
+        cache = self.get_cache()
+        if cache is None:
+            return
+        cache.delete_many([self.make_key('pk', application.pk), self.make_key('client_id', application.client_id)])
+
+
+class IntrospectionCache(object):
+    """
+    Cache of token introspection responses of active access tokens, backed by Django cache framework.
+
+    Entries are keyed by token digest and never outlive the token. They are removed when the access
+    token is deleted or revoked.
+    """
+    def get_cache(self):
+        """
+        Return cache configured with `INTROSPECTION_CACHE` setting, or None if introspection caching is disabled.
+        """
+        alias = oauth_api_settings.INTROSPECTION_CACHE
+        if alias is None:
+            return None
+        return caches[alias]
+
+    def make_key(self, digest):
+        return '{0}{1}'.format(oauth_api_settings.INTROSPECTION_CACHE_KEY_PREFIX, digest)
+
+    def load(self, token, loader):
+        """
+        Return introspection claims of given token from cache, calling `loader` on cache miss. Claims
+        returned by `loader` are cached until their `exp`, for at most `INTROSPECTION_CACHE_TIMEOUT` seconds.
+        """
+        cache = self.get_cache()
+        if cache is None:
+            return loader()
+
+        key = self.make_key(token_digest(token))
+        claims = cache.get(key)
+        if claims is not None:
+            return claims
+
+        claims = loader()
+        if claims is not None:
+            timeout = self.get_timeout(claims)
+            if timeout > 0:
+                cache.set(key, claims, timeout)
+        return claims
+
+    def load_many(self, tokens, loader):
+        """
+        Batch version of `load`. Returns dict of claims of active tokens by token. `loader` is called once
+        with list of tokens missing from cache and returns a dict of their claims.
+        """
+        cache = self.get_cache()
+        if cache is None:
+            return loader(tokens)
+
+        keys = {token: self.make_key(token_digest(token)) for token in tokens}
+        cached = cache.get_many(list(keys.values()))
+        found = {token: cached[key] for token, key in keys.items() if key in cached}
+        missing = [token for token in keys if token not in found]
+        if not missing:
+            return found
+
+        loaded = loader(missing)
+        # Entries are grouped by timeout, most tokens outlive the cache timeout
+        entries = {}
+        for token, claims in loaded.items():
+            timeout = self.get_timeout(claims)
+            if timeout > 0:
+                entries.setdefault(timeout, {})[keys[token]] = claims
+        for timeout, data in entries.items():
+            cache.set_many(data, timeout)
+        found.update(loaded)
+        return found
+
+    def get_timeout(self, claims):
+        return min(oauth_api_settings.INTROSPECTION_CACHE_TIMEOUT, int(claims['exp'] - time.time()))
+
+    def delete_many(self, digests):
+        """
+        Remove introspection responses of tokens from cache.
+        """
+        cache = self.get_cache()
+        if cache is not None and digests:
+            cache.delete_many([self.make_key(digest) for digest in digests])
+
+
+class ClientSecretCache(object):
+    """
+    In-process cache of successful client secret checks against hashed secrets.
+
+    Hashing is slow by design, so successful checks are kept for `CLIENT_SECRET_CACHE_TIMEOUT` seconds
+    instead of hashing the secret on every request. Entries are keyed by application, its stored hash
+    and keyed digest of the checked secret, so changing the secret invalidates them. Failed checks and
+    plaintext secrets are never cached.
+    """
+    def __init__(self):
+        self._local = None
+        self._lock = threading.Lock()
+
+    @property
+    def local(self):
+        """
+        Return in-process cache, or None if disabled.
+        """
+        if self._local is None and oauth_api_settings.CLIENT_SECRET_CACHE_SIZE:
+            with self._lock:
+                if self._local is None:
+                    self._local = LocalCache(oauth_api_settings.CLIENT_SECRET_CACHE_SIZE,
+                                             oauth_api_settings.CLIENT_SECRET_CACHE_TIMEOUT)
+        return self._local
+
+    def reset(self):
+        """
+        Drop cached checks. Cache will be rebuilt from current settings on next use.
+        """
+        with self._lock:
+            self._local = None
+
+    def check(self, application, client_secret):
+        """
+        Check client secret of application, using cached result of an earlier successful check.
+        """
+        local = self.local
+        if local is None or client_secret is None or not is_hashed_client_secret(application.client_secret):
+            return application.check_client_secret(client_secret)
+
+        key = (application.pk, application.client_secret, token_digest(client_secret))
+        if local.get(key):
+            return True
+
+        valid = application.check_client_secret(client_secret)
+        if valid:
+            local.set(key, True)
+        return valid
+
+
+token_cache = TokenCache()
+application_cache = ApplicationCache()
+introspection_cache = IntrospectionCache()
+client_secret_cache = ClientSecretCache()
+
+
+def reset_token_cache(*args, **kwargs):
+    if kwargs['setting'] == APP_NAME:
+        token_cache.reset()
+        client_secret_cache.reset()
+
+
+setting_changed.connect(reset_token_cache)
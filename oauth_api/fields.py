@@ -0,0 +1,81 @@
+from django.db import models
+
+from oauth_api.scopes import get_scope_mask
+from oauth_api.settings import oauth_api_settings
+from oauth_api.utils import hash_client_secret, is_hashed_client_secret, token_digest
+
+
+class TokenField(models.TextField):
+    """
+    Field holding token value. Value is not written to database when `STORE_TOKEN_DIGESTS` is enabled.
+    """
+    def pre_save(self, model_instance, add):
+        if oauth_api_settings.STORE_TOKEN_DIGESTS:
+            return ''
+        return super(TokenField, self).pre_save(model_instance, add)
+
+
+class TokenDigestField(models.CharField):
+    """
+    Field holding keyed digest of the token stored in `source` field.
+
+    Digest is updated on save whenever the source field has a value.
+    """
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault('max_length', 64)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('db_index', True)
+        super(TokenDigestField, self).__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(TokenDigestField, self).deconstruct()
+        kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.source)
+        if value:
+            setattr(model_instance, self.attname, token_digest(value))
+        return super(TokenDigestField, self).pre_save(model_instance, add)
+
+
+class ClientSecretField(models.CharField):
+    """
+    Field holding client secret. Secret is hashed on save when `HASH_CLIENT_SECRETS` is enabled.
+
+    Plaintext of a secret hashed on save is kept in unsaved `raw_client_secret` attribute of the instance,
+    as it can not be recovered from database afterwards.
+    """
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if value and oauth_api_settings.HASH_CLIENT_SECRETS and not is_hashed_client_secret(value):
+            model_instance.raw_client_secret = value
+            value = hash_client_secret(value)
+            setattr(model_instance, self.attname, value)
+        return value
+
+
+class ScopeMaskField(models.BigIntegerField):
+    """
+    Field holding integer mask of scopes stored in `source` field, see `oauth_api.scopes`.
+
+    Mask is updated on save, and is None if the scopes are missing from `SCOPES` setting.
+    """
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault('null', True)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('db_index', True)
+        super(ScopeMaskField, self).__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(ScopeMaskField, self).deconstruct()
+        kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        setattr(model_instance, self.attname, get_scope_mask(getattr(model_instance, self.source)))
+        return super(ScopeMaskField, self).pre_save(model_instance, add)
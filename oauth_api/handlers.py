@@ -1,9 +1,24 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+
 from oauthlib import oauth2
-from oauthlib.common import urlencode
+from oauthlib.common import Request as OAuthLibRequest, urlencode
 
 from rest_framework.request import Request
 
 from oauth_api.exceptions import OAuthAPIError, FatalClientError
+from oauth_api.settings import APP_NAME, oauth_api_settings
+
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+_executor = None
 
 
 class OAuthHandler(object):
@@ -14,23 +29,41 @@ class OAuthHandler(object):
 
         if isinstance(request, Request):
             data = request.data
-            headers = request._request.META.copy()
+            headers = self.extract_headers(request._request.META)
             uri = request._request.build_absolute_uri()
         else:
             data = urlencode(request.POST.items())
-            headers = request.META.copy()
+            headers = self.extract_headers(request.META)
             uri = request.build_absolute_uri()
 
         method = request.method
-        if 'wsgi.input' in headers:
-            del headers['wsgi.input']
-        if 'wsgi.errors' in headers:
-            del headers['wsgi.errors']
-        # OAuthLib looks for 'Authorization'
-        if 'HTTP_AUTHORIZATION' in headers:
-            headers['Authorization'] = headers['HTTP_AUTHORIZATION']
         return uri, method, data, headers
 
+    def extract_headers(self, meta):
+        """
+        Build headers passed to OAuthLib from request META
+
+        By default all of META is passed. When `REQUEST_HEADERS` is set, only Authorization, Content-Type
+        and the listed headers are passed.
+        """
+        allowed = oauth_api_settings.REQUEST_HEADERS
+        if allowed is None:
+            headers = meta.copy()
+            if 'wsgi.input' in headers:
+                del headers['wsgi.input']
+            if 'wsgi.errors' in headers:
+                del headers['wsgi.errors']
+            # OAuthLib looks for 'Authorization'
+            if 'HTTP_AUTHORIZATION' in headers:
+                headers['Authorization'] = headers['HTTP_AUTHORIZATION']
+            return headers
+
+        headers = {}
+        for name, key in get_header_keys(tuple(allowed)):
+            if key in meta:
+                headers[name] = meta[key]
+        return headers
+
     def create_authorization_response(self, request, scopes, credentials, allow):
         try:
             if not allow:
@@ -50,10 +83,20 @@ class OAuthHandler(object):
 
     def create_token_response(self, request):
         uri, method, data, headers = self.extract_params(request)
-        headers, body, status = self.server.create_token_response(uri, method, data, headers)
+        try:
+            headers, body, status = self.server.create_token_response(uri, method, data, headers)
+        except oauth2.OAuth2Error as error:
+            # Raised by validator while saving the token, e.g. when refresh token was used concurrently
+            return None, error.headers, error.json, error.status_code
         url = headers.get('Location', None)
         return url, headers, body, status
 
+    async def acreate_token_response(self, request):
+        """
+        Async version of `create_token_response`, OAuthLib and validator run in shared thread pool
+        """
+        return await run_in_executor(self.create_token_response, request)
+
     def create_revocation_response(self, request):
         """
         Wrapper method to call 'create_revocation_response' in OAuthLib
@@ -63,6 +106,60 @@ class OAuthHandler(object):
         url = headers.get('Location', None)
         return url, headers, body, status
 
+    async def acreate_revocation_response(self, request):
+        """
+        Async version of `create_revocation_response`, OAuthLib and validator run in shared thread pool
+        """
+        return await run_in_executor(self.create_revocation_response, request)
+
+    def create_introspection_response(self, request):
+        """
+        Wrapper method to call 'create_introspect_response' in OAuthLib
+        """
+        uri, method, body, headers = self.extract_params(request)
+        headers, body, status = self.server.create_introspect_response(uri, method, body, headers)
+        url = headers.get('Location', None)
+        return url, headers, body, status
+
+    def create_batch_introspection_response(self, request):
+        """
+        Introspect all `token` parameters of request at once, at most `INTROSPECTION_BATCH_SIZE` of them.
+
+        Request is validated and client authenticated as by `create_introspection_response`. Response body
+        has introspection responses of the tokens in order as `results`.
+        """
+        uri, method, body, headers = self.extract_params(request)
+        tokens = self.extract_tokens(request)
+        resp_headers = {
+            'Content-Type': 'application/json',
+            'Cache-Control': 'no-store',
+            'Pragma': 'no-cache',
+        }
+        r = OAuthLibRequest(uri, http_method=method, body=body, headers=headers)
+        try:
+            self.server.validate_introspect_request(r)
+            if len(tokens) > oauth_api_settings.INTROSPECTION_BATCH_SIZE:
+                raise oauth2.InvalidRequestError(request=r, description='At most {0} tokens can be introspected '
+                                                 'at once.'.format(oauth_api_settings.INTROSPECTION_BATCH_SIZE))
+        except oauth2.OAuth2Error as error:
+            resp_headers.update(error.headers)
+            return None, resp_headers, error.json, error.status_code
+
+        results = []
+        for claims in self.server.request_validator.introspect_tokens(tokens, r.token_type_hint, r):
+            results.append({'active': False} if claims is None else dict(claims, active=True))
+        return None, resp_headers, json.dumps({'results': results}), 200
+
+    def extract_tokens(self, request):
+        """
+        Return values of all `token` parameters of form encoded request body
+        """
+        data = request.data if isinstance(request, Request) else request.POST
+        try:
+            return data.getlist('token')
+        except AttributeError:
+            return []
+
     def validate_authorization_request(self, request):
         """
         Wrapper method to call `validate_authorization_request` in OAuthLib
@@ -90,3 +187,115 @@ class OAuthHandler(object):
             body = None
         valid, r = self.server.verify_request(uri, method, body, headers, scopes=scopes)
         return valid, r
+
+    def verify_bearer_token(self, request, token, scopes):
+        """
+        Verify bearer token using validator directly, without building full OAuthLib request
+
+        Returns the same result as `verify_request`.
+        """
+        r = self._bearer_token_request(request, scopes)
+        valid = self.server.request_validator.validate_bearer_token(token, scopes, r)
+        return valid, r
+
+    async def averify_bearer_token(self, request, token, scopes):
+        """
+        Async version of `verify_bearer_token`, validator must implement `avalidate_bearer_token`
+        """
+        r = self._bearer_token_request(request, scopes)
+        valid = await self.server.request_validator.avalidate_bearer_token(token, scopes, r)
+        return valid, r
+
+    def _bearer_token_request(self, request, scopes):
+        r = OAuthLibRequest('', http_method=request.method,
+                            headers={'Authorization': request.META.get('HTTP_AUTHORIZATION', '')})
+        r.scopes = scopes
+        return r
+
+
+@lru_cache(maxsize=16)
+def get_header_keys(names):
+    """
+    Return (header name, META key) pairs for Authorization, Content-Type and given header names
+    """
+    names = ('Authorization', 'Content-Type') + names
+    keys = []
+    for name in names:
+        key = name.upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        keys.append((name, key))
+    return tuple(keys)
+
+
+def get_request_handler(handler_class=None, server_class=None, validator_class=None, factory=None, view_class=None):
+    """
+    Return process-wide shared request handler for given handler, server and validator classes.
+
+    Classes default to the ones configured in settings. Handler is built only once per
+    combination of classes, using `factory` if given, and reused by all threads afterwards.
+    Handlers built with a `view_class` are shared only by views of that class.
+    """
+    handler_class = handler_class or oauth_api_settings.DEFAULT_HANDLER_CLASS
+    server_class = server_class or oauth_api_settings.DEFAULT_SERVER_CLASS
+    validator_class = validator_class or oauth_api_settings.DEFAULT_VALIDATOR_CLASS
+
+    key = (handler_class, server_class, validator_class, view_class)
+    try:
+        return _handlers[key]
+    except KeyError:
+        pass
+
+    with _handlers_lock:
+        if key not in _handlers:
+            if factory is None:
+                server = server_class(validator_class(), token_expires_in=oauth_api_settings.ACCESS_TOKEN_EXPIRATION)
+                _handlers[key] = handler_class(server)
+            else:
+                _handlers[key] = factory()
+        return _handlers[key]
+
+
+def get_executor():
+    """
+    Return process-wide thread pool running OAuthLib for async views, bounded by `EXECUTOR_MAX_WORKERS`.
+    """
+    global _executor
+    if _executor is None:
+        with _handlers_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=oauth_api_settings.EXECUTOR_MAX_WORKERS,
+                                               thread_name_prefix='oauth_api')
+    return _executor
+
+
+async def run_in_executor(func, *args):
+    """
+    Call `func` in shared thread pool and return its result.
+
+    Database connections of the pool thread are closed before and after the call when unusable or
+    older than `CONN_MAX_AGE`, as request signals do for request threads.
+    """
+    def call():
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return await sync_to_async(call, thread_sensitive=False, executor=get_executor())()
+
+
+def clear_request_handlers(*args, **kwargs):
+    """
+    Drop all shared request handlers and thread pool. Called automatically when OAuth API settings change.
+    """
+    global _executor
+    if kwargs.get('setting', APP_NAME) == APP_NAME:
+        with _handlers_lock:
+            _handlers.clear()
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+                _executor = None
+
+
+setting_changed.connect(clear_request_handlers)
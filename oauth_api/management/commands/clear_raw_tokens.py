@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from oauth_api.models import AccessToken, AuthorizationCode, RefreshToken
+from oauth_api.settings import oauth_api_settings
+from oauth_api.utils import update_in_batches
+
+
+class Command(BaseCommand):
+    help = 'Clear raw values of tokens and authorization codes stored before STORE_TOKEN_DIGESTS was enabled.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows updated per statement. Defaults to 1000.')
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Seconds to sleep between batches. Defaults to 0.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report number of rows that would be cleared.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database to update. Defaults to the "default" database.')
+
+    def get_querysets(self, database):
+        """
+        Return name, queryset and raw value field of rows storing both raw value and digest.
+
+        Rows without digest are kept as they are, run migrations to backfill their digests first.
+        """
+        return (
+            ('access tokens', AccessToken.objects.using(database).exclude(token='').exclude(token_digest=''),
+             'token'),
+            ('refresh tokens', RefreshToken.objects.using(database).exclude(token='').exclude(token_digest=''),
+             'token'),
+            ('authorization codes',
+             AuthorizationCode.objects.using(database).exclude(code='').exclude(code_digest=''), 'code'),
+        )
+
+    def handle(self, *args, **options):
+        if not oauth_api_settings.STORE_TOKEN_DIGESTS:
+            raise CommandError('STORE_TOKEN_DIGESTS must be enabled, tokens are still looked up by raw value.')
+
+        started = time.monotonic()
+        results = []
+        for name, queryset, field in self.get_querysets(options['database']):
+            if options['dry_run']:
+                count = queryset.count()
+            else:
+                count = update_in_batches(queryset, {field: ''}, batch_size=options['batch_size'],
+                                          sleep=options['sleep'])
+            results.append('{0} {1}'.format(count, name))
+
+        self.stdout.write('{0} raw values of {1} in {2:.2f} seconds.'.format(
+            'Would clear' if options['dry_run'] else 'Cleared',
+            ', '.join(results),
+            time.monotonic() - started))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from oauth_api.models import get_application_model
+from oauth_api.settings import oauth_api_settings
+from oauth_api.utils import hash_client_secret, is_hashed_client_secret
+
+
+class Command(BaseCommand):
+    help = 'Hash plaintext client secrets of existing applications.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report number of secrets that would be hashed.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database to update. Defaults to the "default" database.')
+
+    def handle(self, *args, **options):
+        if not oauth_api_settings.HASH_CLIENT_SECRETS:
+            self.stderr.write('HASH_CLIENT_SECRETS is disabled, secrets of new and changed applications '
+                              'will be stored in plaintext.')
+
+        Application = get_application_model()
+        applications = Application._default_manager.using(options['database']).exclude(client_secret='').only(
+            'pk', 'client_id', 'client_secret')
+
+        started = time.monotonic()
+        count = 0
+        for application in applications.iterator():
+            if is_hashed_client_secret(application.client_secret):
+                continue
+            count += 1
+            if not options['dry_run']:
+                application.client_secret = hash_client_secret(application.client_secret)
+                # Saved one by one so that signals invalidate cached applications
+                application.save(update_fields=['client_secret'])
+
+        self.stdout.write('{0} {1} client secrets in {2:.2f} seconds.'.format(
+            'Would hash' if options['dry_run'] else 'Hashed', count, time.monotonic() - started))
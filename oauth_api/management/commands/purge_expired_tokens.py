@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.utils import timezone
+
+from oauth_api.models import AccessToken, AuthorizationCode, RefreshToken, TokenIndex
+from oauth_api.utils import delete_in_batches
+
+
+class Command(BaseCommand):
+    help = 'Delete expired access tokens, refresh tokens and authorization codes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows deleted per statement. Defaults to 1000.')
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Seconds to sleep between batches. Defaults to 0.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report number of rows that would be deleted.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database to purge. Defaults to the "default" database.')
+
+    def get_querysets(self, database):
+        """
+        Return querysets of expired rows in deletion order.
+
+        Access tokens are kept as long as their refresh token is valid, as refreshing requires the
+        original access token. Expired refresh tokens are deleted before their access tokens.
+        """
+        now = timezone.now()
+        return (
+            ('refresh tokens', RefreshToken.objects.using(database).filter(expires__lt=now)),
+            ('access tokens', AccessToken.objects.using(database).filter(expires__lt=now).filter(
+                Q(refresh_token__isnull=True) | Q(refresh_token__expires__lt=now))),
+            ('authorization codes', AuthorizationCode.objects.using(database).filter(expires__lt=now)),
+        )
+
+    def get_stale_index_entries(self, database):
+        """
+        Return token index entries of refresh tokens deleted without their access token
+        """
+        refresh_tokens = RefreshToken.objects.using(database).values('pk')
+        return TokenIndex.objects.using(database).filter(token_type=TokenIndex.TYPE_REFRESH_TOKEN).exclude(
+            token_id__in=refresh_tokens)
+
+    def handle(self, *args, **options):
+        database = options['database']
+
+        def delete_index_entries(rows):
+            TokenIndex.objects.using(database).filter(digest__in=[digest for pk, digest in rows]).delete()
+
+        started = time.monotonic()
+        results = []
+        for name, queryset in self.get_querysets(database):
+            if options['dry_run']:
+                count = queryset.count()
+            elif queryset.model is AuthorizationCode:
+                count = delete_in_batches(queryset, batch_size=options['batch_size'], sleep=options['sleep'])
+            else:
+                count = delete_in_batches(queryset, batch_size=options['batch_size'], sleep=options['sleep'],
+                                          fields=('token_digest',), callback=delete_index_entries)
+            results.append('{0} {1}'.format(count, name))
+
+        if not options['dry_run']:
+            delete_in_batches(self.get_stale_index_entries(database), batch_size=options['batch_size'],
+                              sleep=options['sleep'])
+
+        self.stdout.write('{0} {1} in {2:.2f} seconds.'.format(
+            'Would delete' if options['dry_run'] else 'Deleted',
+            ', '.join(results),
+            time.monotonic() - started))
@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from oauth_api.models import get_application_model
+from oauth_api.revocation import get_revocation_querysets, revoke_tokens
+
+
+class Command(BaseCommand):
+    help = 'Revoke all access tokens, refresh tokens and authorization codes of a user and/or an application.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username of the user whose tokens are revoked.')
+        parser.add_argument('--application', help='Client id of the application whose tokens are revoked.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows deleted per statement. Defaults to 1000.')
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Seconds to sleep between batches. Defaults to 0.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report number of rows that would be deleted.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database to revoke tokens from. Defaults to the "default" database.')
+
+    def get_user(self, username, database):
+        User = get_user_model()
+        try:
+            return User._default_manager.db_manager(database).get_by_natural_key(username)
+        except User.DoesNotExist:
+            raise CommandError('User "{0}" does not exist.'.format(username))
+
+    def get_application(self, client_id, database):
+        Application = get_application_model()
+        try:
+            return Application._default_manager.using(database).get(client_id=client_id)
+        except Application.DoesNotExist:
+            raise CommandError('Application "{0}" does not exist.'.format(client_id))
+
+    def handle(self, *args, **options):
+        if not options['user'] and not options['application']:
+            raise CommandError('Specify --user, --application or both.')
+
+        database = options['database']
+        user = self.get_user(options['user'], database) if options['user'] else None
+        application = self.get_application(options['application'], database) if options['application'] else None
+
+        started = time.monotonic()
+        if options['dry_run']:
+            results = [(name, queryset.count())
+                       for name, queryset in get_revocation_querysets(user, application, database)]
+        else:
+            results = revoke_tokens(user, application, batch_size=options['batch_size'], sleep=options['sleep'],
+                                    using=database)
+
+        self.stdout.write('{0} {1} in {2:.2f} seconds.'.format(
+            'Would delete' if options['dry_run'] else 'Deleted',
+            ', '.join('{0} {1}'.format(count, name) for name, count in results),
+            time.monotonic() - started))
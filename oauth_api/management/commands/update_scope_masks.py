@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from oauth_api.models import AccessToken
+from oauth_api.scopes import update_scope_masks
+
+
+class Command(BaseCommand):
+    help = 'Update scope masks of access tokens after scopes of SCOPES setting are reordered or removed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database to update. Defaults to the "default" database.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = update_scope_masks(AccessToken.objects.using(options['database']))
+        self.stdout.write('Updated {0} access tokens in {1:.2f} seconds.'.format(count, time.monotonic() - started))
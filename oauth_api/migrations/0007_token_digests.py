@@ -0,0 +1,71 @@
+# Generated by Django 4.1.13 on 2026-10-17 00:09
+
+from django.db import migrations
+import oauth_api.fields
+
+from oauth_api.utils import token_digest
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_digests(apps, schema_editor):
+    """
+    Compute digests of existing tokens in primary key ordered batches
+    """
+    db_alias = schema_editor.connection.alias
+    for model_name, field, digest_field in (('AccessToken', 'token', 'token_digest'),
+                                            ('RefreshToken', 'token', 'token_digest'),
+                                            ('AuthorizationCode', 'code', 'code_digest')):
+        model = apps.get_model('oauth_api', model_name)
+        queryset = model.objects.using(db_alias).filter(**{digest_field: ''}).exclude(**{field: ''})
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk').only('pk', field)[:BATCH_SIZE])
+            if not batch:
+                break
+            for obj in batch:
+                setattr(obj, digest_field, token_digest(getattr(obj, field)))
+            model.objects.using(db_alias).bulk_update(batch, [digest_field])
+            last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth_api', '0006_alter_accesstoken_token_alter_authorizationcode_code_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accesstoken',
+            name='token_digest',
+            field=oauth_api.fields.TokenDigestField(blank=True, db_index=True, editable=False, max_length=64, source='token'),
+        ),
+        migrations.AddField(
+            model_name='authorizationcode',
+            name='code_digest',
+            field=oauth_api.fields.TokenDigestField(blank=True, db_index=True, editable=False, max_length=64, source='code'),
+        ),
+        migrations.AddField(
+            model_name='refreshtoken',
+            name='token_digest',
+            field=oauth_api.fields.TokenDigestField(blank=True, db_index=True, editable=False, max_length=64, source='token'),
+        ),
+        migrations.AlterField(
+            model_name='accesstoken',
+            name='token',
+            field=oauth_api.fields.TokenField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='authorizationcode',
+            name='code',
+            field=oauth_api.fields.TokenField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='refreshtoken',
+            name='token',
+            field=oauth_api.fields.TokenField(db_index=True),
+        ),
+        migrations.RunPython(backfill_digests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.1.13 on 2026-10-17 00:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from oauth_api.settings import oauth_api_settings
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_token_index(apps, schema_editor):
+    """
+    Add index entries of existing access and refresh tokens in primary key ordered batches
+    """
+    db_alias = schema_editor.connection.alias
+    TokenIndex = apps.get_model('oauth_api', 'TokenIndex')
+    for model_name, token_type, access_token_field in (('AccessToken', 'access_token', 'pk'),
+                                                       ('RefreshToken', 'refresh_token', 'access_token_id')):
+        model = apps.get_model('oauth_api', model_name)
+        queryset = model.objects.using(db_alias).exclude(token_digest='')
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', 'token_digest', access_token_field, 'application_id')[:BATCH_SIZE])
+            if not batch:
+                break
+            TokenIndex.objects.using(db_alias).bulk_create([
+                TokenIndex(digest=digest, token_type=token_type, token_id=pk, access_token_id=access_token_id,
+                           application_id=application_id)
+                for pk, digest, access_token_id, application_id in batch
+            ], ignore_conflicts=True)
+            last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth_api', '0007_token_digests'),
+        migrations.swappable_dependency(oauth_api_settings.APPLICATION_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenIndex',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('token_type', models.CharField(choices=[('access_token', 'Access token'), ('refresh_token', 'Refresh token')], max_length=20)),
+                ('token_id', models.BigIntegerField()),
+                ('access_token', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='oauth_api.accesstoken')),
+                ('application', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=oauth_api_settings.APPLICATION_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_token_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.1.13 on 2026-10-17 00:48
+
+from django.db import migrations
+import oauth_api.fields
+import oauth_api.generators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth_api', '0008_token_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='application',
+            name='client_secret',
+            field=oauth_api.fields.ClientSecretField(blank=True, default=oauth_api.generators.generate_client_secret, max_length=255),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.13 on 2026-10-17 00:50
+
+from django.db import migrations
+import oauth_api.fields
+from oauth_api.scopes import update_scope_masks
+
+
+def backfill_scope_masks(apps, schema_editor):
+    """
+    Set scope masks of existing access tokens with one UPDATE per distinct scope string
+    """
+    AccessToken = apps.get_model('oauth_api', 'AccessToken')
+    update_scope_masks(AccessToken.objects.using(schema_editor.connection.alias))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth_api', '0009_client_secret_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accesstoken',
+            name='scope_mask',
+            field=oauth_api.fields.ScopeMaskField(blank=True, db_index=True, editable=False, null=True, source='scope'),
+        ),
+        migrations.RunPython(backfill_scope_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.13 on 2026-10-17 01:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth_api', '0010_access_token_scope_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accesstoken',
+            name='last_used',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='last used'),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='last_used',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='last used'),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='request_count',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='request count'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from oauth_api.exceptions import FatalClientError
+from oauth_api.handlers import get_request_handler
 from oauth_api.settings import oauth_api_settings
 
 
@@ -70,11 +71,19 @@ class OAuthViewMixin(object):
     def get_request_handler(self):
         """
         Return request handler instance from cache. New instance will be created if not available otherwise.
+
+        Handlers are shared process-wide between all views using the same handler, server and
+        validator classes, so the server is not rebuilt for every request. Views overriding `get_server()`
+        share handlers only with views of the same class.
         """
         if not hasattr(self, '_oauth_handler'):
             handler_class = self.get_handler_class()
-            server = self.get_server()
-            self._oauth_handler = handler_class(server)
+            view_class = None
+            if type(self).get_server is not OAuthViewMixin.get_server:
+                view_class = type(self)
+            self._oauth_handler = get_request_handler(
+                handler_class, self.get_server_class(), self.get_validator_class(),
+                factory=lambda: handler_class(self.get_server()), view_class=view_class)
         return self._oauth_handler
 
     def create_authorization_response(self, request, scopes, credentials, allow):
@@ -86,10 +95,26 @@ class OAuthViewMixin(object):
         handler = self.get_request_handler()
         return handler.create_token_response(request)
 
+    async def acreate_token_response(self, request):
+        handler = self.get_request_handler()
+        return await handler.acreate_token_response(request)
+
     def create_revocation_response(self, request):
         handler = self.get_request_handler()
         return handler.create_revocation_response(request)
 
+    async def acreate_revocation_response(self, request):
+        handler = self.get_request_handler()
+        return await handler.acreate_revocation_response(request)
+
+    def create_introspection_response(self, request):
+        handler = self.get_request_handler()
+        return handler.create_introspection_response(request)
+
+    def create_batch_introspection_response(self, request):
+        handler = self.get_request_handler()
+        return handler.create_batch_introspection_response(request)
+
     def validate_authorization_request(self, request):
         handler = self.get_request_handler()
         return handler.validate_authorization_request(request)
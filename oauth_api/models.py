@@ -1,14 +1,20 @@
+import re
+
 from django.apps import apps
+from django.contrib.auth.hashers import check_password
 from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from django.utils.translation import gettext_lazy as _
 
 
+from oauth_api.fields import ClientSecretField, ScopeMaskField, TokenDigestField, TokenField
 from oauth_api.generators import generate_client_id, generate_client_secret
+from oauth_api.scopes import get_scope_mask, get_scope_registry
 from oauth_api.settings import oauth_api_settings
-from oauth_api.utils import validate_uris
+from oauth_api.utils import compile_redirect_uris, is_hashed_client_secret, token_digest, validate_uris
 
 
 class AbstractApplication(models.Model):
@@ -46,9 +52,14 @@ class AbstractApplication(models.Model):
     client_type = models.CharField(max_length=32, choices=CLIENT_TYPES)
     authorization_grant_type = models.CharField(max_length=32,
                                                 choices=GRANT_TYPES)
-    client_secret = models.CharField(max_length=255, blank=True,
-                                     default=generate_client_secret)
+    client_secret = ClientSecretField(max_length=255, blank=True,
+                                      default=generate_client_secret)
     name = models.CharField(max_length=255, blank=True)
+    # Written in bulk by usage buffer, see `TRACK_USAGE`
+    last_used = models.DateTimeField('last used', blank=True, null=True, editable=False)
+    request_count = models.BigIntegerField('request count', default=0, editable=False)
+    # Plaintext of client secret hashed when saving this instance, see `HASH_CLIENT_SECRETS`
+    raw_client_secret = None
 
     class Meta:
         abstract = True
@@ -59,20 +70,37 @@ class AbstractApplication(models.Model):
             error = _('Redirect URIs required when {0} grant_type used')
             raise ValidationError(error.format(self.authorization_grant_type))
 
+    def get_redirect_uris(self):
+        """
+        Return compiled redirect uris of the application. Compiled uris are kept until `redirect_uris` changes.
+        """
+        compiled = self.__dict__.get('_redirect_uris')
+        if compiled is None or compiled.source != self.redirect_uris:
+            compiled = self._redirect_uris = compile_redirect_uris(self.redirect_uris)
+        return compiled
+
     @property
     def default_redirect_uri(self):
         """
         Returns the default redirect uri by extracting first in the list of uris.
         """
-        if self.redirect_uris:
-            return self.redirect_uris.split().pop(0)
-        return None
+        return self.get_redirect_uris().default
+
+    def check_client_secret(self, client_secret):
+        """
+        Check client secret against hashed or plaintext secret of the application in constant time.
+        """
+        if client_secret is None:
+            return False
+        if is_hashed_client_secret(self.client_secret):
+            return check_password(client_secret, self.client_secret)
+        return constant_time_compare(self.client_secret, client_secret)
 
     def redirect_uri_allowed(self, redirect_uri):
         """
         Check if redirect uri is valid for current application.
         """
-        return redirect_uri in self.redirect_uris.split()
+        return redirect_uri in self.get_redirect_uris()
 
     def __str__(self):
         return self.name
@@ -82,6 +110,59 @@ class Application(AbstractApplication):
     pass
 
 
+class TokenQuerySet(models.QuerySet):
+    def filter_token(self, token):
+        """
+        Filter by token value. Tokens are looked up by digest when `STORE_TOKEN_DIGESTS` is enabled.
+        """
+        if oauth_api_settings.STORE_TOKEN_DIGESTS:
+            return self.filter(**{self.model.TOKEN_DIGEST_FIELD: token_digest(token)})
+        return self.filter(**{self.model.TOKEN_FIELD: token})
+
+    def in_bulk_by_token(self, tokens):
+        """
+        Return dict mapping given token values to matching instances, loaded with a single query. Tokens are
+        looked up by digest when `STORE_TOKEN_DIGESTS` is enabled.
+        """
+        if oauth_api_settings.STORE_TOKEN_DIGESTS:
+            field = self.model.TOKEN_DIGEST_FIELD
+            values = {token_digest(token): token for token in tokens}
+        else:
+            field = self.model.TOKEN_FIELD
+            values = {token: token for token in tokens}
+        if not values:
+            return {}
+        queryset = self.filter(**{'{0}__in'.format(field): list(values)})
+        return {values[getattr(instance, field)]: instance for instance in queryset}
+
+
+class AccessTokenQuerySet(TokenQuerySet):
+    def with_scopes(self, scopes):
+        """
+        Filter tokens allowing all given scopes using scope mask column. Raises `ValueError` if any of the
+        scopes is missing from `SCOPES` setting.
+
+        Scope strings are matched instead when scope masks are disabled, see `ScopeRegistry`.
+        """
+        registry = get_scope_registry()
+        unknown = [scope for scope in scopes if scope not in registry.scopes]
+        if unknown:
+            raise ValueError('Unknown scopes: {0}'.format(' '.join(unknown)))
+
+        if not registry.enabled:
+            queryset = self
+            for scope in scopes:
+                queryset = queryset.filter(scope__regex=r'(^|\s){0}(\s|$)'.format(re.escape(scope)))
+            return queryset
+
+        mask = registry.get_mask(scopes)
+
+        masks = registry.get_masks_including(mask)
+        if masks is not None:
+            return self.filter(scope_mask__in=masks)
+        return self.alias(scope_mask_bits=models.F('scope_mask').bitand(mask)).filter(scope_mask_bits=mask)
+
+
 class AccessToken(models.Model):
     """
     This model represents the actual access token to access user's resources.
@@ -90,10 +171,30 @@ class AccessToken(models.Model):
     updated = models.DateTimeField('updated', auto_now=True)
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, blank=True, null=True)
-    token = models.TextField(db_index=True)
+    token = TokenField(db_index=True)
     application = models.ForeignKey(oauth_api_settings.APPLICATION_MODEL, on_delete=models.CASCADE, swappable=True)
     expires = models.DateTimeField()
     scope = models.TextField(blank=True)
+    scope_mask = ScopeMaskField(source='scope')
+    token_digest = TokenDigestField(source='token')
+    # Written in bulk by usage buffer, see `TRACK_USAGE`
+    last_used = models.DateTimeField('last used', blank=True, null=True, editable=False)
+
+    objects = AccessTokenQuerySet.as_manager()
+
+    TOKEN_FIELD = 'token'
+    TOKEN_DIGEST_FIELD = 'token_digest'
+
+    def get_scope_mask(self):
+        """
+        Return mask of token scopes, or None if token has scopes missing from `SCOPES` setting. Mask is
+        computed from `scope` once per instance.
+        """
+        scope, mask = self.__dict__.get('_scope_mask', (None, None))
+        if scope != self.scope:
+            mask = get_scope_mask(self.scope)
+            self._scope_mask = (self.scope, mask)
+        return mask
 
     def allow_scopes(self, scopes):
         """
@@ -102,6 +203,11 @@ class AccessToken(models.Model):
         if not scopes:
             return True
 
+        provided_mask = self.get_scope_mask()
+        resource_mask = get_scope_registry().get_mask(scopes)
+        if provided_mask is not None and resource_mask is not None:
+            return provided_mask & resource_mask == resource_mask
+
         provided_scopes = set(self.scope.split())
         resource_scopes = set(scopes)
 
@@ -130,11 +236,17 @@ class AuthorizationCode(models.Model):
     updated = models.DateTimeField('updated', auto_now=True)
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    code = models.TextField(db_index=True)
+    code = TokenField(db_index=True)
     application = models.ForeignKey(oauth_api_settings.APPLICATION_MODEL, on_delete=models.CASCADE, swappable=True)
     expires = models.DateTimeField()
     redirect_uri = models.CharField(max_length=255)
     scope = models.TextField(blank=True)
+    code_digest = TokenDigestField(source='code')
+
+    objects = TokenQuerySet.as_manager()
+
+    TOKEN_FIELD = 'code'
+    TOKEN_DIGEST_FIELD = 'code_digest'
 
     @property
     def is_expired(self):
@@ -155,10 +267,16 @@ class RefreshToken(models.Model):
     updated = models.DateTimeField('updated', auto_now=True)
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    token = models.TextField(db_index=True)
+    token = TokenField(db_index=True)
     expires = models.DateTimeField(null=True, blank=True)
     application = models.ForeignKey(oauth_api_settings.APPLICATION_MODEL, on_delete=models.CASCADE, swappable=True)
     access_token = models.OneToOneField(AccessToken, on_delete=models.CASCADE, related_name='refresh_token')
+    token_digest = TokenDigestField(source='token')
+
+    objects = TokenQuerySet.as_manager()
+
+    TOKEN_FIELD = 'token'
+    TOKEN_DIGEST_FIELD = 'token_digest'
 
     @property
     def is_expired(self):
@@ -172,9 +290,75 @@ class RefreshToken(models.Model):
     def revoke(self):
         """
         Revoke (delete) refresh token and related access token
+
+        Refresh token is deleted by cascade along with the access token. Returns number of deleted rows
+        and numbers of deleted rows by model, as `delete()` does.
         """
-        self.access_token.delete()
-        self.delete()
+        return self.access_token.delete()
+
+
+class TokenIndexQuerySet(models.QuerySet):
+    def filter_token(self, token):
+        """
+        Filter by token value
+        """
+        return self.filter(digest=token_digest(token))
+
+    def filter_grant(self, token):
+        """
+        Filter entries of the access token and refresh token issued together with given token
+        """
+        return self.filter(access_token__in=self.filter_token(token).values('access_token'))
+
+
+class TokenIndex(models.Model):
+    """
+    Index of access and refresh tokens by digest, resolving any token string with a single query
+    regardless of its type.
+
+    Entries are added when tokens are created and removed along with their access token. Entries
+    of refresh tokens deleted on their own are removed by `purge_expired_tokens`.
+    """
+    TYPE_ACCESS_TOKEN = 'access_token'
+    TYPE_REFRESH_TOKEN = 'refresh_token'
+    TOKEN_TYPES = (
+        (TYPE_ACCESS_TOKEN, _('Access token')),
+        (TYPE_REFRESH_TOKEN, _('Refresh token')),
+    )
+
+    digest = models.CharField(max_length=64, primary_key=True)
+    token_type = models.CharField(max_length=20, choices=TOKEN_TYPES)
+    token_id = models.BigIntegerField()
+    # Not enforced by database, so that tokens can be deleted with set-based deletes
+    access_token = models.ForeignKey(AccessToken, on_delete=models.DO_NOTHING, db_constraint=False,
+                                     related_name='+')
+    application = models.ForeignKey(oauth_api_settings.APPLICATION_MODEL, on_delete=models.DO_NOTHING,
+                                    db_constraint=False, related_name='+', swappable=True)
+
+    objects = TokenIndexQuerySet.as_manager()
+
+    def get_token_model(self):
+        if self.token_type == self.TYPE_REFRESH_TOKEN:
+            return RefreshToken
+        return AccessToken
+
+    def get_token(self):
+        """
+        Return indexed token instance, or None if the token no longer exists
+        """
+        model = self.get_token_model()
+        return model.objects.using(self._state.db).filter(pk=self.token_id, token_digest=self.digest).first()
+
+    @classmethod
+    def for_token(cls, token):
+        """
+        Return unsaved index entry for access or refresh token instance
+        """
+        if isinstance(token, RefreshToken):
+            return cls(digest=token.token_digest, token_type=cls.TYPE_REFRESH_TOKEN, token_id=token.pk,
+                       access_token_id=token.access_token_id, application_id=token.application_id)
+        return cls(digest=token.token_digest, token_type=cls.TYPE_ACCESS_TOKEN, token_id=token.pk,
+                   access_token_id=token.pk, application_id=token.application_id)
 
 
 def get_application_model():
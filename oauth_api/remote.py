@@ -0,0 +1,325 @@
+"""
+Verification of access tokens by resource servers without access to the authorization server database.
+
+Bearer tokens are verified by calling token introspection endpoint of the authorization server configured
+with `REMOTE_INTROSPECTION_URL`. Only settings of this package are needed, its models are never queried.
+"""
+import base64
+import http.client
+import json
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import urlencode, urlsplit
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from oauth_api.authentication import OAuth2Authentication
+from oauth_api.cache import LocalCache, SingleFlight
+from oauth_api.settings import APP_NAME, oauth_api_settings
+from oauth_api.utils import token_digest
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+class IntrospectionError(Exception):
+    """
+    Introspection server could not be reached or returned an invalid response
+    """
+    pass
+
+
+class IntrospectionUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Token could not be verified, try again later.'
+    default_code = 'introspection_unavailable'
+
+
+class RemoteUser(object):
+    """
+    User of a remotely verified token, known only by its username claim
+    """
+    is_active = True
+    is_anonymous = False
+    is_authenticated = True
+    is_staff = False
+    is_superuser = False
+    pk = None
+
+    def __init__(self, username):
+        self.username = username
+
+    def __str__(self):
+        return self.username or ''
+
+    def get_username(self):
+        return self.username
+
+
+class RemoteToken(object):
+    """
+    Access token verified by introspection endpoint, implementing the parts of `AccessToken` used by
+    `OAuth2ScopePermission`.
+    """
+    def __init__(self, token, claims):
+        self.token = token
+        self.claims = claims
+        self.scope = claims.get('scope', '')
+        self.client_id = claims.get('client_id')
+        exp = claims.get('exp')
+        self.expires = datetime.fromtimestamp(exp, tz=dt_timezone.utc) if exp is not None else None
+
+    @property
+    def is_expired(self):
+        """
+        Check if token has been expired.
+        """
+        return self.expires is not None and timezone.now() >= self.expires
+
+    def allow_scopes(self, scopes):
+        """
+        Check if token allows the provided scopes.
+        """
+        if not scopes:
+            return True
+        return set(scopes).issubset(self.scope.split())
+
+    def is_valid(self, scopes=None):
+        """
+        Check if access token is valid.
+        """
+        return not self.is_expired and self.allow_scopes(scopes)
+
+
+class IntrospectionClient(object):
+    """
+    HTTP client of a token introspection endpoint.
+
+    Each thread keeps its own connection open between requests. A request on a kept-alive connection
+    closed by the server is retried once on a new connection.
+    """
+    def __init__(self, url, client_id, client_secret, timeout):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ImproperlyConfigured('Invalid introspection URL: {0}'.format(url))
+
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or '/'
+        if parts.query:
+            self.path = '{0}?{1}'.format(self.path, parts.query)
+        self.timeout = timeout
+        credentials = '{0}:{1}'.format(client_id, client_secret).encode('utf-8')
+        self.headers = {
+            'Authorization': 'Basic {0}'.format(base64.b64encode(credentials).decode('ascii')),
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Accept': 'application/json',
+        }
+        self._local = threading.local()
+
+    def get_connection(self):
+        """
+        Return connection of current thread and boolean telling whether it has been used before.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            return connection, True
+        connection = self._local.connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+        return connection, False
+
+    def close(self):
+        """
+        Close connection of current thread.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def introspect(self, token):
+        """
+        Return introspection response of given access token. Raises `IntrospectionError` on failure.
+        """
+        body = urlencode({'token': token, 'token_type_hint': 'access_token'})
+        while True:
+            connection, reused = self.get_connection()
+            try:
+                connection.request('POST', self.path, body, self.headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError) as error:
+                self.close()
+                if reused:
+                    continue
+                raise IntrospectionError('Introspection request failed: {0!r}'.format(error)) from error
+
+            if response.will_close:
+                self.close()
+            if response.status != 200:
+                raise IntrospectionError('Introspection request failed with status {0}'.format(response.status))
+            try:
+                claims = json.loads(data)
+            except ValueError as error:
+                raise IntrospectionError('Invalid introspection response') from error
+            if not isinstance(claims, dict):
+                raise IntrospectionError('Invalid introspection response')
+            return claims
+
+
+class RemoteTokenVerifier(object):
+    """
+    Verify access tokens using an `IntrospectionClient`.
+
+    Results are kept in an in-process cache for `REMOTE_CACHE_TIMEOUT` seconds, results of inactive tokens
+    for `REMOTE_NEGATIVE_CACHE_TIMEOUT` seconds. Concurrent verifications of the same token make a single
+    introspection request.
+
+    When `REMOTE_FAIL_OPEN` is enabled and the introspection server is unavailable, tokens found active
+    within `REMOTE_STALE_TIMEOUT` seconds past their cache timeout are still accepted. Other tokens are
+    never accepted without a successful introspection.
+    """
+    def __init__(self, client, cache_size=0, cache_timeout=60, negative_cache_timeout=5, fail_open=False,
+                 stale_timeout=300):
+        self.client = client
+        self.cache_timeout = cache_timeout
+        self.negative_cache_timeout = negative_cache_timeout
+        self.fail_open = fail_open
+        self.stale_timeout = stale_timeout if fail_open else 0
+        self.cache = LocalCache(cache_size, cache_timeout + self.stale_timeout) if cache_size else None
+        self._calls = SingleFlight()
+
+    def verify(self, token):
+        """
+        Return claims of active token, or None if token is not active. Raises `IntrospectionError` if
+        introspection server is unavailable.
+        """
+        if self.cache is None:
+            return self._introspect(None, token)
+
+        key = token_digest(token)
+        entry = self.cache.get(key)
+        if entry is not None:
+            fresh_until, claims = entry
+            if fresh_until > time.monotonic():
+                return claims
+
+        try:
+            claims, shared = self._calls.do(key, lambda: self._introspect(key, token))
+        except IntrospectionError:
+            if self.fail_open and entry is not None and entry[1] is not None:
+                return entry[1]
+            raise
+        return claims
+
+    def _introspect(self, key, token):
+        response = self.client.introspect(token)
+        claims = response if response.get('active') is True else None
+
+        timeout = self.negative_cache_timeout
+        stale_timeout = 0
+        if claims is not None:
+            timeout = self.cache_timeout
+            stale_timeout = self.stale_timeout
+            exp = claims.get('exp')
+            if exp is not None:
+                lifetime = int(exp - time.time())
+                if lifetime <= 0:
+                    return None
+                timeout = min(timeout, lifetime)
+                stale_timeout = min(stale_timeout, lifetime - timeout)
+
+        if key is not None and timeout > 0:
+            self.cache.set(key, (time.monotonic() + timeout, claims), timeout + stale_timeout)
+        return claims
+
+
+def get_remote_verifier():
+    """
+    Return process-wide token verifier built from `REMOTE_*` settings.
+    """
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                url = oauth_api_settings.REMOTE_INTROSPECTION_URL
+                if not url:
+                    raise ImproperlyConfigured('REMOTE_INTROSPECTION_URL must be set to verify tokens remotely.')
+                client = IntrospectionClient(url, oauth_api_settings.REMOTE_CLIENT_ID,
+                                             oauth_api_settings.REMOTE_CLIENT_SECRET,
+                                             oauth_api_settings.REMOTE_TIMEOUT)
+                _verifier = RemoteTokenVerifier(
+                    client,
+                    cache_size=oauth_api_settings.REMOTE_CACHE_SIZE,
+                    cache_timeout=oauth_api_settings.REMOTE_CACHE_TIMEOUT,
+                    negative_cache_timeout=oauth_api_settings.REMOTE_NEGATIVE_CACHE_TIMEOUT,
+                    fail_open=oauth_api_settings.REMOTE_FAIL_OPEN,
+                    stale_timeout=oauth_api_settings.REMOTE_STALE_TIMEOUT,
+                )
+    return _verifier
+
+
+def clear_remote_verifier(*args, **kwargs):
+    """
+    Drop process-wide token verifier. Called automatically when OAuth API settings change.
+    """
+    global _verifier
+    if kwargs.get('setting', APP_NAME) == APP_NAME:
+        with _verifier_lock:
+            _verifier = None
+
+
+setting_changed.connect(clear_remote_verifier)
+
+
+class RemoteOAuth2Authentication(OAuth2Authentication):
+    """
+    OAuth2 authentication backend for resource servers, verifying bearer tokens with the introspection
+    endpoint of the authorization server. Only tokens sent in Authorization header are accepted.
+
+    Requests are rejected with 503 Service Unavailable when the token can not be verified, see
+    `REMOTE_FAIL_OPEN`.
+    """
+    def authenticate(self, request):
+        """
+        Authenticate the request
+        """
+        token = self.get_bearer_token(request)
+        if token is None:
+            return None
+
+        try:
+            claims = get_remote_verifier().verify(token)
+        except IntrospectionError:
+            raise IntrospectionUnavailable()
+        if claims is None:
+            return None
+
+        access_token = RemoteToken(token, claims)
+        if access_token.is_expired:
+            return None
+        return self.get_user(access_token), access_token
+
+    async def aauthenticate(self, request):
+        """
+        Authenticate the request from async code, introspection request is made in a thread
+        """
+        return await sync_to_async(self.authenticate, thread_sensitive=False)(request)
+
+    def get_user(self, access_token):
+        """
+        Return user of verified token, or None for tokens without username claim, such as tokens issued
+        with client credentials grant. Override to map the username claim to local users.
+        """
+        username = access_token.claims.get('username')
+        if username is None:
+            return None
+        return RemoteUser(username)
@@ -0,0 +1,91 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q, QuerySet
+
+from oauth_api.cache import introspection_cache, token_cache
+from oauth_api.models import AccessToken, AuthorizationCode, RefreshToken, TokenIndex
+from oauth_api.utils import delete_in_batches, token_digest
+
+
+def get_lookup(name, value):
+    """
+    Return lookup matching single instance or primary key, or any of multiple values
+    """
+    if isinstance(value, (QuerySet, list, tuple, set, frozenset)):
+        return '{0}__in'.format(name), value
+    return name, value
+
+
+def get_revocation_querysets(user=None, application=None, using=DEFAULT_DB_ALIAS):
+    """
+    Return querysets of tokens and codes issued to given user and/or application, in deletion order.
+
+    Both user and application may be an instance, a primary key or multiple of those. Refresh tokens
+    are deleted before access tokens. Refresh tokens of matching access tokens are included even if
+    the refresh token itself does not match.
+    """
+    if user is None and application is None:
+        raise ValueError('user or application is required')
+
+    filters = dict(get_lookup(name, value) for name, value in (('user', user), ('application', application))
+                   if value is not None)
+
+    access_token_filters = {'access_token__{0}'.format(name): value for name, value in filters.items()}
+    return (
+        ('refresh tokens', RefreshToken.objects.using(using).filter(Q(**filters) | Q(**access_token_filters))),
+        ('access tokens', AccessToken.objects.using(using).filter(**filters)),
+        ('authorization codes', AuthorizationCode.objects.using(using).filter(**filters)),
+    )
+
+
+def revoke_tokens(user=None, application=None, batch_size=1000, sleep=0, using=DEFAULT_DB_ALIAS):
+    """
+    Revoke all access tokens, refresh tokens and authorization codes issued to given user and/or application.
+
+    Rows are deleted with set-based DELETE statements of at most `batch_size` rows, without loading model
+    instances or sending delete signals. Revoked access tokens are removed from token cache after each
+    batch. Signed access tokens verified without database remain valid until they expire.
+
+    Returns list of (name, number of deleted rows) tuples.
+    """
+    def delete_index_entries(rows):
+        TokenIndex.objects.using(using).filter(digest__in=[row[1] for row in rows]).delete()
+
+    def invalidate(rows):
+        delete_index_entries(rows)
+        digests = [digest or token_digest(token) for pk, digest, token in rows]
+        token_cache.delete_many(digests)
+        introspection_cache.delete_many(digests)
+
+    results = []
+    for name, queryset in get_revocation_querysets(user, application, using):
+        if queryset.model is AccessToken:
+            count = delete_in_batches(queryset, batch_size=batch_size, sleep=sleep,
+                                      fields=('token_digest', 'token'), callback=invalidate)
+        elif queryset.model is RefreshToken:
+            count = delete_in_batches(queryset, batch_size=batch_size, sleep=sleep,
+                                      fields=('token_digest',), callback=delete_index_entries)
+        else:
+            count = delete_in_batches(queryset, batch_size=batch_size, sleep=sleep)
+        results.append((name, count))
+    return results
+
+
+def revoke_grant(access_token_ids, digests=(), refresh_tokens=True, using=DEFAULT_DB_ALIAS):
+    """
+    Revoke given access tokens, refresh tokens issued with them and their token index entries. Refresh
+    tokens are not looked up if `refresh_tokens` is False.
+
+    Rows are deleted in a single transaction with one DELETE statement per table, without loading model
+    instances or sending delete signals. Access tokens with given digests are removed from token cache.
+    """
+    if not access_token_ids:
+        return
+
+    with transaction.atomic(using=using, savepoint=False):
+        if refresh_tokens:
+            RefreshToken.objects.using(using).filter(access_token__in=access_token_ids)._raw_delete(using)
+        AccessToken.objects.using(using).filter(pk__in=access_token_ids)._raw_delete(using)
+        TokenIndex.objects.using(using).filter(access_token__in=access_token_ids)._raw_delete(using)
+
+    token_cache.delete_many(digests)
+    introspection_cache.delete_many(digests)
@@ -0,0 +1,173 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import caches
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import DEFAULT_DB_ALIAS
+
+from oauth_api.settings import oauth_api_settings
+from oauth_api.utils import token_digest
+
+
+_read_database = ContextVar('oauth_api_read_database', default=None)
+
+
+def get_read_database():
+    """
+    Return alias of a database configured with `READ_DATABASES` setting, or None if read replicas are disabled.
+    """
+    aliases = oauth_api_settings.READ_DATABASES
+    if not aliases:
+        return None
+    return random.choice(aliases)
+
+
+@contextmanager
+def using_read_database(alias):
+    """
+    Route reads within the block to database `alias` when `ReadReplicaRouter` is installed. None routes
+    reads to the database chosen by other routers.
+    """
+    token = _read_database.set(alias)
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+def get_lag_cache():
+    """
+    Return cache configured with `READ_REPLICA_LAG_CACHE` setting, or None if new tokens always fall back to
+    primary database.
+    """
+    if oauth_api_settings.READ_REPLICA_LAG is None:
+        return None
+    return caches[oauth_api_settings.READ_REPLICA_LAG_CACHE]
+
+
+def make_lag_key(token):
+    return '{0}{1}'.format(oauth_api_settings.READ_REPLICA_LAG_KEY_PREFIX, token_digest(token))
+
+
+def mark_written(tokens):
+    """
+    Mark tokens just written to primary database, so that lookups of them missing from read replicas fall back
+    to primary database for `READ_REPLICA_LAG` seconds.
+    """
+    cache = get_lag_cache()
+    if cache is not None and oauth_api_settings.READ_DATABASES:
+        cache.set_many({make_lag_key(token): True for token in tokens}, oauth_api_settings.READ_REPLICA_LAG)
+
+
+def recently_written(tokens):
+    """
+    Return list of given tokens which may not be replicated yet.
+    """
+    cache = get_lag_cache()
+    if cache is None or not tokens:
+        return list(tokens)
+    keys = {make_lag_key(token): token for token in tokens}
+    written = cache.get_many(list(keys))
+    return [token for key, token in keys.items() if key in written]
+
+
+async def arecently_written(tokens):
+    """
+    Async version of `recently_written`
+    """
+    cache = get_lag_cache()
+    if cache is None or not tokens:
+        return list(tokens)
+    keys = {make_lag_key(token): token for token in tokens}
+    written = await cache.aget_many(list(keys))
+    return [token for key, token in keys.items() if key in written]
+
+
+def read_replica_or_primary(loader, token=None):
+    """
+    Call `loader` with reads routed to a read replica. If the replica returns None or raises
+    `DoesNotExist`, `loader` is called again with reads routed to the primary database, so that objects
+    written moments ago are found regardless of replication lag.
+
+    When `token` is given, the primary database is only queried if the token was written within
+    `READ_REPLICA_LAG` seconds, see `mark_written`. Otherwise the result of the replica is final.
+    """
+    alias = get_read_database()
+    if alias is not None:
+        try:
+            with using_read_database(alias):
+                result = loader()
+        except ObjectDoesNotExist:
+            if token is not None and not recently_written([token]):
+                raise
+        else:
+            if result is not None or (token is not None and not recently_written([token])):
+                return result
+
+    with using_read_database(None):
+        return loader()
+
+
+async def aread_replica_or_primary(loader, token=None):
+    """
+    Async version of `read_replica_or_primary`, `loader` is a coroutine function.
+    """
+    alias = get_read_database()
+    if alias is not None:
+        try:
+            with using_read_database(alias):
+                result = await loader()
+        except ObjectDoesNotExist:
+            if token is not None and not await arecently_written([token]):
+                raise
+        else:
+            if result is not None or (token is not None and not await arecently_written([token])):
+                return result
+
+    with using_read_database(None):
+        return await loader()
+
+
+def read_replica_or_primary_bulk(loader, tokens):
+    """
+    Call `loader` with list of `tokens` with reads routed to a read replica. `loader` returns a dict of found
+    objects by token. Tokens the replica does not have and which were written within `READ_REPLICA_LAG`
+    seconds are passed to `loader` again with reads routed to the primary database.
+    """
+    alias = get_read_database()
+    found = {}
+    if alias is not None:
+        with using_read_database(alias):
+            found = loader(tokens)
+        tokens = recently_written([token for token in tokens if token not in found])
+        if not tokens:
+            return found
+
+    with using_read_database(None):
+        found.update(loader(tokens))
+    return found
+
+
+class ReadReplicaRouter(object):
+    """
+    Database router sending read-only token verification queries to read replicas.
+
+    Only reads made within `using_read_database()` are routed, everything else including token issuing
+    and revocation is left to other routers and the default database. Objects read from a replica, such as
+    users of verified tokens, are written to the default database and may be related to its objects.
+    """
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in oauth_api_settings.READ_DATABASES:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS}.union(oauth_api_settings.READ_DATABASES)
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
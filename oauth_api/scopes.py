@@ -0,0 +1,104 @@
+from oauth_api.settings import oauth_api_settings
+
+
+# Signed 64-bit column
+MAX_SCOPES = 63
+# Masks of scope combinations kept per registry
+MAX_CACHED_MASKS = 1024
+# Scope filters matching at most this many masks are looked up using the index of scope mask column
+MAX_INDEXED_MASKS = 64
+
+
+class ScopeRegistry(object):
+    """
+    Maps scopes to bits of integer scope masks.
+
+    Bits are assigned in order of `SCOPES` setting. Masks stored in database stay valid as long as new
+    scopes are appended to the setting, run `update_scope_masks` command after reordering or removing scopes.
+
+    Masks are disabled when there are more than `MAX_SCOPES` scopes. Tokens are then saved without a mask and
+    scopes are compared as strings.
+    """
+    def __init__(self, scopes):
+        self.scopes = scopes
+        self.enabled = len(scopes) <= MAX_SCOPES
+        self.bits = {scope: 1 << i for i, scope in enumerate(scopes)} if self.enabled else {}
+        self.full_mask = (1 << len(self.bits)) - 1
+        self._masks = {}
+
+    def get_mask(self, scopes):
+        """
+        Return mask of given scopes, or None if any of the scopes is not registered or masks are disabled.
+        """
+        key = tuple(scopes)
+        try:
+            return self._masks[key]
+        except KeyError:
+            pass
+
+        mask = 0
+        for scope in key:
+            bit = self.bits.get(scope)
+            if bit is None:
+                mask = None
+                break
+            mask |= bit
+        if len(self._masks) < MAX_CACHED_MASKS:
+            self._masks[key] = mask
+        return mask
+
+    def get_scopes(self, mask):
+        """
+        Return scopes of given mask.
+        """
+        return [scope for scope, bit in self.bits.items() if mask & bit]
+
+    def get_masks_including(self, mask):
+        """
+        Return all masks including bits of given mask, or None if there are more than `MAX_INDEXED_MASKS` of them.
+        """
+        free = self.full_mask & ~mask
+        if 1 << bin(free).count('1') > MAX_INDEXED_MASKS:
+            return None
+
+        masks = []
+        subset = free
+        while True:
+            masks.append(mask | subset)
+            if not subset:
+                return masks
+            subset = (subset - 1) & free
+
+
+_registry = None
+
+
+def get_scope_registry():
+    """
+    Return scope registry of current `SCOPES` setting.
+    """
+    global _registry
+    scopes = oauth_api_settings.SCOPES
+    registry = _registry
+    # Settings are reloaded into a new dict when changed
+    if registry is None or registry.scopes is not scopes:
+        registry = _registry = ScopeRegistry(scopes)
+    return registry
+
+
+def get_scope_mask(scope):
+    """
+    Return mask of space separated scope string, or None if it has scopes missing from `SCOPES` setting.
+    """
+    return get_scope_registry().get_mask(scope.split())
+
+
+def update_scope_masks(queryset):
+    """
+    Update scope masks of tokens in queryset from their scopes, with one UPDATE per distinct scope string.
+    Returns number of updated rows.
+    """
+    updated = 0
+    for scope in list(queryset.order_by().values_list('scope', flat=True).distinct()):
+        updated += queryset.filter(scope=scope).update(scope_mask=get_scope_mask(scope))
+    return updated
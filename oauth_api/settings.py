@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.core.signals import setting_changed
 from rest_framework.settings import APISettings
 
 APP_NAME = 'OAUTH_API'
@@ -8,16 +9,58 @@ USER_SETTINGS = getattr(settings, APP_NAME, None)
 DEFAULTS = {
     'ACCESS_TOKEN_EXPIRATION': 3600,  # Seconds
     'REFRESH_TOKEN_EXPIRATION': None,  # Seconds, (None == disabled)
+    'APPLICATION_CACHE': None,  # Alias of Django cache used for applications (None == disabled)
+    'APPLICATION_CACHE_KEY_PREFIX': 'oauth_api:application:',
+    'APPLICATION_CACHE_TIMEOUT': 300,  # Seconds
     'APPLICATION_MODEL': 'oauth_api.Application',
     'CLIENT_ID_GENERATOR': 'oauth_api.generators.ClientIdGenerator',
+    'CLIENT_SECRET_CACHE_SIZE': 1000,  # Successful hashed client secret checks kept per process (0 == disabled)
+    'CLIENT_SECRET_CACHE_TIMEOUT': 60,  # Seconds
     'CLIENT_SECRET_GENERATOR': 'oauth_api.generators.ClientSecretGenerator',
+    'CLIENT_SECRET_HASHER': 'default',  # Algorithm of PASSWORD_HASHERS used for client secrets ('default' == first)
     'DEFAULT_HANDLER_CLASS': 'oauth_api.handlers.OAuthHandler',
     'DEFAULT_SERVER_CLASS': 'oauthlib.oauth2.Server',
     'DEFAULT_VALIDATOR_CLASS': 'oauth_api.validators.OAuthValidator',
+    'EXECUTOR_MAX_WORKERS': None,  # Threads running OAuthLib for async views (None == ThreadPoolExecutor default)
+    'HASH_CLIENT_SECRETS': False,  # Store new and changed client secrets hashed, see hash_client_secrets command
+    'INTROSPECTION_BATCH_SIZE': 100,  # Most tokens accepted by a single batch introspection request
+    'INTROSPECTION_CACHE': None,  # Alias of Django cache used for introspection responses (None == disabled)
+    'INTROSPECTION_CACHE_KEY_PREFIX': 'oauth_api:introspection:',
+    'INTROSPECTION_CACHE_TIMEOUT': 60,  # Seconds, capped at remaining lifetime of the token
+    'READ_DATABASES': (),  # Aliases of read replicas used for token verification, see ReadReplicaRouter
+    'READ_REPLICA_LAG': 10,  # Seconds new tokens missing from read replicas are read from primary (None == always)
+    'READ_REPLICA_LAG_CACHE': 'default',  # Alias of Django cache marking tokens written within READ_REPLICA_LAG
+    'READ_REPLICA_LAG_KEY_PREFIX': 'oauth_api:written:',
+    'REMOTE_CACHE_SIZE': 10000,  # Introspection results kept per process by RemoteOAuth2Authentication (0 == disabled)
+    'REMOTE_CACHE_TIMEOUT': 60,  # Seconds, capped at remaining lifetime of the token
+    'REMOTE_CLIENT_ID': None,  # Confidential client used to call the introspection endpoint
+    'REMOTE_CLIENT_SECRET': None,
+    'REMOTE_FAIL_OPEN': False,  # Accept recently verified tokens when introspection server is unavailable
+    'REMOTE_INTROSPECTION_URL': None,  # Introspection endpoint of the authorization server, see oauth_api.remote
+    'REMOTE_NEGATIVE_CACHE_TIMEOUT': 5,  # Seconds inactive tokens are remembered
+    'REMOTE_STALE_TIMEOUT': 300,  # Seconds past REMOTE_CACHE_TIMEOUT results are used when failing open
+    'REMOTE_TIMEOUT': 2,  # Seconds to wait for introspection server
+    'REQUEST_HEADERS': None,  # Headers passed to OAuthLib besides Authorization and Content-Type (None == all of META)
     'SCOPES': {
         'read': 'Read access',
         'write': 'Write access',
-    }
+    },
+    'SIGNED_TOKEN_KEY_ID': None,  # Key used to sign new tokens (None == first of SIGNED_TOKEN_KEYS)
+    'SIGNED_TOKEN_KEYS': {},  # Key id to key mapping for signed access tokens, key ids must not contain dots
+    'SIGNED_TOKEN_STORE': True,  # Store signed access tokens for auditing
+    'STORE_TOKEN_DIGESTS': False,  # Store and look up tokens by digest only, raw tokens are not stored
+    'TOKEN_CACHE': None,  # Alias of Django cache used for verified access tokens (None == disabled)
+    'TOKEN_CACHE_KEY_PREFIX': 'oauth_api:token:',
+    'TOKEN_CACHE_TIMEOUT': 300,  # Seconds, capped at remaining lifetime of the token
+    'TOKEN_LOCAL_CACHE_SIZE': 0,  # Entries in per-process token cache (0 == disabled)
+    'TOKEN_LOCAL_CACHE_TIMEOUT': 5,  # Seconds, capped at remaining lifetime of the token
+    'TOKEN_NEGATIVE_CACHE_SIZE': 0,  # Rejected token digests kept per process (0 == disabled)
+    'TOKEN_NEGATIVE_CACHE_TIMEOUT': 10,  # Seconds
+    'TOKEN_DIGEST_KEY': None,  # Key for token digests (None == SECRET_KEY), changing it invalidates stored digests
+    'TRACK_USAGE': False,  # Record last use of access tokens and request counts of applications, see oauth_api.usage
+    'USAGE_BUFFER_SIZE': 10000,  # Tokens and applications buffered per process before usage is written
+    'USAGE_FLUSH_BATCH_SIZE': 500,  # Rows per UPDATE when writing buffered usage
+    'USAGE_FLUSH_INTERVAL': 60,  # Seconds between writes of buffered usage
 }
 
 
@@ -45,3 +88,11 @@ class OAuthApiSettings(APISettings):
 
 
 oauth_api_settings = OAuthApiSettings(USER_SETTINGS, DEFAULTS, IMPORT_STRINGS)
+
+
+def reload_oauth_api_settings(*args, **kwargs):
+    if kwargs['setting'] == APP_NAME:
+        oauth_api_settings.reload()
+
+
+setting_changed.connect(reload_oauth_api_settings)
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from oauth_api.cache import application_cache, introspection_cache, token_cache
+from oauth_api.models import AccessToken, RefreshToken, TokenIndex, get_application_model
+from oauth_api.utils import token_digest
+
+
+@receiver(post_save, sender=AccessToken)
+@receiver(post_delete, sender=AccessToken)
+def invalidate_access_token(sender, instance, **kwargs):
+    """
+    Remove changed or deleted access token from token and introspection caches. Also clears a negative
+    entry left by an earlier attempt to use the token before it was issued.
+    """
+    digests = [instance.token_digest or token_digest(instance.token)]
+    token_cache.delete_many(digests)
+    introspection_cache.delete_many(digests)
+
+
+@receiver(post_save, sender=AccessToken)
+@receiver(post_save, sender=RefreshToken)
+def index_token(sender, instance, created, using, **kwargs):
+    """
+    Add index entry of created access or refresh token.
+    """
+    if created and instance.token_digest:
+        TokenIndex.for_token(instance).save(using=using, force_insert=True)
+
+
+@receiver(post_delete, sender=AccessToken)
+def delete_token_index(sender, instance, using, **kwargs):
+    """
+    Remove index entries of deleted access token and its refresh token.
+    """
+    TokenIndex.objects.using(using).filter(access_token=instance.pk).delete()
+
+
+@receiver(post_save, sender=get_application_model())
+@receiver(post_delete, sender=get_application_model())
+def invalidate_application(sender, instance, **kwargs):
+    """
+    Remove changed or deleted application from application cache.
+    """
+    application_cache.delete(instance)
@@ -8,9 +8,15 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': 'example.sqlite',
-    }
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'example-replica.sqlite',
+    },
 }
 
+DATABASE_ROUTERS = ['oauth_api.routers.ReadReplicaRouter']
+
 ALLOWED_HOSTS = []
 TIME_ZONE = 'America/Chicago'
 LANGUAGE_CODE = 'en-us'
@@ -0,0 +1,152 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from oauth_api.authentication import OAuth2Authentication
+from oauth_api.cache import token_cache
+from oauth_api.handlers import OAuthHandler
+from oauth_api.models import get_application_model, AccessToken
+from oauth_api.tests.utils import TestCaseUtils
+
+
+Application = get_application_model()
+User = get_user_model()
+
+
+class TestOAuth2Authentication(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            user=cls.test_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+        )
+        cls.access_token = AccessToken.objects.create(user=cls.test_user, token='auth1234567890',
+                                                      application=cls.application,
+                                                      expires=timezone.now() + timezone.timedelta(days=1),
+                                                      scope='read write')
+        cls.factory = APIRequestFactory()
+
+    def authenticate(self, request):
+        parsers = [FormParser(), MultiPartParser(), JSONParser()]
+        return OAuth2Authentication().authenticate(Request(request, parsers=parsers))
+
+    def test_bearer_header_skips_oauthlib_parsing(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Bearer auth1234567890')
+        with mock.patch.object(OAuthHandler, 'verify_request') as verify_request:
+            user, token = self.authenticate(request)
+        verify_request.assert_not_called()
+        self.assertEqual(user, self.test_user)
+        self.assertEqual(token, self.access_token)
+
+    def test_bearer_header_case_insensitive(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION='bearer auth1234567890')
+        self.assertEqual(self.authenticate(request), (self.test_user, self.access_token))
+
+    def test_invalid_bearer_token(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Bearer invalid')
+        self.assertIsNone(self.authenticate(request))
+
+    def test_no_credentials(self):
+        request = self.factory.get('/')
+        with mock.patch.object(OAuthHandler, 'verify_request') as verify_request:
+            with self.assertNumQueries(0):
+                self.assertIsNone(self.authenticate(request))
+        verify_request.assert_not_called()
+
+    def test_other_authorization_scheme(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION=self.get_basic_auth('user', 'secret'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.authenticate(request))
+
+    def test_query_parameter(self):
+        request = self.factory.get('/?access_token=auth1234567890')
+        self.assertEqual(self.authenticate(request), (self.test_user, self.access_token))
+
+    def test_form_body_parameter(self):
+        request = self.factory.post('/', 'access_token=auth1234567890',
+                                    content_type='application/x-www-form-urlencoded')
+        self.assertEqual(self.authenticate(request), (self.test_user, self.access_token))
+
+        request = self.factory.post('/', {'access_token': 'auth1234567890'}, format='multipart')
+        self.assertEqual(self.authenticate(request), (self.test_user, self.access_token))
+
+    def test_json_body_not_parsed(self):
+        request = self.factory.post('/', {'access_token': 'auth1234567890'}, format='json')
+        with mock.patch.object(OAuthHandler, 'verify_request') as verify_request:
+            self.assertIsNone(self.authenticate(request))
+        verify_request.assert_not_called()
+
+
+class TestAsyncOAuth2Authentication(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            user=cls.test_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+        )
+        cls.access_token = AccessToken.objects.create(user=cls.test_user, token='auth1234567890',
+                                                      application=cls.application,
+                                                      expires=timezone.now() + timezone.timedelta(days=1),
+                                                      scope='read write')
+        cls.factory = RequestFactory()
+
+    def setUp(self):
+        token_cache.reset()
+
+    def authenticate(self, request):
+        return async_to_sync(OAuth2Authentication().aauthenticate)(request)
+
+    def test_bearer_header(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Bearer auth1234567890')
+        with mock.patch.object(OAuthHandler, 'verify_bearer_token') as verify_bearer_token:
+            user, token = self.authenticate(request)
+        verify_bearer_token.assert_not_called()
+        self.assertEqual(user, self.test_user)
+        self.assertEqual(token, self.access_token)
+
+    def test_invalid_bearer_token(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Bearer invalid')
+        self.assertIsNone(self.authenticate(request))
+
+    def test_expired_bearer_token(self):
+        self.access_token.expires = timezone.now() - timezone.timedelta(seconds=1)
+        self.access_token.save()
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Bearer auth1234567890')
+        self.assertIsNone(self.authenticate(request))
+
+    def test_no_credentials(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.authenticate(self.factory.get('/')))
+
+    def test_query_parameter(self):
+        request = self.factory.get('/?access_token=auth1234567890')
+        self.assertEqual(self.authenticate(request), (self.test_user, self.access_token))
+
+    @override_settings(OAUTH_API={'TOKEN_LOCAL_CACHE_SIZE': 10, 'TOKEN_NEGATIVE_CACHE_SIZE': 10})
+    def test_token_cache(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Bearer auth1234567890')
+        self.authenticate(request)
+
+        # Only user is loaded when token is cached
+        with self.assertNumQueries(1):
+            user, token = self.authenticate(request)
+        self.assertEqual(user, self.test_user)
+        self.assertEqual(token.pk, self.access_token.pk)
+
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Bearer invalid')
+        self.authenticate(request)
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.authenticate(request))
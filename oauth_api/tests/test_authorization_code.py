@@ -1,4 +1,5 @@
 from datetime import timedelta
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -9,10 +10,11 @@ from oauthlib.oauth2 import (InvalidClientIdError, MissingClientIdError,
 
 from rest_framework import status
 
-from oauth_api.models import get_application_model, AuthorizationCode, RefreshToken
+from oauth_api.models import get_application_model, AccessToken, AuthorizationCode, RefreshToken
 from oauth_api.settings import oauth_api_settings
 from oauth_api.tests.utils import TestCaseUtils
 from oauth_api.tests.views import RESPONSE_DATA
+from oauth_api.validators import OAuthValidator
 
 
 Application = get_application_model()
@@ -560,6 +562,48 @@ class TestAuthorizationCodeTokenView(BaseTest):
         response = self.client.post(reverse('oauth_api:token'), token_request)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_refresh_token_concurrent_request_fail(self):
+        """
+        Test for requesting access token using refresh token already used by a concurrent request
+        """
+        self.client.login(username='test_user', password='1234')
+        authorization_code = self.get_authorization_code()
+
+        token_request = {
+            'grant_type': 'authorization_code',
+            'code': authorization_code,
+            'redirect_uri': 'http://localhost',
+        }
+
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+
+        response = self.client.post(reverse('oauth_api:token'), token_request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue('refresh_token' in response.data)
+
+        token_request = {
+            'grant_type': 'refresh_token',
+            'refresh_token': response.data['refresh_token'],
+            'scope': response.data['scope'],
+        }
+
+        validate_refresh_token = OAuthValidator.validate_refresh_token
+
+        def validate_and_use_concurrently(validator, refresh_token, client, request, *args, **kwargs):
+            valid = validate_refresh_token(validator, refresh_token, client, request, *args, **kwargs)
+            # Concurrent request rotates the refresh token after it was validated by this one
+            RefreshToken.objects.get(pk=request.refresh_token_object.pk).revoke()
+            return valid
+
+        with mock.patch.object(OAuthValidator, 'validate_refresh_token', validate_and_use_concurrently):
+            response = self.client.post(reverse('oauth_api:token'), token_request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['error'], 'invalid_grant')
+        self.assertFalse(AccessToken.objects.exists())
+        self.assertFalse(RefreshToken.objects.exists())
+
     def test_refresh_token_expired(self):
         """
         Test for requesting access token using expired refresh token
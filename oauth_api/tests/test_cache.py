@@ -0,0 +1,357 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+
+from oauth_api.cache import LocalCache, SingleFlight, application_cache, token_cache
+from oauth_api.models import get_application_model, AccessToken, RefreshToken
+from oauth_api.tests.utils import TestCaseUtils
+from oauth_api.utils import token_digest
+
+
+Application = get_application_model()
+User = get_user_model()
+
+
+class TestLocalCache(SimpleTestCase):
+    def test_lru_eviction(self):
+        cache = LocalCache(max_size=2, timeout=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats(), {'hits': 3, 'misses': 1, 'evictions': 1, 'size': 2})
+
+    def test_expiration(self):
+        cache = LocalCache(max_size=10, timeout=60)
+        cache.set('a', 1, timeout=0.01)
+        cache.set('b', 2, timeout=0)
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 0)
+
+    def test_timeout_capped(self):
+        cache = LocalCache(max_size=10, timeout=0.01)
+        cache.set('a', 1, timeout=60)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+
+
+class TestSingleFlight(SimpleTestCase):
+    def test_concurrent_calls_coalesced(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def func():
+            calls.append(1)
+            release.wait(5)
+            return 'result'
+
+        def worker():
+            results.append(flight.do('key', func))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('result', False)] + [('result', True)] * 4)
+        self.assertEqual(flight.do('key', lambda: 'again'), ('again', False))
+
+    def test_error_shared(self):
+        flight = SingleFlight()
+
+        def func():
+            raise ValueError()
+
+        self.assertRaises(ValueError, flight.do, 'key', func)
+        self.assertEqual(flight.do('key', lambda: 1), (1, False))
+
+
+@override_settings(OAUTH_API={'TOKEN_CACHE': 'default'})
+class TestTokenCache(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.dev_user = User.objects.create_user('dev_user', 'dev_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            redirect_uris='http://localhost http://example.com',
+            user=cls.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+
+    def setUp(self):
+        cache.clear()
+        token_cache.reset()
+        self.access_token = AccessToken.objects.create(user=self.test_user, token='cached1234567890',
+                                                       application=self.application,
+                                                       expires=timezone.now() + timezone.timedelta(days=1),
+                                                       scope='read write')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer {0}'.format(self.access_token.token))
+
+    def test_verified_token_is_cached(self):
+        response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cached_token_related_objects(self):
+        token_cache.set(token_digest(self.access_token.token), self.access_token)
+
+        with self.assertNumQueries(0):
+            access_token = token_cache.get(token_digest(self.access_token.token), self.access_token.token)
+            self.assertEqual(access_token, self.access_token)
+            self.assertEqual(access_token.scope, 'read write')
+            self.assertEqual(access_token.expires, self.access_token.expires)
+            self.assertTrue(access_token.is_valid(['read']))
+
+        self.assertEqual(access_token.user, self.test_user)
+        self.assertEqual(access_token.application, self.application)
+
+    def test_timeout_capped_at_expiry(self):
+        self.assertEqual(token_cache.get_timeout(timezone.now() + timezone.timedelta(days=1)), 300)
+        self.assertLessEqual(token_cache.get_timeout(timezone.now() + timezone.timedelta(seconds=10)), 10)
+
+    def test_expired_token_is_not_cached(self):
+        self.access_token.expires = timezone.now() - timezone.timedelta(seconds=1)
+        self.access_token.save()
+
+        response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIsNone(token_cache.get(token_digest(self.access_token.token), self.access_token.token))
+
+    def test_revoked_token_is_invalidated(self):
+        self.client.get(reverse('resource-view'))
+
+        self.access_token.revoke()
+        response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_refresh_token_is_invalidated(self):
+        refresh_token = RefreshToken.objects.create(user=self.test_user, token='cachedrefresh1234567890',
+                                                    application=self.application,
+                                                    access_token=self.access_token)
+        self.client.get(reverse('resource-view'))
+
+        refresh_token.revoke()
+        response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_endpoint_invalidates(self):
+        self.client.get(reverse('resource-view'))
+
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        response = self.client.post(reverse('oauth_api:revoke-token'), {'token': self.access_token.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer {0}'.format(self.access_token.token))
+        response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_changed_token_is_invalidated(self):
+        self.client.get(reverse('resource-view'))
+
+        self.access_token.scope = 'read'
+        self.access_token.save()
+        response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(OAUTH_API={'TOKEN_LOCAL_CACHE_SIZE': 10})
+class TestLocalTokenCache(TestTokenCache):
+    def test_local_tier_only(self):
+        self.assertIsNone(token_cache.get_cache())
+        self.assertEqual(token_cache.local.max_size, 10)
+
+        self.client.get(reverse('resource-view'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('resource-view'))
+        self.assertEqual(token_cache.local.stats()['hits'], 1)
+
+    def test_concurrent_misses_coalesced(self):
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def loader():
+            calls.append(1)
+            release.wait(5)
+            return self.access_token
+
+        def worker():
+            results.append(token_cache.load(self.access_token.token, loader))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [self.access_token] * 5)
+        self.assertEqual(len({id(result) for result in results}), 5)
+
+
+@override_settings(OAUTH_API={'TOKEN_CACHE': 'default', 'TOKEN_LOCAL_CACHE_SIZE': 10})
+class TestTwoTierTokenCache(TestTokenCache):
+    def test_local_tier_before_shared_tier(self):
+        self.client.get(reverse('resource-view'))
+        cache.clear()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_local_tier_filled_from_shared_tier(self):
+        self.client.get(reverse('resource-view'))
+        token_cache.local.clear()
+
+        self.assertIsNotNone(token_cache.get(token_digest(self.access_token.token), self.access_token.token))
+        self.assertEqual(len(token_cache.local), 1)
+
+
+@override_settings(OAUTH_API={'TOKEN_NEGATIVE_CACHE_SIZE': 10})
+class TestNegativeTokenCache(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            redirect_uris='http://localhost http://example.com',
+            user=cls.test_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+
+    def setUp(self):
+        cache.clear()
+        token_cache.reset()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer unknown1234567890')
+
+    def create_access_token(self, expires):
+        return AccessToken.objects.create(user=self.test_user, token='unknown1234567890',
+                                          application=self.application, expires=expires, scope='read write')
+
+    def test_unknown_token_rejected_without_query(self):
+        response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(token_cache.rejected.stats()['size'], 1)
+
+    def test_expired_token_rejected_without_query(self):
+        self.create_access_token(timezone.now() - timezone.timedelta(seconds=1))
+        self.client.get(reverse('resource-view'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_issued_token_clears_negative_entry(self):
+        self.client.get(reverse('resource-view'))
+
+        self.create_access_token(timezone.now() + timezone.timedelta(days=1))
+        response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(OAUTH_API={'TOKEN_CACHE': 'default', 'TOKEN_NEGATIVE_CACHE_SIZE': 10})
+    def test_shared_negative_entry(self):
+        self.client.get(reverse('resource-view'))
+        token_cache.rejected.clear()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.create_access_token(timezone.now() + timezone.timedelta(days=1))
+        response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(OAUTH_API={'APPLICATION_CACHE': 'default'})
+class TestApplicationCache(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dev_user = User.objects.create_user('dev_user', 'dev_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            user=cls.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_by_client_id(self):
+        self.assertEqual(application_cache.get_by_client_id(self.application.client_id), self.application)
+
+        with self.assertNumQueries(0):
+            application = application_cache.get_by_client_id(self.application.client_id)
+            self.assertEqual(application, self.application)
+            self.assertEqual(application.client_secret, self.application.client_secret)
+            self.assertEqual(application_cache.get_by_pk(self.application.pk), self.application)
+
+    def test_unknown_application(self):
+        self.assertRaises(Application.DoesNotExist, application_cache.get_by_client_id, 'unknown')
+        self.assertRaises(Application.DoesNotExist, application_cache.get_by_pk, 0)
+
+    def test_invalidated_on_save(self):
+        application_cache.get_by_client_id(self.application.client_id)
+
+        self.application.name = 'Changed'
+        self.application.save()
+        self.assertEqual(application_cache.get_by_client_id(self.application.client_id).name, 'Changed')
+
+    def test_changed_client_id(self):
+        client_id = self.application.client_id
+        application_cache.get_by_client_id(client_id)
+
+        self.application.client_id = 'changed'
+        self.application.save()
+        self.assertRaises(Application.DoesNotExist, application_cache.get_by_client_id, client_id)
+        self.assertEqual(application_cache.get_by_client_id('changed'), self.application)
+
+    def test_invalidated_on_delete(self):
+        application_cache.get_by_client_id(self.application.client_id)
+
+        self.application.delete()
+        self.assertRaises(Application.DoesNotExist, application_cache.get_by_client_id, self.application.client_id)
+
+    def test_token_endpoint(self):
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        response = self.client.post(reverse('oauth_api:token'), {'grant_type': 'client_credentials'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Only access token and its token index entry are inserted
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('oauth_api:token'), {'grant_type': 'client_credentials'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,177 @@
+from io import StringIO
+
+from django.contrib.admin import AdminSite
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.management import call_command
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+
+from oauth_api.admin import ApplicationAdmin
+from oauth_api.cache import client_secret_cache
+from oauth_api.models import get_application_model
+from oauth_api.tests.utils import TestCaseUtils
+from oauth_api.utils import is_hashed_client_secret
+
+Application = get_application_model()
+User = get_user_model()
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, OAUTH_API={'HASH_CLIENT_SECRETS': True})
+class TestHashedClientSecrets(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dev_user = User.objects.create_user('dev_user', 'dev_user@example.com', '1234')
+
+    def setUp(self):
+        client_secret_cache.reset()
+        self.client_secret = 'secret1234567890'
+        self.application = Application.objects.create(
+            name='Test Application',
+            user=self.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+            client_secret=self.client_secret,
+        )
+
+    def post_token(self, client_secret, basic=True):
+        data = {'grant_type': 'client_credentials'}
+        if basic:
+            self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id, client_secret))
+        else:
+            data.update(client_id=self.application.client_id, client_secret=client_secret)
+        return self.client.post(reverse('oauth_api:token'), data)
+
+    def test_secret_hashed_on_save(self):
+        self.assertTrue(is_hashed_client_secret(self.application.client_secret))
+        self.assertEqual(self.application.raw_client_secret, self.client_secret)
+        self.application.refresh_from_db()
+        self.assertTrue(self.application.check_client_secret(self.client_secret))
+        self.assertFalse(self.application.check_client_secret('invalid'))
+
+    def test_hashed_secret_not_hashed_again(self):
+        hashed = self.application.client_secret
+        self.application.save()
+        self.assertEqual(self.application.client_secret, hashed)
+
+    def test_generated_secret_available(self):
+        application = Application.objects.create(
+            name='Generated Secret',
+            user=self.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        )
+        self.assertTrue(is_hashed_client_secret(application.client_secret))
+        self.assertTrue(application.check_client_secret(application.raw_client_secret))
+        self.assertIsNone(Application.objects.get(pk=application.pk).raw_client_secret)
+
+    def test_admin_shows_secret_once(self):
+        request = RequestFactory().post('/')
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        modeladmin = ApplicationAdmin(Application, AdminSite())
+        application = Application(
+            name='Admin Application',
+            user=self.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        )
+        client_secret = application.client_secret
+        modeladmin.save_model(request, application, None, False)
+        modeladmin.save_model(request, application, None, True)
+        self.assertEqual([str(message) for message in request._messages], [
+            'Client secret of Admin Application is {0}. Store it now, it will not be shown again.'.format(
+                client_secret)])
+
+    def test_basic_auth(self):
+        self.assertEqual(self.post_token(self.client_secret).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.post_token('invalid').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_body_auth(self):
+        self.assertEqual(self.post_token(self.client_secret, basic=False).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.post_token('invalid', basic=False).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_successful_check_cached(self):
+        self.assertTrue(client_secret_cache.check(self.application, self.client_secret))
+        self.assertTrue(client_secret_cache.check(self.application, self.client_secret))
+        self.assertEqual(client_secret_cache.local.stats()['hits'], 1)
+
+    def test_failed_check_not_cached(self):
+        self.assertFalse(client_secret_cache.check(self.application, 'invalid'))
+        self.assertFalse(client_secret_cache.check(self.application, 'invalid'))
+        self.assertEqual(client_secret_cache.local.stats()['hits'], 0)
+        self.assertEqual(len(client_secret_cache.local), 0)
+
+    def test_changed_secret_not_cached(self):
+        self.assertTrue(client_secret_cache.check(self.application, self.client_secret))
+        self.application.client_secret = 'changed1234567890'
+        self.application.save()
+        self.assertFalse(client_secret_cache.check(self.application, self.client_secret))
+        self.assertTrue(client_secret_cache.check(self.application, 'changed1234567890'))
+
+    @override_settings(OAUTH_API={'HASH_CLIENT_SECRETS': True, 'CLIENT_SECRET_CACHE_SIZE': 0})
+    def test_cache_disabled(self):
+        self.assertIsNone(client_secret_cache.local)
+        self.assertTrue(client_secret_cache.check(self.application, self.client_secret))
+
+
+class TestPlaintextClientSecrets(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dev_user = User.objects.create_user('dev_user', 'dev_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            user=cls.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        )
+
+    def setUp(self):
+        client_secret_cache.reset()
+
+    def test_secret_not_hashed(self):
+        self.assertFalse(is_hashed_client_secret(self.application.client_secret))
+        self.assertTrue(self.application.check_client_secret(self.application.client_secret))
+        self.assertFalse(self.application.check_client_secret('invalid'))
+        self.assertFalse(self.application.check_client_secret(None))
+
+    def test_plaintext_check_not_cached(self):
+        self.assertTrue(client_secret_cache.check(self.application, self.application.client_secret))
+        self.assertEqual(len(client_secret_cache.local), 0)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TestHashClientSecretsCommand(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dev_user = User.objects.create_user('dev_user', 'dev_user@example.com', '1234')
+        for i in range(3):
+            Application.objects.create(
+                name='Application {0}'.format(i),
+                user=cls.dev_user,
+                client_type=Application.CLIENT_CONFIDENTIAL,
+                authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+                client_secret='secret{0}'.format(i),
+            )
+
+    def hash_secrets(self, *args):
+        out = StringIO()
+        call_command('hash_client_secrets', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_hash_secrets(self):
+        self.assertIn('Hashed 3 client secrets in', self.hash_secrets())
+        for i, application in enumerate(Application.objects.order_by('pk')):
+            self.assertTrue(is_hashed_client_secret(application.client_secret))
+            self.assertTrue(application.check_client_secret('secret{0}'.format(i)))
+
+        self.assertIn('Hashed 0 client secrets in', self.hash_secrets())
+
+    def test_dry_run(self):
+        self.assertIn('Would hash 3 client secrets in', self.hash_secrets('--dry-run'))
+        self.assertFalse(any(is_hashed_client_secret(secret)
+                             for secret in Application.objects.values_list('client_secret', flat=True)))
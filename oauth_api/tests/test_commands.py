@@ -0,0 +1,188 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from oauth_api.models import get_application_model, AccessToken, AuthorizationCode, RefreshToken
+
+
+Application = get_application_model()
+User = get_user_model()
+
+
+class TestPurgeExpiredTokens(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            redirect_uris='http://localhost',
+            user=cls.test_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+
+        past = timezone.now() - timezone.timedelta(days=1)
+        future = timezone.now() + timezone.timedelta(days=1)
+
+        cls.expired = [cls.create_access_token('expired{0}'.format(i), past) for i in range(5)]
+        cls.valid = cls.create_access_token('valid', future)
+
+        # Expired access token with valid refresh token must be kept
+        cls.refreshable = cls.create_access_token('refreshable', past)
+        cls.refresh_token = cls.create_refresh_token('refresh', cls.refreshable, future)
+        cls.never_expiring = cls.create_access_token('never_expiring', past)
+        cls.never_expiring_refresh_token = cls.create_refresh_token('refresh_never', cls.never_expiring, None)
+
+        # Expired refresh token is deleted together with its expired access token
+        cls.unrefreshable = cls.create_access_token('unrefreshable', past)
+        cls.expired_refresh_token = cls.create_refresh_token('refresh_expired', cls.unrefreshable, past)
+
+        for code, expires in (('expired_code', past), ('valid_code', future)):
+            AuthorizationCode.objects.create(user=cls.test_user, code=code, application=cls.application,
+                                             expires=expires, redirect_uri='http://localhost')
+
+    @classmethod
+    def create_access_token(cls, token, expires):
+        return AccessToken.objects.create(user=cls.test_user, token=token, application=cls.application,
+                                          expires=expires, scope='read')
+
+    @classmethod
+    def create_refresh_token(cls, token, access_token, expires):
+        return RefreshToken.objects.create(user=cls.test_user, token=token, application=cls.application,
+                                           access_token=access_token, expires=expires)
+
+    def purge(self, *args):
+        out = StringIO()
+        call_command('purge_expired_tokens', *args, stdout=out)
+        return out.getvalue()
+
+    def test_purge(self):
+        output = self.purge('--batch-size', '2')
+        self.assertIn('Deleted 1 refresh tokens, 6 access tokens, 1 authorization codes in', output)
+
+        self.assertEqual(set(AccessToken.objects.values_list('token', flat=True)),
+                         {'valid', 'refreshable', 'never_expiring'})
+        self.assertEqual(set(RefreshToken.objects.values_list('token', flat=True)), {'refresh', 'refresh_never'})
+        self.assertEqual(list(AuthorizationCode.objects.values_list('code', flat=True)), ['valid_code'])
+
+        output = self.purge()
+        self.assertIn('Deleted 0 refresh tokens, 0 access tokens, 0 authorization codes in', output)
+
+    def test_dry_run(self):
+        output = self.purge('--dry-run')
+        self.assertIn('Would delete 1 refresh tokens, 6 access tokens, 1 authorization codes in', output)
+        self.assertEqual(AccessToken.objects.count(), 9)
+        self.assertEqual(RefreshToken.objects.count(), 3)
+        self.assertEqual(AuthorizationCode.objects.count(), 2)
+
+    def test_batches(self):
+        # SELECT and DELETE per batch, plus final SELECT per model. Token batches also delete their token
+        # index entries, and stale index entries are looked up once.
+        with self.assertNumQueries(4 + 10 + 3 + 1):
+            self.purge('--batch-size', '2', '--database', 'default')
+
+
+class TestRevokeTokensCommand(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.other_user = User.objects.create_user('other_user', 'other_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            redirect_uris='http://localhost',
+            user=cls.test_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+
+        expires = timezone.now() + timezone.timedelta(days=1)
+        for user in (cls.test_user, cls.other_user):
+            access_token = AccessToken.objects.create(user=user, token='{0}-access'.format(user.username),
+                                                      application=cls.application, expires=expires, scope='read')
+            RefreshToken.objects.create(user=user, token='{0}-refresh'.format(user.username),
+                                        application=cls.application, access_token=access_token)
+            AuthorizationCode.objects.create(user=user, code='{0}-code'.format(user.username),
+                                             application=cls.application, expires=expires,
+                                             redirect_uri='http://localhost')
+
+    def revoke(self, *args):
+        out = StringIO()
+        call_command('revoke_tokens', *args, stdout=out)
+        return out.getvalue()
+
+    def test_revoke_user(self):
+        output = self.revoke('--user', 'test_user', '--batch-size', '1')
+        self.assertIn('Deleted 1 refresh tokens, 1 access tokens, 1 authorization codes in', output)
+        self.assertEqual(list(AccessToken.objects.values_list('token', flat=True)), ['other_user-access'])
+
+    def test_revoke_application(self):
+        output = self.revoke('--application', self.application.client_id)
+        self.assertIn('Deleted 2 refresh tokens, 2 access tokens, 2 authorization codes in', output)
+        self.assertFalse(AccessToken.objects.exists())
+
+    def test_dry_run(self):
+        output = self.revoke('--user', 'other_user', '--application', self.application.client_id, '--dry-run')
+        self.assertIn('Would delete 1 refresh tokens, 1 access tokens, 1 authorization codes in', output)
+        self.assertEqual(AccessToken.objects.count(), 2)
+
+    def test_invalid_arguments(self):
+        with self.assertRaisesMessage(CommandError, 'Specify --user, --application or both.'):
+            self.revoke()
+        with self.assertRaisesMessage(CommandError, 'User "unknown" does not exist.'):
+            self.revoke('--user', 'unknown')
+        with self.assertRaisesMessage(CommandError, 'Application "unknown" does not exist.'):
+            self.revoke('--application', 'unknown')
+
+
+class TestClearRawTokensCommand(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            redirect_uris='http://localhost',
+            user=cls.test_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+
+        # Stored before STORE_TOKEN_DIGESTS was enabled
+        expires = timezone.now() + timezone.timedelta(days=1)
+        for i in range(3):
+            access_token = AccessToken.objects.create(user=cls.test_user, token='access{0}'.format(i),
+                                                      application=cls.application, expires=expires, scope='read')
+            RefreshToken.objects.create(user=cls.test_user, token='refresh{0}'.format(i),
+                                        application=cls.application, access_token=access_token)
+        AuthorizationCode.objects.create(user=cls.test_user, code='code', application=cls.application,
+                                         expires=expires, redirect_uri='http://localhost')
+        # Digest not backfilled yet
+        AccessToken.objects.filter(token='access2').update(token_digest='')
+
+    def clear(self, *args):
+        out = StringIO()
+        call_command('clear_raw_tokens', *args, stdout=out)
+        return out.getvalue()
+
+    @override_settings(OAUTH_API={'STORE_TOKEN_DIGESTS': True})
+    def test_clear(self):
+        output = self.clear('--batch-size', '1')
+        self.assertIn('Cleared raw values of 2 access tokens, 3 refresh tokens, 1 authorization codes in', output)
+        self.assertEqual(list(AccessToken.objects.exclude(token='').values_list('token', flat=True)), ['access2'])
+        self.assertFalse(RefreshToken.objects.exclude(token='').exists())
+        self.assertEqual(AuthorizationCode.objects.get().code, '')
+        self.assertTrue(AccessToken.objects.filter_token('access0').exists())
+
+    @override_settings(OAUTH_API={'STORE_TOKEN_DIGESTS': True})
+    def test_dry_run(self):
+        output = self.clear('--dry-run')
+        self.assertIn('Would clear raw values of 2 access tokens, 3 refresh tokens, 1 authorization codes in',
+                      output)
+        self.assertFalse(AccessToken.objects.filter(token='').exists())
+
+    def test_digests_not_stored(self):
+        with self.assertRaisesMessage(CommandError, 'STORE_TOKEN_DIGESTS must be enabled'):
+            self.clear()
+        self.assertFalse(AccessToken.objects.filter(token='').exists())
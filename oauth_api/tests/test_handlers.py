@@ -0,0 +1,79 @@
+from django.test import RequestFactory, TestCase, override_settings
+
+from oauthlib.oauth2 import Server, BackendApplicationServer
+from rest_framework.request import Request
+
+from oauth_api.handlers import OAuthHandler, get_request_handler
+from oauth_api.validators import OAuthValidator
+from oauth_api.views import TokenView
+
+
+class TestRequestHandlerCache(TestCase):
+    def test_handler_is_shared(self):
+        handler = get_request_handler()
+        self.assertIs(handler, get_request_handler())
+        self.assertIs(handler, get_request_handler(OAuthHandler, Server, OAuthValidator))
+        self.assertIsInstance(handler.server, Server)
+
+    def test_handler_per_server_class(self):
+        handler = get_request_handler(server_class=BackendApplicationServer)
+        self.assertIsNot(handler, get_request_handler())
+        self.assertIsInstance(handler.server, BackendApplicationServer)
+
+    def test_views_share_handler(self):
+        self.assertIs(TokenView().get_request_handler(), TokenView().get_request_handler())
+        self.assertIs(TokenView().get_request_handler(), get_request_handler())
+
+    def test_view_server_not_shared(self):
+        class CustomServerTokenView(TokenView):
+            def get_server(self):
+                return BackendApplicationServer(OAuthValidator())
+
+        handler = CustomServerTokenView().get_request_handler()
+        self.assertIsInstance(handler.server, BackendApplicationServer)
+        self.assertIsInstance(get_request_handler().server, Server)
+        self.assertIs(TokenView().get_request_handler(), get_request_handler())
+        self.assertIs(CustomServerTokenView().get_request_handler(), handler)
+
+    def test_handler_rebuilt_on_settings_change(self):
+        handler = get_request_handler()
+        with override_settings(OAUTH_API={'DEFAULT_SERVER_CLASS': 'oauthlib.oauth2.BackendApplicationServer'}):
+            overridden = get_request_handler()
+            self.assertIsNot(handler, overridden)
+            self.assertIsInstance(overridden.server, BackendApplicationServer)
+        self.assertIsNot(handler, get_request_handler())
+        self.assertIsInstance(get_request_handler().server, Server)
+
+
+class TestExtractHeaders(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get_headers(self, request):
+        uri, method, data, headers = OAuthHandler(Server(OAuthValidator())).extract_params(request)
+        return headers
+
+    def test_all_headers_by_default(self):
+        request = self.factory.post('/', HTTP_AUTHORIZATION='Basic abc', HTTP_X_FORWARDED_FOR='127.0.0.1')
+        headers = self.get_headers(request)
+        self.assertEqual(headers['Authorization'], 'Basic abc')
+        self.assertEqual(headers['HTTP_X_FORWARDED_FOR'], '127.0.0.1')
+        self.assertIn('SERVER_NAME', headers)
+        self.assertNotIn('wsgi.input', headers)
+        self.assertNotIn('wsgi.errors', headers)
+
+    @override_settings(OAUTH_API={'REQUEST_HEADERS': ['Origin']})
+    def test_allowed_headers(self):
+        request = self.factory.post('/', {'grant_type': 'password'}, HTTP_AUTHORIZATION='Basic abc',
+                                    HTTP_ORIGIN='https://example.com', HTTP_X_FORWARDED_FOR='127.0.0.1')
+        self.assertEqual(self.get_headers(request), {
+            'Authorization': 'Basic abc',
+            'Content-Type': request.META['CONTENT_TYPE'],
+            'Origin': 'https://example.com',
+        })
+
+    @override_settings(OAUTH_API={'REQUEST_HEADERS': []})
+    def test_missing_headers_omitted(self):
+        self.assertEqual(self.get_headers(self.factory.get('/')), {})
+        headers = self.get_headers(Request(self.factory.get('/', HTTP_AUTHORIZATION='Bearer abc')))
+        self.assertEqual(headers, {'Authorization': 'Bearer abc'})
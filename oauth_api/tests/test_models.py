@@ -87,6 +87,48 @@ class TestModels(TestCase):
 
         self.assertFalse(app.redirect_uri_allowed('http://invalid.local.host'))
 
+    def test_no_redirect_uris(self):
+        app = Appliation(
+            name='Test App',
+            redirect_uris='',
+            user=self.dev_user,
+            client_type=Appliation.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Appliation.GRANT_CLIENT_CREDENTIALS
+        )
+
+        self.assertIsNone(app.default_redirect_uri)
+        self.assertFalse(app.redirect_uri_allowed(''))
+
+    def test_changed_redirect_uris(self):
+        app = Appliation(
+            name='Test App',
+            redirect_uris='http://localhost http://example.com',
+            user=self.dev_user,
+            client_type=Appliation.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Appliation.GRANT_AUTHORIZATION_CODE
+        )
+        compiled = app.get_redirect_uris()
+        self.assertIs(app.get_redirect_uris(), compiled)
+
+        app.redirect_uris = 'http://example.com\nhttp://localhost/callback'
+        self.assertEqual(app.default_redirect_uri, 'http://example.com')
+        self.assertTrue(app.redirect_uri_allowed('http://localhost/callback'))
+        self.assertFalse(app.redirect_uri_allowed('http://localhost'))
+
+    def test_redirect_uris_shared(self):
+        redirect_uris = ' '.join('http://example.com/{0}'.format(i) for i in range(500))
+        app = Appliation.objects.create(
+            name='Test App',
+            redirect_uris=redirect_uris,
+            user=self.dev_user,
+            client_type=Appliation.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Appliation.GRANT_AUTHORIZATION_CODE
+        )
+        loaded = Appliation.objects.get(pk=app.pk)
+
+        self.assertIs(loaded.get_redirect_uris(), app.get_redirect_uris())
+        self.assertTrue(loaded.redirect_uri_allowed('http://example.com/499'))
+
     def test_grant_authorization_code(self):
         app = Appliation(
             name='Test App',
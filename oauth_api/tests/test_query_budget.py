@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+
+from oauth_api.models import get_application_model, AccessToken, AuthorizationCode, RefreshToken
+from oauth_api.tests.utils import TestCaseUtils
+
+
+Application = get_application_model()
+User = get_user_model()
+
+
+class TestQueryBudget(TestCaseUtils):
+    """
+    Maximum number of queries executed by each flow. Lower these when optimizing, raise only with a reason.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.dev_user = User.objects.create_user('dev_user', 'dev_user@example.com', '1234')
+        cls.applications = {}
+        for grant_type in (Application.GRANT_AUTHORIZATION_CODE, Application.GRANT_PASSWORD,
+                           Application.GRANT_CLIENT_CREDENTIALS):
+            cls.applications[grant_type] = Application.objects.create(
+                name=grant_type,
+                redirect_uris='http://localhost http://example.com',
+                user=cls.dev_user,
+                client_type=Application.CLIENT_CONFIDENTIAL,
+                authorization_grant_type=grant_type,
+            )
+        cls.application = cls.applications[Application.GRANT_AUTHORIZATION_CODE]
+
+    def create_access_token(self):
+        return AccessToken.objects.create(user=self.test_user, token='budget1234567890', application=self.application,
+                                          expires=timezone.now() + timezone.timedelta(days=1), scope='read write')
+
+    def post_token(self, grant_type, data):
+        application = self.applications[grant_type]
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(application.client_id,
+                                                                       application.client_secret))
+        response = self.client.post(reverse('oauth_api:token'), data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_authorization_code(self):
+        code = AuthorizationCode.objects.create(user=self.test_user, code='code1234567890',
+                                                application=self.application, redirect_uri='http://localhost',
+                                                expires=timezone.now() + timezone.timedelta(days=1),
+                                                scope='read write')
+        # Access and refresh token are inserted with their token index entries
+        with self.assertMaxQueries(7):
+            self.post_token(Application.GRANT_AUTHORIZATION_CODE, {
+                'grant_type': 'authorization_code',
+                'code': code.code,
+                'redirect_uri': 'http://localhost',
+            })
+
+    def test_password(self):
+        with self.assertMaxQueries(6):
+            self.post_token(Application.GRANT_PASSWORD, {
+                'grant_type': 'password',
+                'username': 'test_user',
+                'password': '1234',
+            })
+
+    def test_client_credentials(self):
+        with self.assertMaxQueries(3):
+            self.post_token(Application.GRANT_CLIENT_CREDENTIALS, {'grant_type': 'client_credentials'})
+
+    def test_refresh_token(self):
+        refresh_token = RefreshToken.objects.create(user=self.test_user, token='refresh1234567890',
+                                                    application=self.application,
+                                                    access_token=self.create_access_token())
+        with self.assertMaxQueries(9):
+            self.post_token(Application.GRANT_AUTHORIZATION_CODE, {
+                'grant_type': 'refresh_token',
+                'refresh_token': refresh_token.token,
+            })
+
+    def test_revocation(self):
+        access_token = self.create_access_token()
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        with self.assertMaxQueries(4):
+            response = self.client.post(reverse('oauth_api:revoke-token'), {'token': access_token.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bearer_token(self):
+        access_token = self.create_access_token()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer {0}'.format(access_token.token))
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_consent_page(self):
+        self.client.force_login(self.test_user)
+        data = {
+            'client_id': self.application.client_id,
+            'redirect_uri': 'http://localhost',
+            'response_type': 'code',
+            'state': 'random_state_string',
+            'scopes': 'read write',
+        }
+        # Session and user are loaded by middleware
+        with self.assertMaxQueries(4):
+            response = self.client.get(reverse('oauth_api:authorize'), data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_budget_exceeded(self):
+        with self.assertRaisesMessage(AssertionError, '2 queries executed, at most 1 expected'):
+            with self.assertMaxQueries(1):
+                User.objects.count()
+                Application.objects.count()
@@ -0,0 +1,180 @@
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APISimpleTestCase
+
+from oauth_api.remote import (IntrospectionClient, IntrospectionError, RemoteOAuth2Authentication, RemoteToken,
+                              RemoteTokenVerifier, get_remote_verifier)
+from oauth_api.tests.utils import IntrospectionServer
+from oauth_api.utils import token_digest
+
+
+def active_response(scope='read write', expires_in=3600):
+    return {
+        'active': True,
+        'scope': scope,
+        'client_id': 'client1234567890',
+        'username': 'test_user',
+        'token_type': 'Bearer',
+        'exp': int(time.time()) + expires_in,
+    }
+
+
+class RemoteTestCase(APISimpleTestCase):
+    def setUp(self):
+        self.server = IntrospectionServer(active_response()).start()
+        self.addCleanup(self.server.stop)
+        settings = override_settings(OAUTH_API=self.get_settings())
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get_settings(self, **kwargs):
+        settings = {
+            'REMOTE_INTROSPECTION_URL': self.server.url,
+            'REMOTE_CLIENT_ID': 'resource_server',
+            'REMOTE_CLIENT_SECRET': 'secret1234567890',
+        }
+        settings.update(kwargs)
+        return settings
+
+    def get_resource(self, token='remote1234567890'):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer {0}'.format(token))
+        return self.client.get(reverse('resource-remote-view'))
+
+
+class TestRemoteOAuth2Authentication(RemoteTestCase):
+    def test_active_token(self):
+        response = self.get_resource()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.server.requests, [{'token': ['remote1234567890'], 'token_type_hint': ['access_token']}])
+
+    def test_inactive_token(self):
+        self.server.response = {'active': False}
+        self.assertEqual(self.get_resource().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token(self):
+        self.server.response = active_response(expires_in=-1)
+        self.assertEqual(self.get_resource().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_missing_scope(self):
+        self.server.response = active_response(scope='read')
+        self.assertEqual(self.get_resource().status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_token_without_username(self):
+        claims = active_response()
+        del claims['username']
+        self.server.response = claims
+        self.assertEqual(self.get_resource().status_code, status.HTTP_200_OK)
+        self.assertIsNone(RemoteOAuth2Authentication().get_user(RemoteToken('remote1234567890', claims)))
+
+    def test_without_token(self):
+        self.assertEqual(self.client.get(reverse('resource-remote-view')).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.server.requests, [])
+
+    def test_result_cached(self):
+        for i in range(3):
+            self.assertEqual(self.get_resource().status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_server_error(self):
+        self.server.status = 500
+        self.assertEqual(self.get_resource().status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_server_unavailable(self):
+        stopped = IntrospectionServer().start()
+        stopped.stop()
+        with override_settings(OAUTH_API=self.get_settings(REMOTE_INTROSPECTION_URL=stopped.url)):
+            self.assertEqual(self.get_resource().status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_not_configured(self):
+        with override_settings(OAUTH_API={}):
+            self.assertRaises(ImproperlyConfigured, get_remote_verifier)
+
+
+class TestIntrospectionClient(RemoteTestCase):
+    def get_client(self):
+        return IntrospectionClient(self.server.url, 'resource_server', 'secret1234567890', timeout=2)
+
+    def test_connection_reused(self):
+        client = self.get_client()
+        for i in range(3):
+            self.assertTrue(client.introspect('remote1234567890')['active'])
+        self.assertEqual(self.server.connections, 1)
+
+    def test_reconnect(self):
+        # Server closes connection after each response
+        self.server.keep_alive = False
+        client = self.get_client()
+        for i in range(3):
+            self.assertTrue(client.introspect('remote1234567890')['active'])
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_invalid_response(self):
+        self.server.response = 'invalid'
+        self.server.status = 401
+        self.assertRaises(IntrospectionError, self.get_client().introspect, 'remote1234567890')
+
+    def test_non_object_response(self):
+        for response in (['active'], 'active', True, None):
+            self.server.response = response
+            self.assertRaises(IntrospectionError, self.get_client().introspect, 'remote1234567890')
+
+    def test_invalid_url(self):
+        self.assertRaises(ImproperlyConfigured, IntrospectionClient, 'ftp://localhost/', 'id', 'secret', 2)
+
+
+class TestRemoteTokenVerifier(RemoteTestCase):
+    def get_verifier(self, **kwargs):
+        client = IntrospectionClient(self.server.url, 'resource_server', 'secret1234567890', timeout=2)
+        kwargs.setdefault('cache_size', 100)
+        return RemoteTokenVerifier(client, **kwargs)
+
+    def test_concurrent_requests_coalesced(self):
+        self.server.delay = 0.2
+        verifier = self.get_verifier()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(verifier.verify('remote1234567890')))
+                   for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(claims['active'] for claims in results))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_inactive_cached(self):
+        self.server.response = {'active': False}
+        verifier = self.get_verifier()
+        self.assertIsNone(verifier.verify('remote1234567890'))
+        self.assertIsNone(verifier.verify('remote1234567890'))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_cache_disabled(self):
+        verifier = self.get_verifier(cache_size=0)
+        verifier.verify('remote1234567890')
+        verifier.verify('remote1234567890')
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_fail_closed(self):
+        verifier = self.get_verifier()
+        claims = verifier.verify('remote1234567890')
+        # Entry is no longer fresh
+        verifier.cache.set(token_digest('remote1234567890'), (time.monotonic() - 1, claims))
+        self.server.status = 500
+        self.assertRaises(IntrospectionError, verifier.verify, 'remote1234567890')
+
+    def test_fail_open(self):
+        verifier = self.get_verifier(fail_open=True)
+        claims = verifier.verify('remote1234567890')
+        verifier.cache.set(token_digest('remote1234567890'), (time.monotonic() - 1, claims))
+        self.server.status = 500
+        self.assertEqual(verifier.verify('remote1234567890'), claims)
+        # Unknown tokens are never accepted
+        self.assertRaises(IntrospectionError, verifier.verify, 'unknown1234567890')
@@ -0,0 +1,140 @@
+from django.contrib.admin import AdminSite
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from oauth_api.admin import AccessTokenAdmin, ApplicationAdmin, revoke_application_tokens, revoke_user_tokens
+from oauth_api.cache import token_cache
+from oauth_api.models import get_application_model, AccessToken, AuthorizationCode, RefreshToken
+from oauth_api.revocation import get_revocation_querysets, revoke_tokens
+from oauth_api.validators import OAuthValidator
+
+
+Application = get_application_model()
+User = get_user_model()
+
+
+class RevocationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.other_user = User.objects.create_user('other_user', 'other_user@example.com', '1234')
+        cls.application = cls.create_application('Test Application')
+        cls.other_application = cls.create_application('Other Application')
+
+        for user in (cls.test_user, cls.other_user):
+            for application in (cls.application, cls.other_application):
+                name = '{0}-{1}'.format(user.username, application.pk)
+                for i in range(3):
+                    access_token = cls.create_access_token('{0}-access{1}'.format(name, i), user, application)
+                    RefreshToken.objects.create(user=user, token='{0}-refresh{1}'.format(name, i),
+                                                application=application, access_token=access_token)
+                cls.create_access_token('{0}-access'.format(name), user, application)
+                AuthorizationCode.objects.create(user=user, code='{0}-code'.format(name), application=application,
+                                                 expires=timezone.now() + timezone.timedelta(days=1),
+                                                 redirect_uri='http://localhost')
+
+    @classmethod
+    def create_application(cls, name):
+        return Application.objects.create(
+            name=name,
+            redirect_uris='http://localhost',
+            user=cls.test_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+
+    @classmethod
+    def create_access_token(cls, token, user, application):
+        return AccessToken.objects.create(user=user, token=token, application=application, scope='read',
+                                          expires=timezone.now() + timezone.timedelta(days=1))
+
+    def assertRemaining(self, user, application, access_tokens, refresh_tokens, codes):
+        filters = {'user': user, 'application': application}
+        self.assertEqual(AccessToken.objects.filter(**filters).count(), access_tokens)
+        self.assertEqual(RefreshToken.objects.filter(**filters).count(), refresh_tokens)
+        self.assertEqual(AuthorizationCode.objects.filter(**filters).count(), codes)
+
+
+class TestRevokeTokens(RevocationTestCase):
+    def test_revoke_user(self):
+        results = revoke_tokens(user=self.test_user, batch_size=2)
+        self.assertEqual(results, [('refresh tokens', 6), ('access tokens', 8), ('authorization codes', 2)])
+        self.assertRemaining(self.test_user, self.application, 0, 0, 0)
+        self.assertRemaining(self.test_user, self.other_application, 0, 0, 0)
+        self.assertRemaining(self.other_user, self.application, 4, 3, 1)
+
+    def test_revoke_application(self):
+        results = revoke_tokens(application=self.application)
+        self.assertEqual(results, [('refresh tokens', 6), ('access tokens', 8), ('authorization codes', 2)])
+        self.assertRemaining(self.test_user, self.application, 0, 0, 0)
+        self.assertRemaining(self.other_user, self.application, 0, 0, 0)
+        self.assertRemaining(self.test_user, self.other_application, 4, 3, 1)
+
+    def test_revoke_user_and_application(self):
+        results = revoke_tokens(user=self.test_user, application=self.application)
+        self.assertEqual(results, [('refresh tokens', 3), ('access tokens', 4), ('authorization codes', 1)])
+        self.assertRemaining(self.test_user, self.application, 0, 0, 0)
+        self.assertRemaining(self.test_user, self.other_application, 4, 3, 1)
+        self.assertRemaining(self.other_user, self.application, 4, 3, 1)
+
+    def test_revoke_multiple_users(self):
+        results = revoke_tokens(user=[self.test_user.pk, self.other_user.pk], application=self.application)
+        self.assertEqual(results, [('refresh tokens', 6), ('access tokens', 8), ('authorization codes', 2)])
+
+    def test_refresh_token_of_other_user(self):
+        # Refresh token is deleted with its access token even if the refresh token does not match
+        access_token = self.create_access_token('mismatch', self.test_user, self.application)
+        RefreshToken.objects.create(user=self.other_user, token='mismatch-refresh', application=self.application,
+                                    access_token=access_token)
+        revoke_tokens(user=self.test_user)
+        self.assertFalse(RefreshToken.objects.filter(token='mismatch-refresh').exists())
+
+    def test_set_based_deletes(self):
+        # Select and delete per batch of each model, one empty select per model, and token index entries of
+        # refresh and access tokens
+        with self.assertNumQueries(3 * 2 + 3 + 2):
+            revoke_tokens(user=self.test_user, application=self.application)
+
+    def test_dry_run_querysets(self):
+        counts = [(name, queryset.count()) for name, queryset in get_revocation_querysets(user=self.test_user)]
+        self.assertEqual(counts, [('refresh tokens', 6), ('access tokens', 8), ('authorization codes', 2)])
+        self.assertEqual(AccessToken.objects.count(), 16)
+
+    def test_user_or_application_required(self):
+        with self.assertRaises(ValueError):
+            revoke_tokens()
+
+    @override_settings(OAUTH_API={'TOKEN_LOCAL_CACHE_SIZE': 100})
+    def test_token_cache_invalidated(self):
+        token_cache.reset()
+        validator = OAuthValidator()
+        token = 'test_user-{0}-access'.format(self.application.pk)
+        self.assertIsNotNone(validator._get_access_token(token))
+
+        revoke_tokens(user=self.test_user)
+        with self.assertNumQueries(1):
+            self.assertIsNone(validator._get_access_token(token))
+
+
+class TestRevocationAdminActions(RevocationTestCase):
+    def setUp(self):
+        self.request = RequestFactory().post('/')
+        self.request.session = {}
+        self.request._messages = FallbackStorage(self.request)
+
+    def test_revoke_application_tokens(self):
+        modeladmin = ApplicationAdmin(Application, AdminSite())
+        revoke_application_tokens(modeladmin, self.request, Application.objects.filter(pk=self.application.pk))
+        self.assertFalse(AccessToken.objects.filter(application=self.application).exists())
+        self.assertEqual(AccessToken.objects.filter(application=self.other_application).count(), 8)
+        self.assertEqual([str(message) for message in self.request._messages],
+                         ['Revoked 6 refresh tokens, 8 access tokens, 2 authorization codes.'])
+
+    def test_revoke_user_tokens(self):
+        modeladmin = AccessTokenAdmin(AccessToken, AdminSite())
+        queryset = AccessToken.objects.filter(user=self.other_user, token__endswith='-access')
+        revoke_user_tokens(modeladmin, self.request, queryset)
+        self.assertFalse(AccessToken.objects.filter(user=self.other_user).exists())
+        self.assertEqual(AccessToken.objects.filter(user=self.test_user).count(), 8)
@@ -0,0 +1,164 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+
+from oauth_api.cache import application_cache
+from oauth_api.models import get_application_model, AccessToken
+from oauth_api.routers import mark_written, read_replica_or_primary, read_replica_or_primary_bulk, using_read_database
+from oauth_api.tests.utils import TestCaseUtils
+from oauth_api.validators import OAuthValidator
+
+Application = get_application_model()
+User = get_user_model()
+
+
+@override_settings(OAUTH_API={'READ_DATABASES': ['replica']})
+class TestReadReplicaRouting(TestCaseUtils):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            redirect_uris='http://localhost',
+            user=cls.test_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        )
+        # Replicate user and application
+        cls.test_user.save(using='replica', force_insert=True)
+        cls.application.save(using='replica', force_insert=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_access_token(self, token, using='default'):
+        return AccessToken.objects.using(using).create(user=self.test_user, token=token,
+                                                       application=self.application,
+                                                       expires=timezone.now() + timezone.timedelta(days=1),
+                                                       scope='read write')
+
+    def get_resource(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer {0}'.format(token))
+        return self.client.get(reverse('resource-view'))
+
+    def test_router(self):
+        with using_read_database('replica'):
+            self.assertEqual(AccessToken.objects.all().db, 'replica')
+        self.assertEqual(AccessToken.objects.all().db, 'default')
+
+    def test_token_read_from_replica(self):
+        self.create_access_token('replicated1234567890', using='replica')
+        with self.assertNumQueries(1, using='replica'), self.assertNumQueries(0, using='default'):
+            response = self.get_resource('replicated1234567890')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_primary_fallback(self):
+        # Token issued moments ago and not yet replicated is found from primary database
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        token = self.client.post(reverse('oauth_api:token'), {'grant_type': 'client_credentials'}).data['access_token']
+        with self.assertNumQueries(1, using='replica'), self.assertNumQueries(1, using='default'):
+            response = self.get_resource(token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unknown_token(self):
+        with self.assertNumQueries(1, using='replica'), self.assertNumQueries(0, using='default'):
+            response = self.get_resource('unknown1234567890')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_outside_lag_window(self):
+        # Token missing from replica long after it was issued is not looked up from primary database
+        self.create_access_token('unreplicated1234567890')
+        with self.assertNumQueries(1, using='replica'), self.assertNumQueries(0, using='default'):
+            response = self.get_resource('unreplicated1234567890')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(OAUTH_API={'READ_DATABASES': ['replica'], 'READ_REPLICA_LAG': None})
+    def test_lag_window_disabled(self):
+        self.create_access_token('fresh1234567890')
+        with self.assertNumQueries(1, using='replica'), self.assertNumQueries(1, using='default'):
+            response = self.get_resource('fresh1234567890')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_async_primary_fallback(self):
+        access_token = self.create_access_token('fresh1234567890')
+        mark_written(['fresh1234567890'])
+        validator = OAuthValidator()
+        with self.assertNumQueries(1, using='replica'), self.assertNumQueries(1, using='default'):
+            loaded = async_to_sync(validator._aload_access_token)('fresh1234567890')
+        self.assertEqual(loaded, access_token)
+
+    def test_bulk_primary_fallback(self):
+        replicated = self.create_access_token('replicated1234567890', using='replica')
+        fresh = self.create_access_token('fresh1234567890')
+        mark_written(['fresh1234567890', 'unknown1234567890'])
+        self.create_access_token('unreplicated1234567890')
+        tokens = ['replicated1234567890', 'fresh1234567890', 'unknown1234567890', 'unreplicated1234567890']
+        # Only recently written tokens missing from replica are looked up from primary database
+        with self.assertNumQueries(1, using='replica'), self.assertNumQueries(1, using='default'):
+            loaded = read_replica_or_primary_bulk(AccessToken.objects.in_bulk_by_token, tokens)
+        self.assertEqual(loaded, {'replicated1234567890': replicated, 'fresh1234567890': fresh})
+
+    def test_token_issued_on_primary(self):
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        with self.assertNumQueries(0, using='replica'):
+            response = self.client.post(reverse('oauth_api:token'), {'grant_type': 'client_credentials'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(AccessToken.objects.using('default').filter_token(response.data['access_token']).exists())
+
+    def test_token_revoked_on_primary(self):
+        access_token = self.create_access_token('revoked1234567890')
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        with self.assertNumQueries(0, using='replica'):
+            response = self.client.post(reverse('oauth_api:revoke-token'), {'token': access_token.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(AccessToken.objects.using('default').filter(pk=access_token.pk).exists())
+
+    def test_replica_user_saved_to_primary(self):
+        self.create_access_token('replicated1234567890', using='replica')
+        request = RequestFactory().get('/')
+        self.assertTrue(OAuthValidator().validate_bearer_token('replicated1234567890', ['read'], request))
+        self.assertEqual(request.user._state.db, 'replica')
+
+        request.user.first_name = 'Changed'
+        request.user.save()
+        self.assertEqual(User.objects.using('default').get(pk=self.test_user.pk).first_name, 'Changed')
+        self.assertEqual(User.objects.using('replica').get(pk=self.test_user.pk).first_name, '')
+
+    @override_settings(OAUTH_API={'READ_DATABASES': ['replica'], 'APPLICATION_CACHE': 'default'})
+    def test_cached_replica_application(self):
+        application = application_cache.get_by_client_id(self.application.client_id, replica=True)
+        self.assertEqual(application._state.db, 'replica')
+        cached = application_cache.get_by_client_id(self.application.client_id)
+        self.assertEqual(cached._state.db, 'default')
+
+        # Cached application is related to tokens issued on primary database
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        response = self.client.post(reverse('oauth_api:token'), {'grant_type': 'client_credentials'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_application_read_from_replica(self):
+        with self.assertNumQueries(1, using='replica'), self.assertNumQueries(0, using='default'):
+            application = application_cache.get_by_client_id(self.application.client_id, replica=True)
+        self.assertEqual(application, self.application)
+
+    def test_application_not_found(self):
+        with self.assertNumQueries(1, using='replica'), self.assertNumQueries(1, using='default'):
+            self.assertRaises(Application.DoesNotExist, application_cache.get_by_pk, 0, replica=True)
+
+    def test_replicas_disabled(self):
+        self.create_access_token('replicated1234567890', using='replica')
+        with override_settings(OAUTH_API={}):
+            with self.assertNumQueries(0, using='replica'):
+                self.assertIsNone(read_replica_or_primary(
+                    AccessToken.objects.filter_token('replicated1234567890').first))
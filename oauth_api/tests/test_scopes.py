@@ -1,11 +1,17 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework import status
 from rest_framework.test import APIRequestFactory
 
 from oauth_api.models import get_application_model, AuthorizationCode, AccessToken
+from oauth_api.scopes import ScopeRegistry, get_scope_registry
 from oauth_api.tests.utils import TestCaseUtils
 from oauth_api.tests.views import RESPONSE_DATA, ResourceNoScopesView
 
@@ -305,3 +311,92 @@ class TestScopesResourceViews(BaseTest):
         view = ResourceNoScopesView.as_view()
 
         self.assertRaises(ImproperlyConfigured, view, request)
+
+
+class TestScopeRegistry(SimpleTestCase):
+    def test_bits_in_setting_order(self):
+        registry = get_scope_registry()
+        self.assertEqual(registry.bits, {'scope1': 1, 'read': 2, 'write': 4})
+        self.assertEqual(registry.get_mask(['write', 'read']), 6)
+        self.assertEqual(registry.get_mask([]), 0)
+        self.assertIsNone(registry.get_mask(['read', 'invalid']))
+        self.assertEqual(registry.get_scopes(5), ['scope1', 'write'])
+
+    def test_masks_including(self):
+        registry = get_scope_registry()
+        self.assertEqual(sorted(registry.get_masks_including(4)), [4, 5, 6, 7])
+        self.assertEqual(registry.get_masks_including(7), [7])
+
+    def test_too_many_masks(self):
+        registry = ScopeRegistry(['scope{0}'.format(i) for i in range(10)])
+        self.assertIsNone(registry.get_masks_including(1))
+
+    def test_too_many_scopes(self):
+        registry = ScopeRegistry(['scope{0}'.format(i) for i in range(64)])
+        self.assertFalse(registry.enabled)
+        self.assertIsNone(registry.get_mask(['scope1']))
+
+    def test_registry_follows_setting(self):
+        with override_settings(OAUTH_API={'SCOPES': {'write': 'Write', 'read': 'Read'}}):
+            self.assertEqual(get_scope_registry().bits, {'write': 1, 'read': 2})
+
+
+class TestScopeMasks(BaseTest):
+    def create_access_token(self, token, scope):
+        return AccessToken.objects.create(user=self.test_user, token=token, application=self.application,
+                                          expires=timezone.now() + timezone.timedelta(days=1), scope=scope)
+
+    def test_mask_saved(self):
+        self.assertEqual(self.create_access_token('read1234567890', 'read write').scope_mask, 6)
+        self.assertIsNone(self.create_access_token('unknown1234567890', 'read unknown').scope_mask)
+
+    def test_allow_scopes(self):
+        access_token = self.create_access_token('read1234567890', 'read write')
+        self.assertTrue(access_token.allow_scopes(['read']))
+        self.assertFalse(access_token.allow_scopes(['read', 'scope1']))
+        # Scopes missing from SCOPES setting are checked against scope string
+        self.assertFalse(access_token.allow_scopes(['read', 'unknown']))
+        self.assertTrue(self.create_access_token('unknown1234567890', 'read unknown').allow_scopes(['unknown']))
+
+    def test_changed_scope(self):
+        access_token = self.create_access_token('read1234567890', 'read')
+        self.assertFalse(access_token.allow_scopes(['write']))
+        access_token.scope = 'read write'
+        self.assertTrue(access_token.allow_scopes(['write']))
+
+    def test_with_scopes(self):
+        read = self.create_access_token('read1234567890', 'read')
+        write = self.create_access_token('write1234567890', 'write')
+        read_write = self.create_access_token('readwrite1234567890', 'read write')
+        self.assertEqual(set(AccessToken.objects.with_scopes(['write'])), {write, read_write})
+        self.assertEqual(set(AccessToken.objects.with_scopes(['read', 'write'])), {read_write})
+        self.assertEqual(set(AccessToken.objects.with_scopes([])), {read, write, read_write})
+        self.assertRaises(ValueError, AccessToken.objects.with_scopes, ['invalid'])
+
+    def test_with_scopes_bitand(self):
+        scopes = {'scope{0}'.format(i): 'Scope {0}'.format(i) for i in range(10)}
+        with override_settings(OAUTH_API={'SCOPES': scopes}):
+            access_token = self.create_access_token('scope1234567890', 'scope1 scope9')
+            self.create_access_token('other1234567890', 'scope1')
+            self.assertEqual(list(AccessToken.objects.with_scopes(['scope9'])), [access_token])
+
+    def test_too_many_scopes(self):
+        scopes = {'scope{0}'.format(i): 'Scope {0}'.format(i) for i in range(64)}
+        with override_settings(OAUTH_API={'SCOPES': scopes}):
+            access_token = self.create_access_token('scope1234567890', 'scope1 scope63')
+            other = self.create_access_token('other1234567890', 'scope11')
+            self.assertIsNone(access_token.scope_mask)
+            self.assertTrue(access_token.allow_scopes(['scope63', 'scope1']))
+            self.assertFalse(other.allow_scopes(['scope1']))
+            self.assertEqual(list(AccessToken.objects.with_scopes(['scope1'])), [access_token])
+            self.assertEqual(set(AccessToken.objects.with_scopes(['scope11'])), {other})
+            self.assertRaises(ValueError, AccessToken.objects.with_scopes, ['invalid'])
+
+    def test_update_scope_masks(self):
+        access_token = self.create_access_token('read1234567890', 'read write')
+        with override_settings(OAUTH_API={'SCOPES': {'write': 'Write', 'read': 'Read'}}):
+            out = StringIO()
+            call_command('update_scope_masks', stdout=out)
+            self.assertIn('Updated 1 access tokens in', out.getvalue())
+        access_token.refresh_from_db()
+        self.assertEqual(access_token.scope_mask, 3)
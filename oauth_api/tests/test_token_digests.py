@@ -0,0 +1,134 @@
+import importlib
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+
+from oauth_api.models import get_application_model, AccessToken, AuthorizationCode, RefreshToken
+from oauth_api.tests.utils import TestCaseUtils
+from oauth_api.utils import token_digest
+
+
+Application = get_application_model()
+User = get_user_model()
+
+
+class BaseTest(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.dev_user = User.objects.create_user('dev_user', 'dev_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            redirect_uris='http://localhost http://example.com',
+            user=cls.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+
+    def create_tokens(self):
+        access_token = AccessToken.objects.create(user=self.test_user, token='access1234567890',
+                                                  application=self.application,
+                                                  expires=timezone.now() + timezone.timedelta(days=1),
+                                                  scope='read write')
+        refresh_token = RefreshToken.objects.create(user=self.test_user, token='refresh1234567890',
+                                                    application=self.application, access_token=access_token)
+        return access_token, refresh_token
+
+
+class TestTokenDigests(BaseTest):
+    def test_digest_stored(self):
+        access_token, refresh_token = self.create_tokens()
+
+        access_token = AccessToken.objects.get(pk=access_token.pk)
+        self.assertEqual(access_token.token, 'access1234567890')
+        self.assertEqual(access_token.token_digest, token_digest('access1234567890'))
+        self.assertEqual(len(access_token.token_digest), 64)
+        self.assertEqual(RefreshToken.objects.get(pk=refresh_token.pk).token_digest,
+                         token_digest('refresh1234567890'))
+
+    def test_filter_token(self):
+        access_token, refresh_token = self.create_tokens()
+        self.assertEqual(AccessToken.objects.filter_token('access1234567890').get(), access_token)
+        self.assertFalse(AccessToken.objects.filter_token('refresh1234567890').exists())
+
+    def test_digest_key(self):
+        digest = token_digest('access1234567890')
+        with override_settings(OAUTH_API={'TOKEN_DIGEST_KEY': 'other-key'}):
+            self.assertNotEqual(token_digest('access1234567890'), digest)
+
+    def test_backfill_migration(self):
+        access_token, refresh_token = self.create_tokens()
+        AccessToken.objects.update(token_digest='')
+        RefreshToken.objects.update(token_digest='')
+
+        migration = importlib.import_module('oauth_api.migrations.0007_token_digests')
+        schema_editor = type('SchemaEditor', (), {'connection': connection})
+        migration.backfill_digests(apps, schema_editor)
+
+        self.assertEqual(AccessToken.objects.get(pk=access_token.pk).token_digest,
+                         token_digest('access1234567890'))
+        self.assertEqual(RefreshToken.objects.get(pk=refresh_token.pk).token_digest,
+                         token_digest('refresh1234567890'))
+
+
+@override_settings(OAUTH_API={'STORE_TOKEN_DIGESTS': True})
+class TestStoreTokenDigests(BaseTest):
+    def test_raw_token_not_stored(self):
+        access_token, refresh_token = self.create_tokens()
+
+        self.assertEqual(access_token.token, 'access1234567890')
+        self.assertFalse(AccessToken.objects.filter(token='access1234567890').exists())
+        self.assertEqual(AccessToken.objects.get(pk=access_token.pk).token, '')
+        self.assertEqual(AccessToken.objects.filter_token('access1234567890').get(), access_token)
+        self.assertEqual(RefreshToken.objects.filter_token('refresh1234567890').get(), refresh_token)
+
+    def test_digest_kept_on_resave(self):
+        access_token, refresh_token = self.create_tokens()
+
+        access_token = AccessToken.objects.get(pk=access_token.pk)
+        access_token.scope = 'read'
+        access_token.save()
+        self.assertEqual(AccessToken.objects.filter_token('access1234567890').get(), access_token)
+
+    def test_authorization_code_flow(self):
+        self.client.login(username='test_user', password='1234')
+        authorization_code = self.get_authorization_code()
+        self.assertEqual(AuthorizationCode.objects.filter_token(authorization_code).get().code, '')
+
+        access_token = self.get_access_token(authorization_code)
+        self.assertFalse(AuthorizationCode.objects.filter_token(authorization_code).exists())
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer {0}'.format(access_token))
+        response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_refresh_token(self):
+        access_token, refresh_token = self.create_tokens()
+
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        data = {
+            'grant_type': 'refresh_token',
+            'refresh_token': 'refresh1234567890',
+        }
+        response = self.client.post(reverse('oauth_api:token'), data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(AccessToken.objects.filter(pk=access_token.pk).exists())
+        self.assertFalse(RefreshToken.objects.filter(pk=refresh_token.pk).exists())
+        self.assertTrue(AccessToken.objects.filter_token(response.data['access_token']).exists())
+
+    def test_revoke_token(self):
+        access_token, refresh_token = self.create_tokens()
+
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        response = self.client.post(reverse('oauth_api:revoke-token'), {'token': 'refresh1234567890'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(AccessToken.objects.filter(pk=access_token.pk).exists())
+        self.assertFalse(RefreshToken.objects.filter(pk=refresh_token.pk).exists())
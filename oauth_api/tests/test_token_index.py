@@ -0,0 +1,152 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+
+from oauth_api.models import get_application_model, AccessToken, RefreshToken, TokenIndex
+from oauth_api.tests.utils import TestCaseUtils
+
+Application = get_application_model()
+User = get_user_model()
+
+
+class TokenIndexTestCase(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.application = cls.create_application('Test Application')
+        cls.other_application = cls.create_application('Other Application')
+
+    @classmethod
+    def create_application(cls, name):
+        return Application.objects.create(
+            name=name,
+            redirect_uris='http://localhost',
+            user=cls.test_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+
+    def create_tokens(self, name, application=None):
+        application = application or self.application
+        access_token = AccessToken.objects.create(user=self.test_user, token='{0}-access'.format(name),
+                                                  application=application,
+                                                  expires=timezone.now() + timezone.timedelta(days=1),
+                                                  scope='read write')
+        refresh_token = RefreshToken.objects.create(user=self.test_user, token='{0}-refresh'.format(name),
+                                                    application=application, access_token=access_token)
+        return access_token, refresh_token
+
+    def revoke(self, data, application=None):
+        application = application or self.application
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(application.client_id,
+                                                                       application.client_secret))
+        return self.client.post(reverse('oauth_api:revoke-token'), data)
+
+
+class TestTokenIndex(TokenIndexTestCase):
+    def test_entries_created(self):
+        access_token, refresh_token = self.create_tokens('created')
+
+        entry = TokenIndex.objects.filter_token(access_token.token).get()
+        self.assertEqual(entry.token_type, TokenIndex.TYPE_ACCESS_TOKEN)
+        self.assertEqual(entry.get_token(), access_token)
+
+        entry = TokenIndex.objects.filter_token(refresh_token.token).get()
+        self.assertEqual(entry.token_type, TokenIndex.TYPE_REFRESH_TOKEN)
+        self.assertEqual(entry.access_token_id, access_token.pk)
+        self.assertEqual(entry.application_id, self.application.pk)
+        self.assertEqual(entry.get_token(), refresh_token)
+
+    def test_filter_grant(self):
+        access_token, refresh_token = self.create_tokens('grant')
+        self.create_tokens('other')
+
+        for token in (access_token.token, refresh_token.token):
+            digests = set(TokenIndex.objects.filter_grant(token).values_list('digest', flat=True))
+            self.assertEqual(digests, {access_token.token_digest, refresh_token.token_digest})
+
+    def test_entries_deleted_with_access_token(self):
+        access_token, refresh_token = self.create_tokens('deleted')
+        access_token.delete()
+        self.assertFalse(TokenIndex.objects.filter(access_token=access_token.pk).exists())
+
+    def test_get_deleted_token(self):
+        access_token, refresh_token = self.create_tokens('stale')
+        entry = TokenIndex.objects.filter_token(refresh_token.token).get()
+        RefreshToken.objects.filter(pk=refresh_token.pk).delete()
+        self.assertIsNone(entry.get_token())
+
+    def test_purge_stale_entries(self):
+        access_token, refresh_token = self.create_tokens('stale')
+        RefreshToken.objects.filter(pk=refresh_token.pk).delete()
+
+        call_command('purge_expired_tokens', stdout=StringIO())
+        self.assertFalse(TokenIndex.objects.filter_token(refresh_token.token).exists())
+        self.assertTrue(TokenIndex.objects.filter_token(access_token.token).exists())
+
+
+class TestRevocation(TokenIndexTestCase):
+    def test_revoke_without_hint(self):
+        access_token, refresh_token = self.create_tokens('hintless')
+        response = self.revoke({'token': refresh_token.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(AccessToken.objects.filter(pk=access_token.pk).exists())
+        self.assertFalse(RefreshToken.objects.filter(pk=refresh_token.pk).exists())
+        self.assertFalse(TokenIndex.objects.filter(access_token=access_token.pk).exists())
+
+    def test_revoke_with_wrong_hint(self):
+        access_token, refresh_token = self.create_tokens('wrong-hint')
+        response = self.revoke({'token': access_token.token, 'token_type_hint': 'refresh_token'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(AccessToken.objects.filter(pk=access_token.pk).exists())
+        self.assertFalse(RefreshToken.objects.filter(pk=refresh_token.pk).exists())
+
+    def test_revoke_token_of_other_application(self):
+        access_token, refresh_token = self.create_tokens('other', application=self.other_application)
+        response = self.revoke({'token': refresh_token.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(AccessToken.objects.filter(pk=access_token.pk).exists())
+        self.assertTrue(RefreshToken.objects.filter(pk=refresh_token.pk).exists())
+
+    def test_query_count(self):
+        # Client lookup, index lookup, and one DELETE per table
+        access_token, refresh_token = self.create_tokens('queries')
+        with self.assertNumQueries(5):
+            response = self.revoke({'token': refresh_token.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_revoke_token_missing_from_index(self):
+        # Tokens created with bulk_create are not indexed
+        access_token, refresh_token = self.create_tokens('unindexed')
+        TokenIndex.objects.filter(access_token=access_token.pk).delete()
+        response = self.revoke({'token': refresh_token.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(AccessToken.objects.filter(pk=access_token.pk).exists())
+        self.assertFalse(RefreshToken.objects.filter(pk=refresh_token.pk).exists())
+
+        access_token, refresh_token = self.create_tokens('unindexed-access')
+        TokenIndex.objects.filter(access_token=access_token.pk).delete()
+        self.revoke({'token': access_token.token})
+        self.assertFalse(AccessToken.objects.filter(pk=access_token.pk).exists())
+        self.assertFalse(RefreshToken.objects.filter(pk=refresh_token.pk).exists())
+
+    def test_revoke_after_digest_key_change(self):
+        access_token, refresh_token = self.create_tokens('old-key')
+        with override_settings(OAUTH_API={'TOKEN_DIGEST_KEY': 'new-key'}):
+            response = self.revoke({'token': access_token.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(AccessToken.objects.filter(pk=access_token.pk).exists())
+        self.assertFalse(RefreshToken.objects.filter(pk=refresh_token.pk).exists())
+
+    def test_revoke_access_token_with_unindexed_refresh_token(self):
+        access_token, refresh_token = self.create_tokens('unindexed-refresh')
+        TokenIndex.objects.filter(token_type=TokenIndex.TYPE_REFRESH_TOKEN, token_id=refresh_token.pk).delete()
+        self.revoke({'token': access_token.token})
+        self.assertFalse(AccessToken.objects.filter(pk=access_token.pk).exists())
+        self.assertFalse(RefreshToken.objects.filter(pk=refresh_token.pk).exists())
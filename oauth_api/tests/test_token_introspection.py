@@ -0,0 +1,232 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+
+from oauth_api.cache import introspection_cache
+from oauth_api.models import get_application_model, AccessToken, RefreshToken
+from oauth_api.tests.utils import TestCaseUtils
+from oauth_api.utils import token_digest
+
+Application = get_application_model()
+User = get_user_model()
+
+
+class BaseTest(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.dev_user = User.objects.create_user('dev_user', 'dev_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            redirect_uris='http://localhost',
+            user=cls.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+        cls.resource_server = Application.objects.create(
+            name='Resource Server',
+            user=cls.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        )
+        cls.public_application = Application.objects.create(
+            name='Public Application',
+            redirect_uris='http://localhost',
+            user=cls.dev_user,
+            client_type=Application.CLIENT_PUBLIC,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+        cls.expires = timezone.now() + timezone.timedelta(days=1)
+        cls.access_token = AccessToken.objects.create(user=cls.test_user, token='access1234567890',
+                                                      application=cls.application, expires=cls.expires,
+                                                      scope='read write')
+        cls.refresh_token = RefreshToken.objects.create(user=cls.test_user, token='refresh1234567890',
+                                                        application=cls.application, access_token=cls.access_token)
+
+    def setUp(self):
+        cache.clear()
+
+    def introspect(self, data, application=None):
+        application = application or self.resource_server
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(application.client_id,
+                                                                       application.client_secret))
+        return self.client.post(reverse('oauth_api:introspect-token'), data)
+
+
+class TestTokenIntrospection(BaseTest):
+    def test_access_token(self):
+        response = self.introspect({'token': self.access_token.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'active': True,
+            'scope': 'read write',
+            'client_id': self.application.client_id,
+            'username': 'test_user',
+            'token_type': 'Bearer',
+            'exp': int(self.expires.timestamp()),
+        })
+
+    def test_refresh_token(self):
+        for data in ({'token': self.refresh_token.token},
+                     {'token': self.refresh_token.token, 'token_type_hint': 'refresh_token'}):
+            response = self.introspect(data)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, {
+                'active': True,
+                'scope': 'read write',
+                'client_id': self.application.client_id,
+                'username': 'test_user',
+            })
+
+    def test_unknown_token(self):
+        response = self.introspect({'token': 'unknown1234567890'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'active': False})
+
+    def test_expired_token(self):
+        access_token = AccessToken.objects.create(user=self.test_user, token='expired1234567890',
+                                                  application=self.application,
+                                                  expires=timezone.now() - timezone.timedelta(seconds=1),
+                                                  scope='read')
+        response = self.introspect({'token': access_token.token})
+        self.assertEqual(response.data, {'active': False})
+
+    def test_public_client(self):
+        self.client.credentials()
+        response = self.client.post(reverse('oauth_api:introspect-token'), {
+            'token': self.access_token.token,
+            'client_id': self.public_application.client_id,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'active': False})
+
+    def test_without_client_authentication(self):
+        response = self.client.post(reverse('oauth_api:introspect-token'), {'token': self.access_token.token})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_client_secret(self):
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.resource_server.client_id, 'invalid'))
+        response = self.client.post(reverse('oauth_api:introspect-token'), {'token': self.access_token.token})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TestBatchTokenIntrospection(BaseTest):
+    def introspect_batch(self, data, application=None):
+        application = application or self.resource_server
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(application.client_id,
+                                                                       application.client_secret))
+        return self.client.post(reverse('oauth_api:introspect-tokens'), data)
+
+    def test_results_in_order(self):
+        tokens = ['unknown1234567890', self.refresh_token.token, self.access_token.token, 'unknown1234567890']
+        response = self.introspect_batch({'token': tokens})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'active': False},
+            self.introspect({'token': self.refresh_token.token}).data,
+            self.introspect({'token': self.access_token.token}).data,
+            {'active': False},
+        ])
+
+    def test_single_query_per_token_type(self):
+        tokens = []
+        for i in range(5):
+            tokens.append(AccessToken.objects.create(user=self.test_user, token='batch{0}1234567890'.format(i),
+                                                     application=self.application, expires=self.expires,
+                                                     scope='read').token)
+        # Client, access tokens and refresh tokens of unknown token
+        with self.assertNumQueries(3):
+            response = self.introspect_batch({'token': tokens + ['unknown1234567890']})
+        self.assertEqual([result['active'] for result in response.data['results']], [True] * 5 + [False])
+
+        # Client and refresh tokens
+        with self.assertNumQueries(2):
+            response = self.introspect_batch({'token': [self.refresh_token.token] * 3,
+                                              'token_type_hint': 'refresh_token'})
+        self.assertEqual([result['active'] for result in response.data['results']], [True] * 3)
+
+    @override_settings(OAUTH_API={'STORE_TOKEN_DIGESTS': True})
+    def test_token_digests(self):
+        access_token = AccessToken.objects.create(user=self.test_user, token='digest1234567890',
+                                                  application=self.application, expires=self.expires, scope='read')
+        self.assertFalse(AccessToken.objects.filter(token=access_token.token).exists())
+        response = self.introspect_batch({'token': [access_token.token, 'unknown1234567890']})
+        self.assertEqual([result['active'] for result in response.data['results']], [True, False])
+
+    @override_settings(OAUTH_API={'INTROSPECTION_BATCH_SIZE': 2})
+    def test_batch_size(self):
+        response = self.introspect_batch({'token': [self.access_token.token] * 3})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'invalid_request')
+
+    def test_missing_token(self):
+        response = self.introspect_batch({})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_public_client(self):
+        self.client.credentials()
+        response = self.client.post(reverse('oauth_api:introspect-tokens'), {
+            'token': [self.access_token.token, self.refresh_token.token],
+            'client_id': self.public_application.client_id,
+        })
+        self.assertEqual(response.data['results'], [{'active': False}, {'active': False}])
+
+    def test_invalid_client_secret(self):
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.resource_server.client_id, 'invalid'))
+        response = self.client.post(reverse('oauth_api:introspect-tokens'), {'token': self.access_token.token})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(OAUTH_API={'INTROSPECTION_CACHE': 'default'})
+    def test_cached(self):
+        self.introspect_batch({'token': [self.access_token.token]})
+        # Client, and access and refresh tokens of the uncached token
+        with self.assertNumQueries(3):
+            response = self.introspect_batch({'token': [self.access_token.token, 'expired1234567890']})
+        self.assertEqual([result['active'] for result in response.data['results']], [True, False])
+        self.assertIsNotNone(cache.get(introspection_cache.make_key(token_digest(self.access_token.token))))
+
+
+@override_settings(OAUTH_API={'INTROSPECTION_CACHE': 'default'})
+class TestIntrospectionCache(BaseTest):
+    def test_response_cached(self):
+        self.introspect({'token': self.access_token.token})
+        # Only client is looked up
+        with self.assertNumQueries(1):
+            response = self.introspect({'token': self.access_token.token})
+        self.assertTrue(response.data['active'])
+
+    def test_invalidated_on_revoke(self):
+        self.assertTrue(self.introspect({'token': self.access_token.token}).data['active'])
+
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        response = self.client.post(reverse('oauth_api:revoke-token'), {'token': self.refresh_token.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.introspect({'token': self.access_token.token}).data, {'active': False})
+
+    def test_invalidated_on_delete(self):
+        self.assertTrue(self.introspect({'token': self.access_token.token}).data['active'])
+        self.access_token.delete()
+        self.assertEqual(self.introspect({'token': self.access_token.token}).data, {'active': False})
+
+    def test_timeout_capped_at_expiry(self):
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return {'exp': int(time.time()) - 1}
+
+        introspection_cache.load('expiring1234567890', loader)
+        introspection_cache.load('expiring1234567890', loader)
+        self.assertEqual(len(calls), 2)
+
+    def test_inactive_not_cached(self):
+        self.introspect({'token': 'unknown1234567890'})
+        self.assertIsNone(cache.get(introspection_cache.make_key(token_digest('unknown1234567890'))))
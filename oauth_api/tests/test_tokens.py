@@ -0,0 +1,202 @@
+import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+
+from oauth_api.authentication import OAuth2Authentication
+from oauth_api.models import get_application_model, AccessToken, RefreshToken
+from oauth_api.tests.utils import TestCaseUtils
+from oauth_api.tests.views import RESPONSE_DATA
+from oauth_api.tokens import DeletedTokenOwner, SignedTokenValidator, decode_token, encode_token
+
+
+Application = get_application_model()
+User = get_user_model()
+
+SIGNED_TOKEN_SETTINGS = {
+    'DEFAULT_SERVER_CLASS': 'oauth_api.tokens.SignedTokenServer',
+    'DEFAULT_VALIDATOR_CLASS': 'oauth_api.tokens.SignedTokenValidator',
+    'SIGNED_TOKEN_KEYS': {'key1': 'secret1'},
+}
+
+
+@override_settings(OAUTH_API=SIGNED_TOKEN_SETTINGS)
+class TestSignedTokens(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.dev_user = User.objects.create_user('dev_user', 'dev_user@example.com', '1234')
+        cls.application = Application.objects.create(
+            name='Test Application',
+            user=cls.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        )
+        cls.password_application = Application.objects.create(
+            name='Password Application',
+            user=cls.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+        )
+
+    def get_token(self, application=None, **data):
+        application = application or self.application
+        data.setdefault('grant_type', 'client_credentials')
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(application.client_id,
+                                                                       application.client_secret))
+        response = self.client.post(reverse('oauth_api:token'), data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def get_resource(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer {0}'.format(token))
+        return self.client.get(reverse('resource-view'))
+
+    def test_client_credentials(self):
+        token = self.get_token()['access_token']
+
+        claims = decode_token(token)
+        self.assertEqual(claims['client_id'], self.application.client_id)
+        self.assertEqual(claims['scope'], 'read write')
+        self.assertIsNone(claims['user_id'])
+        self.assertTrue(token.startswith('key1.'))
+
+        with self.assertNumQueries(0):
+            response = self.get_resource(token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, RESPONSE_DATA)
+
+    @override_settings(OAUTH_API=dict(SIGNED_TOKEN_SETTINGS, APPLICATION_CACHE='default'))
+    def test_application_cached(self):
+        # Application is cached when the token is issued
+        token = self.get_token()['access_token']
+        request = RequestFactory().get('/')
+        with self.assertNumQueries(0):
+            self.assertTrue(SignedTokenValidator().validate_bearer_token(token, ['read'], request))
+            self.assertEqual(request.client.client_id, self.application.client_id)
+
+    def test_deleted_user(self):
+        user = User.objects.create_user('deleted_user', 'deleted_user@example.com', '1234')
+        data = self.get_token(self.password_application, grant_type='password', username='deleted_user',
+                              password='1234')
+        user.delete()
+        # Token is rejected once the user is used
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer {0}'.format(data['access_token']))
+        response = self.client.get(reverse('resource-user-view'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION='Bearer {0}'.format(data['access_token']))
+        self.assertIsNone(async_to_sync(OAuth2Authentication().aauthenticate)(request))
+
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        response = self.client.post(reverse('oauth_api:introspect-token'), {'token': data['access_token']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'active': False})
+
+    def test_deleted_application(self):
+        application = Application.objects.create(
+            name='Deleted Application',
+            user=self.dev_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        )
+        token = self.get_token(application)['access_token']
+        application.delete()
+        request = RequestFactory().get('/')
+        self.assertTrue(SignedTokenValidator().validate_bearer_token(token, ['read'], request))
+        with self.assertRaises(DeletedTokenOwner):
+            request.client.client_id
+
+        self.client.credentials(HTTP_AUTHORIZATION=self.get_basic_auth(self.application.client_id,
+                                                                       self.application.client_secret))
+        response = self.client.post(reverse('oauth_api:introspect-token'), {'token': token})
+        self.assertEqual(response.data, {'active': False})
+
+    def test_token_stored_for_audit(self):
+        token = self.get_token()['access_token']
+        self.assertTrue(AccessToken.objects.filter(token=token, application=self.application).exists())
+
+    @override_settings(OAUTH_API=dict(SIGNED_TOKEN_SETTINGS, SIGNED_TOKEN_STORE=False))
+    def test_token_not_stored(self):
+        token = self.get_token()['access_token']
+        self.assertFalse(AccessToken.objects.exists())
+        self.assertEqual(self.get_resource(token).status_code, status.HTTP_200_OK)
+
+    @override_settings(OAUTH_API=dict(SIGNED_TOKEN_SETTINGS, SIGNED_TOKEN_STORE=False))
+    def test_password_grant(self):
+        data = self.get_token(self.password_application, grant_type='password', username='test_user',
+                              password='1234')
+        self.assertEqual(decode_token(data['access_token'])['user_id'], self.test_user.pk)
+
+        # Access token is stored along with refresh token
+        refresh_token = RefreshToken.objects.get(token=data['refresh_token'])
+        self.assertEqual(refresh_token.access_token.token, data['access_token'])
+        self.assertIsNone(decode_token(data['refresh_token']))
+
+        claims = decode_token(data['access_token'])
+        access_token = SignedTokenValidator().build_access_token(data['access_token'], claims)
+        self.assertEqual(access_token.user, self.test_user)
+        self.assertEqual(access_token.application, self.password_application)
+
+    def test_introspection(self):
+        token = self.get_token()['access_token']
+        response = self.client.post(reverse('oauth_api:introspect-token'), {'token': token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['active'])
+        self.assertEqual(response.data['client_id'], self.application.client_id)
+        self.assertEqual(response.data['exp'], decode_token(token)['exp'])
+
+    def test_key_rotation(self):
+        token = self.get_token()['access_token']
+
+        keys = {'key2': 'secret2', 'key1': 'secret1'}
+        with override_settings(OAUTH_API=dict(SIGNED_TOKEN_SETTINGS, SIGNED_TOKEN_KEYS=keys,
+                                              SIGNED_TOKEN_KEY_ID='key2')):
+            self.assertEqual(self.get_resource(token).status_code, status.HTTP_200_OK)
+            new_token = self.get_token()['access_token']
+            self.assertTrue(new_token.startswith('key2.'))
+
+        with override_settings(OAUTH_API=dict(SIGNED_TOKEN_SETTINGS, SIGNED_TOKEN_KEYS={'key2': 'secret2'})):
+            self.assertEqual(self.get_resource(token).status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(self.get_resource(new_token).status_code, status.HTTP_200_OK)
+
+    def test_tampered_token(self):
+        key_id, payload, signature = self.get_token()['access_token'].split('.')
+        other_payload = encode_token({'exp': int(time.time()) + 60, 'scope': 'read write', 'user_id': None,
+                                      'client_id': self.application.client_id}).split('.')[1]
+
+        for token in ('.'.join((key_id, other_payload, signature)),
+                      '.'.join(('key2', payload, signature)),
+                      '.'.join((key_id, payload, signature[:-2]))):
+            self.assertEqual(self.get_resource(token).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token(self):
+        token = encode_token({'exp': int(time.time()) - 1, 'scope': 'read write', 'user_id': None,
+                              'client_id': self.application.client_id})
+        self.assertIsNone(decode_token(token))
+        self.assertEqual(self.get_resource(token).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_insufficient_scope(self):
+        token = self.get_token(scope='read')['access_token']
+        self.assertEqual(self.get_resource(token).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unsigned_token(self):
+        AccessToken.objects.create(token='unsigned1234567890', application=self.application, scope='read write',
+                                   expires=timezone.now() + timezone.timedelta(days=1))
+        self.assertEqual(self.get_resource('unsigned1234567890').status_code, status.HTTP_200_OK)
+
+    def test_async_validation(self):
+        data = self.get_token(self.password_application, grant_type='password', username='test_user',
+                              password='1234')
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION='Bearer {0}'.format(data['access_token']))
+        # Lazy user could not be loaded from async code
+        with self.assertNumQueries(1):
+            user, access_token = async_to_sync(OAuth2Authentication().aauthenticate)(request)
+        self.assertEqual(user, self.test_user)
+        self.assertEqual(access_token.scope, 'read write')
@@ -0,0 +1,118 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from oauthlib.common import Request
+
+from rest_framework import status
+
+from oauth_api.models import get_application_model, AccessToken
+from oauth_api.tests.utils import TestCaseUtils
+from oauth_api.usage import usage_buffer
+from oauth_api.validators import OAuthValidator
+
+Application = get_application_model()
+User = get_user_model()
+
+
+@override_settings(OAUTH_API={'TRACK_USAGE': True, 'USAGE_FLUSH_INTERVAL': 3600})
+class TestUsageTracking(TestCaseUtils):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user('test_user', 'test_user@example.com', '1234')
+        cls.applications = [Application.objects.create(
+            name='Application {0}'.format(i),
+            user=cls.test_user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+        ) for i in range(2)]
+        cls.access_tokens = [AccessToken.objects.create(user=cls.test_user, token='usage{0}1234567890'.format(i),
+                                                        application=cls.applications[i % 2],
+                                                        expires=timezone.now() + timezone.timedelta(days=1),
+                                                        scope='read write') for i in range(3)]
+
+    def setUp(self):
+        usage_buffer.clear()
+        self.addCleanup(usage_buffer.clear)
+
+    def get_resource(self, access_token):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer {0}'.format(access_token.token))
+        response = self.client.get(reverse('resource-view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def assertUsage(self, access_tokens, request_counts):
+        self.assertEqual([token.last_used is not None for token in AccessToken.objects.order_by('pk')],
+                         [token in access_tokens for token in self.access_tokens])
+        self.assertEqual(list(Application.objects.order_by('pk').values_list('request_count', flat=True)),
+                         request_counts)
+
+    def test_usage_buffered(self):
+        # Only the token is looked up
+        with self.assertNumQueries(1):
+            self.get_resource(self.access_tokens[0])
+        self.get_resource(self.access_tokens[0])
+        self.get_resource(self.access_tokens[1])
+        self.assertUsage([], [0, 0])
+
+        self.assertTrue(usage_buffer.flush())
+        self.assertUsage(self.access_tokens[:2], [2, 1])
+        self.assertEqual(len(usage_buffer), 0)
+
+        self.get_resource(self.access_tokens[0])
+        usage_buffer.flush()
+        self.assertUsage(self.access_tokens[:2], [3, 1])
+
+    def test_single_update_per_batch(self):
+        for access_token in self.access_tokens:
+            self.get_resource(access_token)
+        # Savepoint, tokens, applications and release of savepoint
+        with self.assertNumQueries(4):
+            usage_buffer.flush()
+        self.assertUsage(self.access_tokens, [2, 1])
+
+    @override_settings(OAUTH_API={'TRACK_USAGE': True, 'USAGE_FLUSH_BATCH_SIZE': 2})
+    def test_batch_size(self):
+        for access_token in self.access_tokens:
+            self.get_resource(access_token)
+        # Two token batches and one application batch
+        with self.assertNumQueries(5):
+            usage_buffer.flush()
+        self.assertUsage(self.access_tokens, [2, 1])
+
+    @override_settings(OAUTH_API={'TRACK_USAGE': True, 'USAGE_FLUSH_INTERVAL': 0})
+    def test_flush_interval(self):
+        self.get_resource(self.access_tokens[0])
+        self.assertUsage(self.access_tokens[:1], [1, 0])
+
+    @override_settings(OAUTH_API={'TRACK_USAGE': True, 'USAGE_FLUSH_INTERVAL': 3600, 'USAGE_BUFFER_SIZE': 4})
+    def test_buffer_size(self):
+        self.get_resource(self.access_tokens[0])
+        self.get_resource(self.access_tokens[1])
+        self.assertUsage([], [0, 0])
+        # Buffer grows past four tokens and applications
+        self.get_resource(self.access_tokens[2])
+        self.assertUsage(self.access_tokens, [2, 1])
+
+    @override_settings(OAUTH_API={})
+    def test_disabled(self):
+        self.get_resource(self.access_tokens[0])
+        self.assertEqual(len(usage_buffer), 0)
+
+    def test_failed_write_dropped(self):
+        self.get_resource(self.access_tokens[0])
+        with mock.patch.object(QuerySet, 'update', side_effect=DatabaseError):
+            self.assertFalse(usage_buffer.flush())
+        self.assertEqual(len(usage_buffer), 0)
+        self.assertUsage([], [0, 0])
+
+    def test_async(self):
+        request = Request('')
+        valid = async_to_sync(OAuthValidator().avalidate_bearer_token)(self.access_tokens[0].token, [], request)
+        self.assertTrue(valid)
+        self.assertEqual(len(usage_buffer), 2)
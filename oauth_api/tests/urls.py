@@ -2,15 +2,21 @@ from django.urls import include, path
 
 from oauth_api.tests.views import (ResourceView, ResourceReadScopesView,
                                    ResourceWriteScopesView, ResourceReadWriteScopesView,
-                                   ResourceMixedScopesView, ResourceNoScopesView)
+                                   ResourceMixedScopesView, ResourceNoScopesView, ResourceUserView,
+                                   RemoteResourceView)
+from oauth_api.views import AsyncTokenView, AsyncTokenRevocationView
 
 
 urlpatterns = [
     path('oauth/', include(('oauth_api.urls', 'oauth_api'), namespace='oauth_api')),
+    path('oauth-async/token/', AsyncTokenView.as_view(), name='async-token'),
+    path('oauth-async/revoke_token/', AsyncTokenRevocationView.as_view(), name='async-revoke-token'),
     path('resource-required/', ResourceView.as_view(), name='resource-view'),
+    path('resource-user/', ResourceUserView.as_view(), name='resource-user-view'),
     path('resource-read/', ResourceReadScopesView.as_view(), name='resource-read-view'),
     path('resource-write/', ResourceWriteScopesView.as_view(), name='resource-write-view'),
     path('resource-readwrite/', ResourceReadWriteScopesView.as_view(), name='resource-readwrite-view'),
     path('resource-mixed/', ResourceMixedScopesView.as_view(), name='resource-mixed-view'),
     path('resource-noscopes/', ResourceNoScopesView.as_view(), name='resource-noscopes-view'),
+    path('resource-remote/', RemoteResourceView.as_view(), name='resource-remote-view'),
 ]
@@ -1,12 +1,34 @@
 import base64
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import parse_qs, urlparse
 
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 
 class TestCaseUtils(APITestCase):
+    @contextmanager
+    def assertMaxQueries(self, num, using=DEFAULT_DB_ALIAS):
+        """
+        Fail if more than `num` queries are executed within the block, listing the executed queries
+        """
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+
+        executed = len(context)
+        if executed > num:
+            queries = '\n'.join('{0}. {1}'.format(i, query['sql'])
+                                for i, query in enumerate(context.captured_queries, 1))
+            self.fail('{0} queries executed, at most {1} expected\nCaptured queries were:\n{2}'.format(
+                executed, num, queries))
+
     def get_basic_auth(self, username, password):
         payload = '%s:%s' % (username, password)
         auth = base64.b64encode(payload.encode('utf-8')).decode('utf-8')
@@ -51,3 +73,66 @@ class TestCaseUtils(APITestCase):
         self.assertTrue('access_token' in response.data)
 
         return response.data['access_token']
+
+
+class IntrospectionServer(object):
+    """
+    Local stand-in for introspection endpoint of an authorization server.
+
+    Responds to every request with `response` as JSON and `status`, after waiting `delay` seconds. Counts
+    requests and accepted connections. Connections are kept alive unless `keep_alive` is False.
+    """
+    def __init__(self, response=None, status=200, delay=0, keep_alive=True):
+        self.response = response if response is not None else {'active': False}
+        self.status = status
+        self.delay = delay
+        self.keep_alive = keep_alive
+        self.requests = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return 'http://{0}:{1}/introspect_token/'.format(host, port)
+
+    def start(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super(Handler, self).setup()
+                with stand_in._lock:
+                    stand_in.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with stand_in._lock:
+                    stand_in.requests.append(parse_qs(body.decode('utf-8')))
+                if stand_in.delay:
+                    time.sleep(stand_in.delay)
+                data = json.dumps(stand_in.response).encode('utf-8')
+                self.send_response(stand_in.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                # Close without telling the client, as servers dropping idle connections do
+                self.close_connection = not stand_in.keep_alive
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
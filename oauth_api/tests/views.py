@@ -2,6 +2,8 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
+from oauth_api.remote import RemoteOAuth2Authentication
+
 
 RESPONSE_DATA = {
     'hello': 'world!',
@@ -15,6 +17,11 @@ class ResourceView(APIView):
         return Response(RESPONSE_DATA)
 
 
+class ResourceUserView(ResourceView):
+    def get(self, request, *args, **kwargs):
+        return Response({'username': request.user.get_username()})
+
+
 class ResourceReadScopesView(APIView):
     read_scopes = ['read']
 
@@ -40,3 +47,7 @@ class ResourceMixedScopesView(ResourceReadWriteScopesView, APIView):
 class ResourceNoScopesView(APIView):
     def get(self, request, *args, **kwargs):
         return Response(RESPONSE_DATA)
+
+
+class RemoteResourceView(ResourceView):
+    authentication_classes = [RemoteOAuth2Authentication]
@@ -0,0 +1,247 @@
+"""
+Stateless access tokens.
+
+Signed access tokens carry their expiration time, scope, client id and user id, and are authenticated
+with HMAC using a key from `SIGNED_TOKEN_KEYS` setting. Verifying them does not require a database
+query. Enable them by setting `DEFAULT_SERVER_CLASS` to `oauth_api.tokens.SignedTokenServer` and
+`DEFAULT_VALIDATOR_CLASS` to `oauth_api.tokens.SignedTokenValidator`.
+
+Application and user of a signed token are loaded when first used, the application using application
+cache. Using them raises `DeletedTokenOwner` once they have been deleted, which fails the request with
+401 Unauthorized, and introspection reports such tokens inactive.
+
+Signed tokens remain valid until they expire, even if their database row is revoked.
+"""
+import base64
+import binascii
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.functional import SimpleLazyObject
+
+from oauthlib.common import generate_token
+from oauthlib.oauth2 import Server
+from oauthlib.oauth2.rfc6749.tokens import random_token_generator
+
+from rest_framework.exceptions import AuthenticationFailed
+
+from oauth_api.cache import application_cache
+from oauth_api.models import AccessToken
+from oauth_api.settings import oauth_api_settings
+from oauth_api.validators import OAuthValidator
+
+
+class DeletedTokenOwner(AuthenticationFailed):
+    """
+    Application or user of a signed access token no longer exists
+    """
+    default_detail = 'Invalid token.'
+    default_code = 'invalid_token'
+
+
+def _b64encode(value):
+    return base64.urlsafe_b64encode(value).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(value):
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+def get_signing_key():
+    """
+    Return tuple of key id and key used to sign new tokens.
+    """
+    keys = oauth_api_settings.SIGNED_TOKEN_KEYS
+    if not keys:
+        raise ImproperlyConfigured('SIGNED_TOKEN_KEYS must be set to use signed access tokens.')
+
+    key_id = oauth_api_settings.SIGNED_TOKEN_KEY_ID
+    if key_id is None:
+        key_id = next(iter(keys))
+    if key_id not in keys or '.' in key_id:
+        raise ImproperlyConfigured('SIGNED_TOKEN_KEY_ID must be one of SIGNED_TOKEN_KEYS and must not contain dots.')
+    return key_id, keys[key_id]
+
+
+def sign(key_id, key, payload):
+    value = '{0}.{1}'.format(key_id, payload)
+    return _b64encode(salted_hmac('oauth_api.signed_token', value, secret=key, algorithm='sha256').digest())
+
+
+def encode_token(claims):
+    """
+    Return signed token carrying given claims.
+    """
+    key_id, key = get_signing_key()
+    payload = _b64encode(json.dumps(claims, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+    return '{0}.{1}.{2}'.format(key_id, payload, sign(key_id, key, payload))
+
+
+def is_signed_token(token):
+    return token.count('.') == 2
+
+
+def decode_token(token):
+    """
+    Return claims of signed token, or None if token is not signed with any of known keys or has expired.
+    """
+    try:
+        key_id, payload, signature = token.split('.')
+    except ValueError:
+        return None
+
+    key = oauth_api_settings.SIGNED_TOKEN_KEYS.get(key_id)
+    if key is None or not constant_time_compare(signature, sign(key_id, key, payload)):
+        return None
+
+    try:
+        claims = json.loads(_b64decode(payload))
+    except (binascii.Error, ValueError):
+        return None
+
+    if claims['exp'] <= time.time():
+        return None
+    return claims
+
+
+def generate_signed_token(request, refresh_token=False):
+    """
+    Token generator for OAuthLib, returning signed access token for the client and user of the request.
+    """
+    user = request.user
+    if request.grant_type == 'client_credentials' or user is None:
+        user_id = None
+    else:
+        user_id = user.pk
+
+    return encode_token({
+        'exp': int(time.time()) + request.expires_in,
+        'scope': ' '.join(request.scopes or []),
+        'client_id': request.client.client_id,
+        'user_id': user_id,
+        'jti': generate_token(length=16),
+    })
+
+
+def lazy_owner(loader):
+    """
+    Return object loaded with `loader` when first used, raising `DeletedTokenOwner` if it does not exist.
+    """
+    def load():
+        try:
+            return loader()
+        except ObjectDoesNotExist:
+            raise DeletedTokenOwner()
+    return SimpleLazyObject(load)
+
+
+class SignedTokenServer(Server):
+    """
+    OAuthLib server issuing signed access tokens. Refresh tokens stay random.
+    """
+    def __init__(self, request_validator, token_expires_in=None, token_generator=None,
+                 refresh_token_generator=None, *args, **kwargs):
+        super(SignedTokenServer, self).__init__(
+            request_validator, token_expires_in,
+            token_generator or generate_signed_token,
+            refresh_token_generator or random_token_generator,
+            *args, **kwargs)
+
+
+class SignedTokenValidator(OAuthValidator):
+    """
+    Validator verifying signed access tokens without querying the database.
+
+    Access tokens are stored for auditing only when `SIGNED_TOKEN_STORE` is enabled or a refresh token
+    is issued along with them. Tokens which are not signed are looked up from database.
+    """
+    def save_bearer_token(self, token, request, *args, **kwargs):
+        if oauth_api_settings.SIGNED_TOKEN_STORE or 'refresh_token' in token:
+            return super(SignedTokenValidator, self).save_bearer_token(token, request, *args, **kwargs)
+        return request.client.default_redirect_uri
+
+    def validate_bearer_token(self, token, scopes, request):
+        if token is None or not is_signed_token(token):
+            return super(SignedTokenValidator, self).validate_bearer_token(token, scopes, request)
+
+        claims = decode_token(token)
+        if claims is None:
+            return False
+
+        access_token = self.build_access_token(token, claims)
+        return self._signed_token_valid(access_token, scopes, request)
+
+    async def avalidate_bearer_token(self, token, scopes, request):
+        if token is None or not is_signed_token(token):
+            return await super(SignedTokenValidator, self).avalidate_bearer_token(token, scopes, request)
+
+        claims = decode_token(token)
+        if claims is None:
+            return False
+
+        access_token = self.build_access_token(token, claims)
+        if claims['user_id'] is not None:
+            # Lazy user could not be loaded from async code
+            try:
+                user = await get_user_model()._default_manager.aget(pk=claims['user_id'])
+            except ObjectDoesNotExist:
+                return False
+            AccessToken.user.field.set_cached_value(access_token, user)
+        return self._signed_token_valid(access_token, scopes, request)
+
+    def _introspect_access_token(self, token):
+        if not is_signed_token(token):
+            return super(SignedTokenValidator, self)._introspect_access_token(token)
+
+        claims = decode_token(token)
+        if claims is None:
+            return None
+        try:
+            return self._access_token_claims(self.build_access_token(token, claims))
+        except DeletedTokenOwner:
+            return None
+
+    def _introspect_access_tokens(self, tokens):
+        stored = [token for token in tokens if not is_signed_token(token)]
+        claims = super(SignedTokenValidator, self)._introspect_access_tokens(stored) if stored else {}
+        for token in tokens:
+            if is_signed_token(token):
+                token_claims = self._introspect_access_token(token)
+                if token_claims is not None:
+                    claims[token] = token_claims
+        return claims
+
+    def _signed_token_valid(self, access_token, scopes, request):
+        if not access_token.allow_scopes(scopes):
+            return False
+
+        request.client = access_token.application
+        request.user = access_token.user
+        request.scopes = scopes
+        request.access_token = access_token
+        return True
+
+    def build_access_token(self, token, claims):
+        """
+        Build unsaved access token instance from claims. Application and user are loaded lazily, and raise
+        `DeletedTokenOwner` when used if they no longer exist.
+        """
+        access_token = AccessToken(token=token, scope=claims['scope'],
+                                   expires=datetime.fromtimestamp(claims['exp'], tz=dt_timezone.utc))
+
+        client_id = claims['client_id']
+        application = lazy_owner(lambda: application_cache.get_by_client_id(client_id, replica=True))
+        AccessToken.application.field.set_cached_value(access_token, application)
+
+        user_id = claims['user_id']
+        if user_id is None:
+            user = None
+        else:
+            User = get_user_model()
+            user = lazy_owner(lambda: User._default_manager.get(pk=user_id))
+        AccessToken.user.field.set_cached_value(access_token, user)
+        return access_token
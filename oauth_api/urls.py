@@ -1,7 +1,8 @@
 from django.urls import path
 from django.contrib.auth.decorators import login_required
 
-from oauth_api.views import AuthorizationView, TokenView, TokenRevocationView
+from oauth_api.views import (AuthorizationView, BatchTokenIntrospectionView, TokenIntrospectionView, TokenView,
+                             TokenRevocationView)
 
 app_name = 'oauth_api'
 
@@ -9,4 +10,6 @@ urlpatterns = [
     path('authorize/', login_required(AuthorizationView.as_view()), name='authorize'),
     path('token/', TokenView.as_view(), name='token'),
     path('revoke_token/', TokenRevocationView.as_view(), name='revoke-token'),
+    path('introspect_token/', TokenIntrospectionView.as_view(), name='introspect-token'),
+    path('introspect_tokens/', BatchTokenIntrospectionView.as_view(), name='introspect-tokens'),
 ]
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from django.db import DatabaseError, router, transaction
+from django.db.models import BigIntegerField, Case, F, Value, When
+from django.utils import timezone
+
+from oauth_api.handlers import run_in_executor
+from oauth_api.models import AccessToken, get_application_model
+from oauth_api.settings import oauth_api_settings
+
+
+class UsageBuffer(object):
+    """
+    In-process buffer of access tokens and applications used to access resources, enabled with `TRACK_USAGE`.
+
+    Recording usage only updates the buffer. Buffered usage is written as one UPDATE of access tokens and
+    one of applications per `USAGE_FLUSH_BATCH_SIZE` rows, by the first request after `USAGE_FLUSH_INTERVAL`
+    seconds have passed or more than `USAGE_BUFFER_SIZE` tokens and applications have been buffered.
+    `last_used` is set to the time of the write, so it is accurate to the flush interval.
+
+    Usage tracking is best effort. Usage still buffered when the process exits, and usage that fails to be
+    written, is lost. Signed access tokens are not looked up from database and their usage is not recorded.
+    """
+    def __init__(self):
+        self._tokens = set()
+        self._applications = {}
+        self._flushed = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tokens) + len(self._applications)
+
+    def add(self, access_token):
+        """
+        Buffer usage of access token and its application. Returns True if buffered usage should be written.
+        """
+        with self._lock:
+            self._tokens.add(access_token.pk)
+            application_id = access_token.application_id
+            self._applications[application_id] = self._applications.get(application_id, 0) + 1
+            return (len(self) > oauth_api_settings.USAGE_BUFFER_SIZE or
+                    time.monotonic() - self._flushed >= oauth_api_settings.USAGE_FLUSH_INTERVAL)
+
+    def record(self, access_token):
+        """
+        Record usage of access token if `TRACK_USAGE` is enabled, writing buffered usage when due.
+        """
+        if oauth_api_settings.TRACK_USAGE and access_token.pk is not None and self.add(access_token):
+            self.flush()
+
+    async def arecord(self, access_token):
+        """
+        Async version of `record`, buffered usage is written in shared thread pool
+        """
+        if oauth_api_settings.TRACK_USAGE and access_token.pk is not None and self.add(access_token):
+            await run_in_executor(self.flush)
+
+    def take(self):
+        """
+        Return buffered token ids and request counts by application id, and empty the buffer.
+        """
+        with self._lock:
+            tokens, applications = self._tokens, self._applications
+            self._tokens, self._applications = set(), {}
+            self._flushed = time.monotonic()
+        return tokens, applications
+
+    def flush(self):
+        """
+        Write buffered usage to database. Returns False if writing failed and buffered usage was dropped.
+        """
+        tokens, applications = self.take()
+        if not tokens and not applications:
+            return True
+
+        now = timezone.now()
+        batch_size = oauth_api_settings.USAGE_FLUSH_BATCH_SIZE
+        Application = get_application_model()
+        using = router.db_for_write(AccessToken)
+        tokens = sorted(tokens)
+        applications = sorted(applications.items())
+        try:
+            # Failed write does not break transaction of the request
+            with transaction.atomic(using=using):
+                for i in range(0, len(tokens), batch_size):
+                    AccessToken.objects.using(using).filter(pk__in=tokens[i:i + batch_size]).update(last_used=now)
+
+                for i in range(0, len(applications), batch_size):
+                    batch = applications[i:i + batch_size]
+                    counts = Case(*[When(pk=pk, then=Value(count)) for pk, count in batch],
+                                  default=Value(0), output_field=BigIntegerField())
+                    Application._default_manager.using(using).filter(pk__in=[pk for pk, count in batch]).update(
+                        last_used=now, request_count=F('request_count') + counts)
+        except DatabaseError:
+            return False
+        return True
+
+    def clear(self):
+        """
+        Drop buffered usage without writing it.
+        """
+        self.take()
+
+
+usage_buffer = UsageBuffer()
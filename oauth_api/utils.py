@@ -1,4 +1,11 @@
+import time
+from functools import lru_cache
+
+from django.contrib.auth.hashers import identify_hasher, make_password
 from django.core.validators import URLValidator
+from django.utils.crypto import salted_hmac
+
+from oauth_api.settings import oauth_api_settings
 
 
 def validate_uris(value):
@@ -8,3 +15,109 @@ def validate_uris(value):
     v = URLValidator()
     for uri in value.split():
         v(uri)
+
+
+class RedirectURIs(object):
+    """
+    Redirect URIs of an application parsed from line separated `redirect_uris` text.
+
+    Allowed URIs are kept in a set, so checking a redirect URI does not depend on number of registered
+    URIs. Matching modes other than exact matching should build their own lookup structures here.
+    """
+    def __init__(self, source):
+        self.source = source
+        uris = source.split()
+        self.default = uris[0] if uris else None
+        self.uris = frozenset(uris)
+
+    def __contains__(self, redirect_uri):
+        return redirect_uri in self.uris
+
+
+@lru_cache(maxsize=256)
+def compile_redirect_uris(redirect_uris):
+    """
+    Return `RedirectURIs` of `redirect_uris` text. Results are shared by application instances with the same
+    redirect URIs, including instances loaded from application cache.
+    """
+    return RedirectURIs(redirect_uris)
+
+
+def token_digest(token):
+    """
+    Return keyed digest of token, usable as a cache key or database lookup without exposing the token itself.
+    Digest is keyed with `TOKEN_DIGEST_KEY` setting, defaulting to `SECRET_KEY`.
+    """
+    return salted_hmac('oauth_api.token_digest', token, secret=oauth_api_settings.TOKEN_DIGEST_KEY,
+                       algorithm='sha256').hexdigest()
+
+
+def hash_client_secret(client_secret):
+    """
+    Return client secret hashed with password hasher configured with `CLIENT_SECRET_HASHER` setting.
+    """
+    return make_password(client_secret, hasher=oauth_api_settings.CLIENT_SECRET_HASHER)
+
+
+def is_hashed_client_secret(value):
+    """
+    Return True if value is a client secret hashed with one of `PASSWORD_HASHERS`.
+    """
+    try:
+        identify_hasher(value)
+    except ValueError:
+        return False
+    return True
+
+
+def delete_in_batches(queryset, batch_size=1000, sleep=0, fields=(), callback=None):
+    """
+    Delete rows matching queryset in primary key ordered batches, using a single DELETE statement per batch.
+    Rows are not loaded into memory, model delete signals are not sent and related rows are not
+    collected, so dependent rows must be deleted first. Returns number of deleted rows.
+
+    If `callback` is given, it is called after each batch is deleted with list of tuples holding primary
+    key and values of `fields` of deleted rows.
+    """
+    model = queryset.model
+    db = queryset.db
+    deleted = 0
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        rows = list(batch.values_list('pk', *fields)[:batch_size])
+        if not rows:
+            return deleted
+
+        pks = [row[0] for row in rows]
+        deleted += model._base_manager.using(db).filter(pk__in=pks)._raw_delete(db)
+        if callback is not None:
+            callback(rows)
+        last_pk = pks[-1]
+        if sleep:
+            time.sleep(sleep)
+
+
+def update_in_batches(queryset, values, batch_size=1000, sleep=0):
+    """
+    Update rows matching queryset with given field values in primary key ordered batches, using a single
+    UPDATE statement per batch. Model save signals are not sent. Returns number of updated rows.
+    """
+    model = queryset.model
+    db = queryset.db
+    updated = 0
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        pks = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return updated
+
+        updated += model._base_manager.using(db).filter(pk__in=pks).update(**values)
+        last_pk = pks[-1]
+        if sleep:
+            time.sleep(sleep)
@@ -3,12 +3,21 @@ import binascii
 from datetime import timedelta
 
 from django.contrib.auth import authenticate
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 
-from oauthlib.oauth2 import RequestValidator
+from oauthlib.oauth2 import InvalidGrantError, RequestValidator
 
-from oauth_api.models import get_application_model, AccessToken, AuthorizationCode, RefreshToken, AbstractApplication
+from oauth_api.cache import application_cache, client_secret_cache, introspection_cache, token_cache
+from oauth_api.models import (get_application_model, AccessToken, AuthorizationCode, RefreshToken, TokenIndex,
+                              AbstractApplication)
+from oauth_api.revocation import revoke_grant
+from oauth_api.routers import (aread_replica_or_primary, mark_written, read_replica_or_primary,
+                               read_replica_or_primary_bulk)
 from oauth_api.settings import oauth_api_settings
+from oauth_api.usage import usage_buffer
+from oauth_api.utils import token_digest
 
 GRANT_TYPE_MAPPING = {
     'authorization_code': (AbstractApplication.GRANT_AUTHORIZATION_CODE,),
@@ -29,13 +38,56 @@ class OAuthValidator(RequestValidator):
         Application = get_application_model()
 
         try:
-            request.client = request.client or Application.objects.get(client_id=client_id)
+            request.client = request.client or application_cache.get_by_client_id(client_id)
             return request.client
         except Application.DoesNotExist:
             return None
 
+    def _get_access_token(self, token):
+        """
+        Load access token instance for given token, using token cache when enabled
+        """
+        return token_cache.load(token, lambda: self._load_access_token(token))
+
+    def _load_access_token(self, token):
+        """
+        Load access token instance for given token from database. Token is read from a read replica when
+        `READ_DATABASES` is configured, and from primary database if the replica does not have it and it was
+        issued within `READ_REPLICA_LAG` seconds.
+        """
+        queryset = AccessToken.objects.select_related('application', 'user').filter_token(token)
+        try:
+            return read_replica_or_primary(queryset.get, token)
+        except AccessToken.DoesNotExist:
+            return None
+
+    async def _aget_access_token(self, token):
+        """
+        Async version of `_get_access_token`
+        """
+        return await token_cache.aload(token, lambda: self._aload_access_token(token))
+
+    async def _aload_access_token(self, token):
+        """
+        Load access token instance for given token from database using async ORM
+        """
+        queryset = AccessToken.objects.select_related('application', 'user').filter_token(token)
+        try:
+            return await aread_replica_or_primary(queryset.aget, token)
+        except AccessToken.DoesNotExist:
+            return None
+
+    def _get_authorization_code(self, code, client, request):
+        """
+        Return authorization code instance loaded by `validate_code`, or load it from database
+        """
+        auth_code = getattr(request, 'code_object', None)
+        if auth_code is None:
+            auth_code = AuthorizationCode.objects.filter_token(code).get(application=client)
+        return auth_code
+
     def _get_auth_string(self, request):
-        auth = request.headers.get('HTTP_AUTHORIZATION', None)
+        auth = request.headers.get('Authorization', None)
 
         if not auth:
             return None
@@ -77,7 +129,7 @@ class OAuthValidator(RequestValidator):
 
         if self._get_application(client_id, request) is None:
             return False
-        elif request.client.client_secret != client_secret:
+        elif not client_secret_cache.check(request.client, client_secret):
             return False
         else:
             return True
@@ -97,7 +149,7 @@ class OAuthValidator(RequestValidator):
 
         if self._get_application(client_id, request) is None:
             return False
-        elif request.client.client_secret != client_secret:
+        elif not client_secret_cache.check(request.client, client_secret):
             return False
         else:
             return True
@@ -160,7 +212,7 @@ class OAuthValidator(RequestValidator):
         """
         Ensure client is authorized to redirect to the redirect_uri requested.
         """
-        auth_code = AuthorizationCode.objects.get(application=client, code=code)
+        auth_code = self._get_authorization_code(code, client, request)
         return auth_code.redirect_uri_allowed(redirect_uri)
 
     def get_default_redirect_uri(self, client_id, request, *args, **kwargs):
@@ -181,11 +233,115 @@ class OAuthValidator(RequestValidator):
         """
         return request.refresh_token_object.access_token.scope
 
+    def introspect_token(self, token, token_type_hint, request, *args, **kwargs):
+        """
+        Return claims of an active access or refresh token, or None if the token is not active.
+
+        Only confidential clients may introspect tokens, public clients are always told tokens are inactive.
+        Claims of access tokens are cached, see `INTROSPECTION_CACHE`.
+
+        :param token: The token string.
+        :param token_type_hint: access_token or refresh_token.
+        :param request: The HTTP Request (oauthlib.common.Request)
+        """
+        if request.client.client_type != AbstractApplication.CLIENT_CONFIDENTIAL:
+            return None
+
+        if token_type_hint == 'refresh_token':
+            return self._introspect_refresh_token(token) or self._introspect_access_token(token)
+        return self._introspect_access_token(token) or self._introspect_refresh_token(token)
+
+    def introspect_tokens(self, tokens, token_type_hint, request):
+        """
+        Batch version of `introspect_token`. Return list of claims of given tokens in order, None for tokens
+        that are not active. Tokens of each type are looked up with a single query.
+
+        :param tokens: List of token strings.
+        :param token_type_hint: access_token or refresh_token, applied to all tokens.
+        :param request: The HTTP Request (oauthlib.common.Request)
+        """
+        if request.client.client_type != AbstractApplication.CLIENT_CONFIDENTIAL:
+            return [None] * len(tokens)
+
+        lookups = [self._introspect_access_tokens, self._introspect_refresh_tokens]
+        if token_type_hint == 'refresh_token':
+            lookups.reverse()
+
+        claims = {}
+        missing = list(dict.fromkeys(tokens))
+        for lookup in lookups:
+            if missing:
+                claims.update(lookup(missing))
+                missing = [token for token in missing if token not in claims]
+        return [claims.get(token) for token in tokens]
+
+    def _introspect_access_token(self, token):
+        return introspection_cache.load(token, lambda: self._access_token_claims(self._get_access_token(token)))
+
+    def _introspect_access_tokens(self, tokens):
+        return introspection_cache.load_many(tokens, self._load_access_token_claims)
+
+    def _load_access_token_claims(self, tokens):
+        """
+        Return dict of claims of active access tokens by token, bypassing token cache
+        """
+        queryset = AccessToken.objects.select_related('application', 'user')
+        access_tokens = read_replica_or_primary_bulk(queryset.in_bulk_by_token, tokens)
+        return self._active_claims(access_tokens, self._access_token_claims)
+
+    def _access_token_claims(self, access_token):
+        if access_token is None or access_token.is_expired:
+            return None
+
+        claims = {
+            'scope': access_token.scope,
+            'client_id': access_token.application.client_id,
+            'token_type': 'Bearer',
+            'exp': int(access_token.expires.timestamp()),
+        }
+        if access_token.user is not None:
+            claims['username'] = access_token.user.get_username()
+        return claims
+
+    def _introspect_refresh_token(self, token):
+        queryset = RefreshToken.objects.select_related('application', 'user', 'access_token').filter_token(token)
+        return self._refresh_token_claims(read_replica_or_primary(queryset.first, token))
+
+    def _introspect_refresh_tokens(self, tokens):
+        queryset = RefreshToken.objects.select_related('application', 'user', 'access_token')
+        refresh_tokens = read_replica_or_primary_bulk(queryset.in_bulk_by_token, tokens)
+        return self._active_claims(refresh_tokens, self._refresh_token_claims)
+
+    def _refresh_token_claims(self, refresh_token):
+        if refresh_token is None or refresh_token.is_expired:
+            return None
+
+        claims = {
+            'scope': refresh_token.access_token.scope,
+            'client_id': refresh_token.application.client_id,
+        }
+        if refresh_token.expires is not None:
+            claims['exp'] = int(refresh_token.expires.timestamp())
+        if refresh_token.user is not None:
+            claims['username'] = refresh_token.user.get_username()
+        return claims
+
+    def _active_claims(self, tokens, get_claims):
+        """
+        Return dict of claims of active token instances by token string
+        """
+        result = {}
+        for token, instance in tokens.items():
+            claims = get_claims(instance)
+            if claims is not None:
+                result[token] = claims
+        return result
+
     def invalidate_authorization_code(self, client_id, code, request, *args, **kwargs):
         """
         Invalidate an authorization code after use.
         """
-        auth_code = AuthorizationCode.objects.get(application=request.client, code=code)
+        auth_code = self._get_authorization_code(code, request.client, request)
         auth_code.delete()
 
     def save_authorization_code(self, client_id, code, request, *args, **kwargs):
@@ -207,68 +363,94 @@ class OAuthValidator(RequestValidator):
         """
         Persist the Bearer token.
         """
-        if request.refresh_token:
-            # Revoke Refresh Token (and related Access Token)
-            try:
-                RefreshToken.objects.get(token=request.refresh_token).revoke()
-            except RefreshToken.DoesNotExist:
-                # Already revoked?
-                pass
-
         expires = timezone.now() + timedelta(seconds=oauth_api_settings.ACCESS_TOKEN_EXPIRATION)
         user = request.user
         if request.grant_type == 'client_credentials':
             user = None
 
-        access_token = AccessToken.objects.create(
-            user=user,
-            scope=token['scope'],
-            expires=expires,
-            token=token['access_token'],
-            application=request.client
-        )
+        with transaction.atomic(using=router.db_for_write(AccessToken), savepoint=False):
+            # Of concurrent requests using the same refresh token, only the one revoking it issues new tokens
+            rotated = not request.refresh_token or self._revoke_refresh_token(request)
+            if rotated:
+                access_token = AccessToken.objects.create(
+                    user=user,
+                    scope=token['scope'],
+                    expires=expires,
+                    token=token['access_token'],
+                    application=request.client
+                )
+
+                if 'refresh_token' in token:
+                    if oauth_api_settings.REFRESH_TOKEN_EXPIRATION is not None:
+                        expires = timezone.now() + timedelta(seconds=oauth_api_settings.REFRESH_TOKEN_EXPIRATION)
+                    else:
+                        expires = None
+                    RefreshToken.objects.create(
+                        user=request.user,
+                        token=token['refresh_token'],
+                        expires=expires,
+                        application=request.client,
+                        access_token=access_token
+                    )
+
+        if not rotated:
+            # Raised outside of the atomic block to not break transaction it is nested in
+            raise InvalidGrantError(request=request)
+
+        mark_written([token[key] for key in ('access_token', 'refresh_token') if key in token])
+        return request.client.default_redirect_uri
 
-        if 'refresh_token' in token:
-            if oauth_api_settings.REFRESH_TOKEN_EXPIRATION is not None:
-                expires = timezone.now() + timedelta(seconds=oauth_api_settings.REFRESH_TOKEN_EXPIRATION)
-            else:
-                expires = None
-            RefreshToken.objects.create(
-                user=request.user,
-                token=token['refresh_token'],
-                expires=expires,
-                application=request.client,
-                access_token=access_token
-            )
+    def _revoke_refresh_token(self, request):
+        """
+        Revoke (delete) refresh token used in the request and related access token.
 
-        return request.client.default_redirect_uri
+        Returns False if the refresh token was already revoked, e.g. by a concurrent request using it.
+        """
+        refresh_token = getattr(request, 'refresh_token_object', None)
+        if refresh_token is None:
+            refresh_token = RefreshToken.objects.filter_token(request.refresh_token).first()
+            if refresh_token is None:
+                return False
+        _, rows = refresh_token.revoke()
+        return bool(rows.get(RefreshToken._meta.label))
 
     def revoke_token(self, token, token_type_hint, request, *args, **kwargs):
         """
         Revoke an access or refresh token.
 
+        Token is resolved from token index with a single query regardless of `token_type_hint`. Tokens
+        missing from the index, such as tokens indexed with a previous `TOKEN_DIGEST_KEY`, are looked up
+        from token tables. Access token and refresh token issued together are revoked together, refresh
+        tokens are only deleted if the grant has any.
+
         :param token: The token string.
         :param token_type_hint: access_token or refresh_token.
         :param request: The HTTP Request (oauthlib.common.Request)
         """
-        if token_type_hint not in ['access_token', 'refresh_token']:
-            token_type_hint = None
-
-        token_types = {
-            'access_token': AccessToken,
-            'refresh_token': RefreshToken,
-        }
-
-        token_type = token_types.get(token_type_hint, AccessToken)
+        has_refresh_token = Exists(RefreshToken.objects.filter(access_token=OuterRef('access_token')))
+        entries = list(TokenIndex.objects.filter_grant(token).filter(application=request.client).annotate(
+            has_refresh_token=has_refresh_token))
+        if entries:
+            access_token_ids = {entry.access_token_id for entry in entries}
+            digests = [entry.digest for entry in entries if entry.token_type == TokenIndex.TYPE_ACCESS_TOKEN]
+            refresh_tokens = any(entry.has_refresh_token for entry in entries)
+        else:
+            access_token_ids, digests = self._find_grant(token, request.client)
+            refresh_tokens = True
+        revoke_grant(access_token_ids, digests, refresh_tokens=refresh_tokens, using=router.db_for_write(AccessToken))
 
-        try:
-            token_type.objects.get(token=token, application=request.client).revoke()
-        except token_type.DoesNotExist:
-            # Lookup from all token types except from already looked up type
-            other_types = (_type for _type in token_types.values() if _type != token_type)
-            for other_type in other_types:
-                for token in other_type.objects.filter(token=token, application=request.client):
-                    token.revoke()
+    def _find_grant(self, token, client):
+        """
+        Return ids and digests of access tokens matching given access or refresh token, without token index
+        """
+        access_tokens = AccessToken.objects.filter(application=client)
+        rows = list(access_tokens.filter_token(token).values_list('pk', 'token_digest', 'token'))
+        if not rows:
+            refresh_tokens = RefreshToken.objects.filter_token(token).filter(application=client)
+            rows = list(access_tokens.filter(pk__in=refresh_tokens.values('access_token')).values_list(
+                'pk', 'token_digest', 'token'))
+        digests = [token_digest(value) if value else digest for pk, digest, value in rows]
+        return {pk for pk, digest, value in rows}, digests
 
     def validate_bearer_token(self, token, scopes, request):
         """
@@ -277,19 +459,35 @@ class OAuthValidator(RequestValidator):
         if token is None:
             return False
 
-        try:
-            access_token = AccessToken.objects.select_related('application', 'user').get(token=token)
-            if access_token.is_valid(scopes):
-                request.client = access_token.application
-                request.user = access_token.user
-                request.scopes = scopes
-
-                # Required when authenticating using OAuth2Authentication
-                request.access_token = access_token
-                return True
+        access_token = self._get_access_token(token)
+        if not self._bearer_token_valid(access_token, scopes, request):
             return False
-        except AccessToken.DoesNotExist:
+        usage_buffer.record(access_token)
+        return True
+
+    async def avalidate_bearer_token(self, token, scopes, request):
+        """
+        Async version of `validate_bearer_token`, looking up the token using async ORM.
+        """
+        if token is None:
+            return False
+
+        access_token = await self._aget_access_token(token)
+        if not self._bearer_token_valid(access_token, scopes, request):
             return False
+        await usage_buffer.arecord(access_token)
+        return True
+
+    def _bearer_token_valid(self, access_token, scopes, request):
+        if access_token is not None and access_token.is_valid(scopes):
+            request.client = access_token.application
+            request.user = access_token.user
+            request.scopes = scopes
+
+            # Required when authenticating using OAuth2Authentication
+            request.access_token = access_token
+            return True
+        return False
 
     def validate_client_id(self, client_id, request, *args, **kwargs):
         """
@@ -302,10 +500,11 @@ class OAuthValidator(RequestValidator):
         Ensure the authorization_code is valid and assigned to client.
         """
         try:
-            auth_code = AuthorizationCode.objects.select_related('user').get(application=client, code=code)
+            auth_code = AuthorizationCode.objects.select_related('user').filter_token(code).get(application=client)
             if not auth_code.is_expired:
                 request.scopes = auth_code.scope.split(' ')
                 request.user = auth_code.user
+                request.code_object = auth_code
                 return True
             return False
         except AuthorizationCode.DoesNotExist:
@@ -329,12 +528,12 @@ class OAuthValidator(RequestValidator):
         Ensure the Bearer token is valid and authorized access to scopes.
         """
         try:
-            rt = RefreshToken.objects.select_related('user').get(token=refresh_token)
+            rt = RefreshToken.objects.select_related('user', 'access_token').filter_token(refresh_token).get()
             if not rt.is_expired:
                 request.user = rt.user
-                request.refresh_token = rt.token
+                request.refresh_token = refresh_token
                 request.refresh_token_object = rt
-                return rt.application == client
+                return rt.application_id == client.pk
             return False
         except RefreshToken.DoesNotExist:
             return False
@@ -1,20 +1,21 @@
 import json
 
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import FormView
 
 from rest_framework import status as http_status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
+from oauth_api.cache import application_cache
 from oauth_api.forms import AuthorizationForm
 from oauth_api.mixins import OAuthViewMixin
-from oauth_api.models import get_application_model
 from oauth_api.exceptions import FatalClientError, OAuthAPIError
 from oauth_api.settings import oauth_api_settings
 
-Application = get_application_model()
-
 
 class AuthorizationView(OAuthViewMixin, FormView):
     template_name = 'oauth_api/authorize.html'
@@ -59,7 +60,7 @@ class AuthorizationView(OAuthViewMixin, FormView):
         context = super(AuthorizationView, self).get_context_data(**kwargs)
         if 'error' not in self.oauth2_data:
             scopes = self.oauth2_data['scopes']
-            context['application'] = Application.objects.get(client_id=self.oauth2_data['client_id'])
+            context['application'] = application_cache.get_by_client_id(self.oauth2_data['client_id'])
             context['scopes_descriptions'] = [oauth_api_settings.SCOPES[scope] for scope in scopes]
             context.update(self.oauth2_data)
         else:
@@ -107,3 +108,41 @@ class TokenRevocationView(TokenBaseView):
     def post(self, request, *args, **kwargs):
         url, headers, body, status = self.create_revocation_response(request)
         return Response(status=status, headers=headers)
+
+
+class TokenIntrospectionView(TokenBaseView):
+    def post(self, request, *args, **kwargs):
+        url, headers, body, status = self.create_introspection_response(request)
+        data = json.loads(body)
+        return Response(data=data, status=status, headers=headers)
+
+
+class BatchTokenIntrospectionView(TokenBaseView):
+    """
+    Introspect up to `INTROSPECTION_BATCH_SIZE` tokens with a single request, given as repeated `token`
+    parameters. Results are returned in order as `results`.
+    """
+    def post(self, request, *args, **kwargs):
+        url, headers, body, status = self.create_batch_introspection_response(request)
+        data = json.loads(body)
+        return Response(data=data, status=status, headers=headers)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncTokenBaseView(OAuthViewMixin, View):
+    """
+    Base for async views. OAuthLib and database work run in a bounded thread pool, see `EXECUTOR_MAX_WORKERS`,
+    so requests in flight do not each hold a worker thread while waiting.
+    """
+
+
+class AsyncTokenView(AsyncTokenBaseView):
+    async def post(self, request, *args, **kwargs):
+        url, headers, body, status = await self.acreate_token_response(request)
+        return HttpResponse(body, status=status, headers=headers)
+
+
+class AsyncTokenRevocationView(AsyncTokenBaseView):
+    async def post(self, request, *args, **kwargs):
+        url, headers, body, status = await self.acreate_revocation_response(request)
+        return HttpResponse(body, status=status, headers=headers)
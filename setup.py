@@ -37,8 +37,6 @@ setup(
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Framework :: Django",
-        "Framework :: Django :: 3.2",
-        "Framework :: Django :: 4.0",
         "Framework :: Django :: 4.1",
         "Topic :: Software Development :: Libraries :: Python Modules",
     ],
@@ -47,11 +45,12 @@ setup(
     author_email='tomi@madlab.fi',
     url='https://github.com/eofs/django-oauth-api',
     license='BSD',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     python_requires=">=3.8",
     include_package_data=True,
     test_suite='runtests',
     install_requires=[
+        'Django>=4.1',
         'djangorestframework>=3.14.0',
         'oauthlib==3.2.2',
     ]